@@ -1,161 +1,485 @@
 # analytics.py ─── commerce/order dashboards
-import sqlite3, logging
-from pathlib import Path
-from fastapi import APIRouter, Query, HTTPException
+import logging
+from fastapi import APIRouter, Query, HTTPException, Request
+
+from db import connection
+from querylog import query
+from executors import Saturated
+from chart_cache import serve_chart
+from rollups import month_span, rollup_filters
+import columnar
 
 router = APIRouter(prefix="/charts", tags=["commerce"])
 logger = logging.getLogger("analytics")
 
-DB_PATH = Path(__file__).with_name("app.db")          # same folder as main.py
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 # ── helper ────────────────────────────────────────────────────────────────────
 def build_filters(
     data_inicial: str | None = None,
     data_final:   str | None = None,
     product_id:   int  | None = None,
     category:     str  | None = None,
+    alias:        str = "orders",
 ):
+    """
+    WHERE clause over ``orders`` (referenced as ``alias``).
+
+    Product / category become semi-joins that start from the selective side:
+    idx_products_category → idx_order_items_product_order hands SQLite a
+    list of order_ids, which it then looks up by primary key, so a filtered
+    chart never scans orders (see query_plan.py).
+    """
     conds, params = [], []
 
     if product_id is not None:
         conds.append(
-            "order_id IN (SELECT order_id FROM order_items WHERE product_id=?)")
+            f"{alias}.order_id IN (SELECT oi.order_id FROM order_items oi "
+            "WHERE oi.product_id = ?)")
         params.append(product_id)
 
     if category:
         conds.append(
-            "order_id IN (SELECT oi.order_id FROM order_items oi "
-            "JOIN products p ON oi.product_id = p.product_id "
+            f"{alias}.order_id IN (SELECT oi.order_id FROM products p "
+            "JOIN order_items oi ON oi.product_id = p.product_id "
             "WHERE p.category = ?)")
         params.append(category)
 
+    # order_date is ISO text: compare it raw so idx_orders_date_contact can
+    # range-scan; the end bound is exclusive so the whole last day counts
     if data_inicial:
-        conds.append("date(order_date) >= date(?)")
+        conds.append(f"{alias}.order_date >= date(?)")
         params.append(data_inicial)
 
     if data_final:
-        conds.append("date(order_date) <= date(?)")
+        conds.append(f"{alias}.order_date < date(?, '+1 day')")
         params.append(data_final)
 
     return (" AND ".join(conds), params)
 
 # ── AOV ───────────────────────────────────────────────────────────────────────
+def aov_sql(data_inicial=None, data_final=None, product_id=None, category=None):
+    span = month_span(data_inicial, data_final)
+    if span is not None and product_id is None:
+        # whole months → read the rollup written by load_db.py
+        where, params = rollup_filters(span, category=category)
+        sql = (
+            "SELECT mes, revenue * 1.0 / NULLIF(order_count, 0) AS valor "
+            f"FROM {'orders_monthly_category' if category else 'orders_monthly'}"
+        )
+        if where:
+            sql += f" WHERE {where}"
+        return sql + " ORDER BY mes;", params
+
+    where, params = build_filters(data_inicial, data_final,
+                                  product_id, category)
+    sql = (
+        "SELECT strftime('%Y-%m', order_date) AS mes, "
+        "AVG(grand_total) AS valor "
+        "FROM orders"
+    )
+    if where:
+        sql += f" WHERE {where}"
+    return sql + " GROUP BY mes ORDER BY mes;", params
+
+def _aov(data_inicial, data_final, product_id, category):
+    if columnar.enabled():
+        return columnar.aov(data_inicial, data_final, product_id, category)
+    sql, params = aov_sql(data_inicial, data_final, product_id, category)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    return {"data": [dict(r) for r in rows]}
+
 @router.get("/aov")
-def aov(
+async def aov(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
     product_id:   int  | None = Query(None),
     category:     str  | None = Query(None),
 ):
-    conn = get_conn()
     try:
-        where, params = build_filters(data_inicial, data_final,
-                                      product_id, category)
-        sql = (
-            "SELECT strftime('%Y-%m', order_date) AS mes, "
-            "AVG(grand_total) AS valor "
-            "FROM orders"
-        )
-        if where:
-            sql += f" WHERE {where}"
-        sql += " GROUP BY mes ORDER BY mes;"
-        rows = conn.execute(sql, params).fetchall()
-        return {"data": [dict(r) for r in rows]}
+        return await serve_chart(request, _aov,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 product_id=product_id,
+                                 category=category)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/aov")
         raise HTTPException(500)
-    finally:
-        conn.close()
 
 # ── Category-mix ──────────────────────────────────────────────────────────────
+def category_mix_sql(data_inicial=None, data_final=None, product_id=None,
+                     category=None):
+    where, params = build_filters(data_inicial, data_final,
+                                  product_id, category, alias="o")
+    sql = (
+        "SELECT p.category, SUM(oi.qty * oi.unit_price) AS total "
+        "FROM orders o "
+        "JOIN order_items oi ON o.order_id = oi.order_id "
+        "JOIN products p   ON oi.product_id = p.product_id"
+    )
+    if where:
+        sql += f" WHERE {where}"
+    return sql + " GROUP BY p.category ORDER BY total DESC;", params
+
+def _category_mix(data_inicial, data_final, product_id, category):
+    if columnar.enabled():
+        return columnar.category_mix(data_inicial, data_final, product_id, category)
+    sql, params = category_mix_sql(data_inicial, data_final, product_id, category)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    return {"data": [dict(r) for r in rows]}
+
 @router.get("/category-mix")
-def category_mix(
+async def category_mix(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
     product_id:   int  | None = Query(None),
     category:     str  | None = Query(None),
 ):
-    conn = get_conn()
     try:
-        where, params = build_filters(data_inicial, data_final,
-                                      product_id, category)
-        sql = (
-            "SELECT p.category, SUM(oi.qty * oi.unit_price) AS total "
-            "FROM orders o "
-            "JOIN order_items oi ON o.order_id = oi.order_id "
-            "JOIN products p   ON oi.product_id = p.product_id"
-        )
-        if where:
-            sql += f" WHERE {where}"
-        sql += " GROUP BY p.category ORDER BY total DESC;"
-        rows = conn.execute(sql, params).fetchall()
-        return {"data": [dict(r) for r in rows]}
+        return await serve_chart(request, _category_mix,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 product_id=product_id,
+                                 category=category)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/category-mix")
         raise HTTPException(500)
-    finally:
-        conn.close()
 
 # ── Repeat funnel ────────────────────────────────────────────────────────────
+# The funnel counts customers: orders without a contact or a date belong to
+# nobody's history, so every path leaves them out, as customer_summary does
+# (load_db.CUSTOMER_SQL) – adding or removing a filter must not change that.
+FUNNEL_ORDERS = "contact_id IS NOT NULL AND order_date IS NOT NULL"
+
+# unfiltered: one row per customer, already counted by load_db
+FUNNEL_SUMMARY_SQL = (
+    "SELECT "
+    "SUM(CASE WHEN order_count >= 1 THEN 1 ELSE 0 END) AS p1, "
+    "SUM(CASE WHEN order_count >= 2 THEN 1 ELSE 0 END) AS p2, "
+    "SUM(CASE WHEN order_count >= 3 THEN 1 ELSE 0 END) AS p3 "
+    "FROM customer_summary"
+)
+
+def repeat_funnel_sql(data_inicial=None, data_final=None, product_id=None,
+                      category=None):
+    where, params = build_filters(data_inicial, data_final,
+                                  product_id, category)
+    if not where:
+        return FUNNEL_SUMMARY_SQL, params
+    sub = (f"SELECT contact_id, COUNT(*) AS cnt FROM orders "
+           f"WHERE {where} AND {FUNNEL_ORDERS} GROUP BY contact_id")
+    sql = (
+        "SELECT "
+        "SUM(CASE WHEN cnt >= 1 THEN 1 ELSE 0 END) AS p1, "
+        "SUM(CASE WHEN cnt >= 2 THEN 1 ELSE 0 END) AS p2, "
+        "SUM(CASE WHEN cnt >= 3 THEN 1 ELSE 0 END) AS p3 "
+        f"FROM ({sub})"
+    )
+    return sql, params
+
+def _repeat_funnel(data_inicial, data_final, product_id, category):
+    if columnar.enabled():
+        return columnar.repeat_funnel(data_inicial, data_final, product_id, category)
+    sql, params = repeat_funnel_sql(data_inicial, data_final, product_id, category)
+    with connection() as conn:
+        p1, p2, p3 = query(conn, sql, params, one=True)
+    return {"data": [
+        {"step": "1+ orders", "customers": p1},
+        {"step": "2+ orders", "customers": p2},
+        {"step": "3+ orders", "customers": p3},
+    ]}
+
 @router.get("/repeat-funnel")
-def repeat_funnel(
+async def repeat_funnel(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
     product_id:   int  | None = Query(None),
     category:     str  | None = Query(None),
 ):
-    conn = get_conn()
     try:
-        where, params = build_filters(data_inicial, data_final,
-                                      product_id, category)
-        sub = "SELECT contact_id, COUNT(*) AS cnt FROM orders"
-        if where:
-            sub += f" WHERE {where}"
-        sub += " GROUP BY contact_id"
-        sql = (
-            "SELECT "
-            "SUM(CASE WHEN cnt >= 1 THEN 1 ELSE 0 END) AS p1, "
-            "SUM(CASE WHEN cnt >= 2 THEN 1 ELSE 0 END) AS p2, "
-            "SUM(CASE WHEN cnt >= 3 THEN 1 ELSE 0 END) AS p3 "
-            f"FROM ({sub})"
-        )
-        p1, p2, p3 = conn.execute(sql, params).fetchone()
-        return {"data": [
-            {"step": "1+ orders", "customers": p1},
-            {"step": "2+ orders", "customers": p2},
-            {"step": "3+ orders", "customers": p3},
-        ]}
+        return await serve_chart(request, _repeat_funnel,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 product_id=product_id,
+                                 category=category)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/repeat-funnel")
         raise HTTPException(500)
-    finally:
-        conn.close()
 
 # ── Vendas por mês ───────────────────────────────────────────────────────────
+def vendas_por_mes_sql(data_inicial=None, data_final=None):
+    span = month_span(data_inicial, data_final)
+    if span is not None:
+        where, params = rollup_filters(span)
+        sql = "SELECT mes, revenue AS total FROM orders_monthly"
+        if where:
+            sql += f" WHERE {where}"
+        return sql + " ORDER BY mes;", params
+
+    where, params = build_filters(data_inicial, data_final)
+    sql = (
+        "SELECT strftime('%Y-%m', order_date) AS mes, "
+        "SUM(grand_total) AS total "
+        "FROM orders"
+    )
+    if where:
+        sql += f" WHERE {where}"
+    return sql + " GROUP BY mes ORDER BY mes;", params
+
+def _vendas_por_mes(data_inicial, data_final):
+    if columnar.enabled():
+        return columnar.vendas_por_mes(data_inicial, data_final)
+    sql, params = vendas_por_mes_sql(data_inicial, data_final)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    return {"data": [dict(r) for r in rows]}
+
 @router.get("/vendas_por_mes")
-def vendas_por_mes(
+async def vendas_por_mes(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
 ):
-    conn = get_conn()
     try:
-        where, params = build_filters(data_inicial, data_final)
-        sql = (
-            "SELECT strftime('%Y-%m', order_date) AS mes, "
-            "SUM(grand_total) AS total "
-            "FROM orders"
-        )
-        if where:
-            sql += f" WHERE {where}"
-        sql += " GROUP BY mes ORDER BY mes;"
-        rows = conn.execute(sql, params).fetchall()
-        return {"data": [dict(r) for r in rows]}
+        return await serve_chart(request, _vendas_por_mes,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/vendas_por_mes")
         raise HTTPException(500)
-    finally:
-        conn.close()
+
+# ── Commerce bundle: all four charts from one filtered pass ──────────────────
+# the bundle filters orders once into a temp table, then runs these on it
+def f_orders_sql(data_inicial=None, data_final=None, product_id=None,
+                 category=None):
+    where, params = build_filters(data_inicial, data_final,
+                                  product_id, category)
+    sql = (
+        "CREATE TEMP TABLE f_orders AS "
+        "SELECT order_id, contact_id, order_date, grand_total, "
+        "strftime('%Y-%m', order_date) AS mes "
+        "FROM orders"
+    )
+    if where:
+        sql += f" WHERE {where}"
+    return sql, params
+
+BUNDLE_SQL = {
+    "aov":
+        "SELECT mes, AVG(grand_total) AS valor "
+        "FROM f_orders GROUP BY mes ORDER BY mes;",
+    "category_mix":
+        "SELECT p.category, SUM(oi.qty * oi.unit_price) AS total "
+        "FROM f_orders o "
+        "JOIN order_items oi ON o.order_id = oi.order_id "
+        "JOIN products p   ON oi.product_id = p.product_id "
+        "GROUP BY p.category ORDER BY total DESC;",
+    "repeat_funnel":
+        "SELECT "
+        "SUM(CASE WHEN cnt >= 1 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN cnt >= 2 THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN cnt >= 3 THEN 1 ELSE 0 END) "
+        "FROM (SELECT COUNT(*) AS cnt FROM f_orders "
+        f"WHERE {FUNNEL_ORDERS} GROUP BY contact_id)",
+    "vendas_por_mes":
+        "SELECT mes, SUM(grand_total) AS total "
+        "FROM f_orders GROUP BY mes ORDER BY mes;",
+}
+
+def _commerce_bundle(data_inicial, data_final, product_id, category):
+    if columnar.enabled():
+        return columnar.commerce_bundle(data_inicial, data_final, product_id, category)
+    sql, params = f_orders_sql(data_inicial, data_final, product_id, category)
+
+    with connection() as conn:
+        conn.execute("DROP TABLE IF EXISTS temp.f_orders")
+        query(conn, sql, params)
+        try:
+            aov = query(conn, BUNDLE_SQL["aov"])
+            mix = query(conn, BUNDLE_SQL["category_mix"])
+            p1, p2, p3 = query(conn, BUNDLE_SQL["repeat_funnel"] if params
+                               else FUNNEL_SUMMARY_SQL, one=True)
+            vendas = None
+            if product_id is None and not category:
+                vendas = query(conn, BUNDLE_SQL["vendas_por_mes"])
+        finally:
+            conn.execute("DROP TABLE IF EXISTS temp.f_orders")
+
+    # /vendas_por_mes only honours the date range, so a product/category
+    # filter means the temp table is the wrong input for it
+    vendas = ([dict(r) for r in vendas] if vendas is not None
+              else _vendas_por_mes(data_inicial, data_final)["data"])
+    return {"data": {
+        "aov":            [dict(r) for r in aov],
+        "category_mix":   [dict(r) for r in mix],
+        "repeat_funnel": [
+            {"step": "1+ orders", "customers": p1},
+            {"step": "2+ orders", "customers": p2},
+            {"step": "3+ orders", "customers": p3},
+        ],
+        "vendas_por_mes": vendas,
+    }}
+
+@router.get("/commerce-bundle")
+async def commerce_bundle(
+    request:      Request,
+    data_inicial: str | None = Query(None),
+    data_final:   str | None = Query(None),
+    product_id:   int  | None = Query(None),
+    category:     str  | None = Query(None),
+):
+    """/aov, /category-mix, /repeat-funnel and /vendas_por_mes in one reply."""
+    try:
+        return await serve_chart(request, _commerce_bundle,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 product_id=product_id,
+                                 category=category)
+    except Saturated:
+        raise
+    except Exception:
+        logger.exception("Error in /charts/commerce-bundle")
+        raise HTTPException(500)
+
+# ── Cohort retention ─────────────────────────────────────────────────────────
+def cohort_retention_sql(data_inicial=None, data_final=None):
+    """Customers per (first-order month, month with an order), from the
+    monthly_orders JSON of customer_summary; the dates pick the cohorts."""
+    conds, params = [], []
+    if data_inicial:
+        conds.append("cs.first_order >= date(?)")
+        params.append(data_inicial)
+    if data_final:
+        conds.append("cs.first_order < date(?, '+1 day')")
+        params.append(data_final)
+    sql = (
+        "SELECT strftime('%Y-%m', cs.first_order) AS cohort, "
+        "j.key AS mes, COUNT(*) AS customers "
+        "FROM customer_summary cs, json_each(cs.monthly_orders) j"
+    )
+    if conds:
+        sql += " WHERE " + " AND ".join(conds)
+    return sql + " GROUP BY cohort, mes ORDER BY cohort, mes;", params
+
+def _month_index(mes: str) -> int:
+    return int(mes[:4]) * 12 + int(mes[5:7]) - 1
+
+def _cohort_retention(data_inicial, data_final):
+    sql, params = cohort_retention_sql(data_inicial, data_final)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    if not rows:
+        return {"data": []}
+
+    # dense offsets 0 … last month with data, so every cohort is a full row
+    last = max(_month_index(r["mes"]) for r in rows)
+    cohorts: dict[str, list[int]] = {}
+    for r in rows:
+        start = _month_index(r["cohort"])
+        active = cohorts.setdefault(r["cohort"], [0] * (last - start + 1))
+        active[_month_index(r["mes"]) - start] = r["customers"]
+    return {"data": [
+        {"cohort": cohort,
+         "customers": active[0],
+         "active": active,
+         "retention": [round(n * 100 / active[0], 2) if active[0] else 0
+                       for n in active]}
+        for cohort, active in cohorts.items()
+    ]}
+
+@router.get("/cohort-retention")
+async def cohort_retention(
+    request:      Request,
+    data_inicial: str | None = Query(None),
+    data_final:   str | None = Query(None),
+):
+    """Share of each first-order cohort still ordering N months later."""
+    try:
+        return await serve_chart(request, _cohort_retention,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final)
+    except Saturated:
+        raise
+    except Exception:
+        logger.exception("Error in /charts/cohort-retention")
+        raise HTTPException(500)
+
+# ── RFM segments ─────────────────────────────────────────────────────────────
+# Recency and frequency quintiles (5 = most recent / most orders); monetary
+# value is reported per segment. Quintiles come from the value's rank, not
+# the row's position (NTILE), so customers with the same last order or the
+# same order count always share a quintile: 1 + (rank - 1) * 5 / customers.
+RFM_SQL = """
+WITH ref AS (SELECT MAX(last_order) AS d FROM customer_summary),
+scored AS (
+    SELECT julianday((SELECT d FROM ref)) - julianday(last_order) AS recency,
+           order_count, total_spend,
+           1 + (RANK() OVER (ORDER BY last_order) - 1) * 5 / COUNT(*) OVER () AS r,
+           1 + (RANK() OVER (ORDER BY order_count) - 1) * 5 / COUNT(*) OVER () AS f
+    FROM customer_summary
+)
+SELECT r, f, COUNT(*) AS customers, SUM(recency) AS recency,
+       SUM(order_count) AS frequency, SUM(total_spend) AS monetary,
+       (SELECT date(d) FROM ref) AS reference_date
+FROM scored
+GROUP BY r, f;
+"""
+
+# first match wins
+RFM_SEGMENTS = (
+    ("champions",   lambda r, f: r >= 4 and f >= 4),
+    ("loyal",       lambda r, f: r >= 3 and f >= 3),
+    ("new",         lambda r, f: r >= 4 and f <= 1),
+    ("promising",   lambda r, f: r >= 3 and f <= 2),
+    ("at_risk",     lambda r, f: r <= 2 and f >= 3),
+    ("hibernating", lambda r, f: True),
+)
+
+def rfm_segment(r: int, f: int) -> str:
+    return next(name for name, match in RFM_SEGMENTS if match(r, f))
+
+def _rfm():
+    with connection() as conn:
+        rows = query(conn, RFM_SQL)
+    totals = {name: [0, 0.0, 0, 0.0] for name, _ in RFM_SEGMENTS}
+    for row in rows:
+        t = totals[rfm_segment(row["r"], row["f"])]
+        t[0] += row["customers"]
+        t[1] += row["recency"] or 0
+        t[2] += row["frequency"] or 0
+        t[3] += row["monetary"] or 0
+    customers = sum(t[0] for t in totals.values())
+    return {"data": {
+        "reference_date": rows[0]["reference_date"] if rows else None,
+        "segments": [
+            {"segment": name,
+             "customers": n,
+             "share": round(n * 100 / customers, 2) if customers else 0,
+             "avg_recency_days": round(rec / n, 1) if n else None,
+             "avg_frequency": round(freq / n, 2) if n else None,
+             "avg_monetary": round(mon / n, 2) if n else None}
+            for name, (n, rec, freq, mon) in totals.items()
+        ],
+    }}
+
+@router.get("/rfm")
+async def rfm(request: Request):
+    """Customers by recency / frequency segment, as of the latest order."""
+    try:
+        return await serve_chart(request, _rfm)
+    except Saturated:
+        raise
+    except Exception:
+        logger.exception("Error in /charts/rfm")
+        raise HTTPException(500)
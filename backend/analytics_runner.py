@@ -1,19 +1,12 @@
 import uuid
 import logging
-from pathlib import Path
 from pydantic import BaseModel
 
-from db_agent import analytics_crew, event_queue
-
-# — Logging setup — #
-log_path = Path(__file__).parent / "analytics_runner.log"
-log_path.parent.mkdir(parents=True, exist_ok=True)
-logging.basicConfig(
-    filename=str(log_path),
-    filemode='a',
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s"
-)
+import logs
+import chat_events
+from crew import analytics_crew
+
+# — Logging: logs.configure() also writes this logger to analytics_runner.log —
 logger = logging.getLogger(__name__)
 logger.info("Starting analytics_runner…")
 
@@ -25,14 +18,18 @@ class AnalyticsResponse(BaseModel):
     content: str
 
 
-def run_analytics(user_message: str) -> AnalyticsResponse:
+def run_analytics(user_message: str, on_event=None) -> AnalyticsResponse:
+    """``on_event(event, data)`` receives the chat_events emitted during the run."""
     tid, rid = str(uuid.uuid4()), str(uuid.uuid4())
-    logger.info("▶ Run started (thread_id=%s run_id=%s): %r", tid, rid, user_message)
+    logger.info("▶ Run started (thread_id=%s run_id=%s): %r", tid, rid,
+                logs.payload(user_message))
 
-    # synchronous kickoff (enqueues events into event_queue)
-    result = analytics_crew.kickoff(inputs={"input": user_message})
+    # synchronous kickoff (sql / rows / reasoning events go to on_event)
+    with chat_events.capture(on_event):
+        result = analytics_crew.kickoff(inputs={"input": user_message})
 
-    logger.info("✔️ Crew finished, raw output: %r", result)
     resp = AnalyticsResponse(content=str(result))
-    logger.info("– Returning AnalyticsResponse: %r", resp.dict())
+    # the content is the crew output: log it once, truncated (logs.payload)
+    logger.info("✔️ Crew finished (run_id=%s, %d chars): %s", rid,
+                len(resp.content), logs.payload(resp.content))
     return resp
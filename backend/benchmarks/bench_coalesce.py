@@ -0,0 +1,123 @@
+# benchmarks/bench_coalesce.py ─── identical-request bursts, single-flight on/off
+"""
+    python benchmarks/bench_coalesce.py --factor 100 --burst 64 --rounds 5
+
+Builds a scaled app.db (synth.generate_tables), then, with single-flight
+off and on, fires ``--rounds`` bursts of ``--burst`` simultaneous requests
+for the same few /charts/* URLs – a campaign email landing on everyone's
+dashboard at once. The chart cache is emptied before every burst, so each
+burst starts cold.
+
+Reports per mode the SQL statements run (querylog), chart computations,
+coalesced requests and p50 / p95 latency; exits 1 if single-flight did
+not run fewer statements.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("CHAT_ENABLED", "0")
+os.environ.setdefault("CHART_WARM", "0")          # only the bursts touch the cache
+
+import db                                         # noqa: E402
+import load_db                                    # noqa: E402
+import querylog                                   # noqa: E402
+from synth import generate_tables                 # noqa: E402
+
+URLS = [
+    "/charts/email-engagement?data_inicial=2025-01-10&data_final=2025-04-20",
+    "/charts/email-volume?data_inicial=2025-01-10&data_final=2025-04-20",
+    "/charts/repeat-funnel?data_inicial=2024-01-15&data_final=2024-09-10",
+    "/charts/category-mix",
+]
+
+
+def statements_run() -> int:
+    return sum(s["calls"] for s in querylog.stats(limit=10**6))
+
+
+def burst(client, urls: list[str], size: int) -> list[tuple[float, int]]:
+    """``size`` requests per URL, released together by a barrier."""
+    gate = threading.Barrier(size * len(urls))
+
+    def hit(url):
+        gate.wait()
+        started = time.perf_counter()
+        status = client.get(url).status_code
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=size * len(urls)) as pool:
+        return list(pool.map(hit, [u for u in urls for _ in range(size)]))
+
+
+def run_mode(client, flights, cache, enabled: bool, args) -> dict:
+    flights.enabled = enabled
+    before_sql = statements_run()
+    before = dict(flights.stats())
+    samples = []
+    for _ in range(args.rounds):
+        cache.clear()
+        samples += burst(client, URLS, args.burst)
+    after = flights.stats()
+    ms = sorted(s * 1000 for s, _ in samples)
+    return {
+        "requests":     len(samples),
+        "errors":       sum(status != 200 for _, status in samples),
+        "statements":   statements_run() - before_sql,
+        "computations": after["computations"] - before["computations"],
+        "coalesced":    after["coalesced"] - before["coalesced"],
+        "p50_ms":       statistics.median(ms),
+        "p95_ms":       statistics.quantiles(ms, n=20)[-1],
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--factor", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--burst", type=int, default=32,
+                    help="simultaneous requests per URL")
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        load_db.CSV_DIR     = generate_tables(tmp / "tables", args.factor, args.seed)
+        load_db.DB_PATH     = tmp / "app.db"
+        load_db.SHADOW_PATH = tmp / "app.db.shadow"
+        load_db.populate_db()
+        db.DB_PATH = db.pool.path = load_db.DB_PATH
+        querylog.SLOW_MS = float("inf")           # every burst query is "slow"
+
+        from fastapi.testclient import TestClient
+        import main as app_main
+        from chart_cache import cache, flights
+
+        with TestClient(app_main.app) as client:
+            results = {mode: run_mode(client, flights, cache, mode == "on", args)
+                       for mode in ("off", "on")}
+        db.pool.close_all()
+
+    print(f"\n{len(URLS)} URLs × {args.burst} simultaneous requests × "
+          f"{args.rounds} bursts, cold cache each burst\n")
+    print(f"{'single-flight':<14} {'statements':>10} {'computations':>12} "
+          f"{'coalesced':>9} {'p50':>9} {'p95':>9} {'errors':>6}")
+    for mode, r in results.items():
+        print(f"{mode:<14} {r['statements']:>10} {r['computations']:>12} "
+              f"{r['coalesced']:>9} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms "
+              f"{r['errors']:>6}")
+    off, on = results["off"]["statements"], results["on"]["statements"]
+    print(f"\nSQL statements: {off} → {on} ({off / max(on, 1):.1f}× fewer)")
+    sys.exit(0 if on < off else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# benchmarks/bench_columnar.py ─── SQLite vs. NumPy chart engine
+"""
+    python benchmarks/bench_columnar.py --factor 200 --repeat 20
+
+Builds a scaled app.db in a temp dir (see synth.py), then runs every chart
+compute function over a set of filter combinations with each engine,
+bypassing the chart cache. Reports p50 / p95 latency per chart, the
+snapshot's size and load time, and fails if any result differs (floats
+compared with math.isclose, since summation order differs).
+"""
+import sys
+import math
+import time
+import argparse
+import resource
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np                                # noqa: E402
+
+import db                                         # noqa: E402
+import load_db                                    # noqa: E402
+import columnar                                   # noqa: E402
+import analytics                                  # noqa: E402
+import campaigns                                  # noqa: E402
+from synth import scale_tables                    # noqa: E402
+
+COMMERCE = [
+    {},
+    {"data_inicial": "2024-01-01", "data_final": "2024-06-30"},
+    {"data_inicial": "2024-01-15", "data_final": "2024-03-10"},
+    {"category": "Footwear"},
+    {"product_id": 4},
+    {"data_inicial": "2024-01-01", "data_final": "2024-12-31",
+     "category": "Footwear"},
+]
+CAMPAIGN = [
+    {},
+    {"data_inicial": "2025-02-01", "data_final": "2025-03-31"},
+    {"data_inicial": "2025-01-10", "data_final": "2025-04-20"},
+    {"sender": "Relacionamento"},
+]
+
+CHARTS = {
+    "aov":              (analytics._aov, COMMERCE),
+    "category-mix":     (analytics._category_mix, COMMERCE),
+    "repeat-funnel":    (analytics._repeat_funnel, COMMERCE),
+    "vendas_por_mes":   (analytics._vendas_por_mes, COMMERCE),
+    "commerce-bundle":  (analytics._commerce_bundle, COMMERCE),
+    "email-volume":     (campaigns._email_volume, CAMPAIGN),
+    "email-engagement": (campaigns._email_engagement, CAMPAIGN),
+    "email-sender-mix": (campaigns._email_sender_mix, CAMPAIGN),
+    "email-unsub-rate": (campaigns._email_unsub_rate, CAMPAIGN),
+    "campaign-bundle":  (campaigns._campaign_bundle, CAMPAIGN),
+}
+
+
+def call(fn, filters: dict):
+    names = fn.__code__.co_varnames[:fn.__code__.co_argcount]
+    return fn(**{n: filters.get(n) for n in names})
+
+
+def same(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return (a is not None and b is not None
+                and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(map(same, a, b))
+    return a == b
+
+
+def timed(fn, filters, repeat: int) -> tuple[list[float], object]:
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call(fn, filters)
+        times.append((time.perf_counter() - started) * 1000)
+    return times, result
+
+
+def use_engine(name: str) -> None:
+    columnar.ENGINE = name
+    columnar.np = np if name == "numpy" else None
+    columnar.NAT = np.iinfo(np.int64).min
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--factor", type=int, default=100,
+                    help="copies of each CSV (default: 100)")
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        load_db.CSV_DIR     = scale_tables(tmp / "tables", args.factor)
+        load_db.DB_PATH     = tmp / "app.db"
+        load_db.SHADOW_PATH = tmp / "app.db.shadow"
+        load_db.populate_db()
+        db.DB_PATH = db.pool.path = load_db.DB_PATH
+
+        use_engine("numpy")
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        snap = columnar.snapshot()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"\nsnapshot: {len(snap.order_id):,} orders, "
+              f"{len(snap.item_total):,} items, {len(snap.sends):,} campaigns; "
+              f"{snap.nbytes() / 2**20:,.1f} MiB of arrays, "
+              f"loaded in {columnar.stats()['load_seconds']:.2f}s, "
+              f"max RSS +{(rss_after - rss_before) / 1024:,.1f} MiB\n")
+
+        print(f"{'chart':<18} {'sqlite p50':>11} {'p95':>8} "
+              f"{'numpy p50':>11} {'p95':>8} {'speed-up':>9}")
+        mismatches = []
+        for chart, (fn, cases) in CHARTS.items():
+            lat = {"sqlite": [], "numpy": []}
+            for filters in cases:
+                results = {}
+                for engine in lat:
+                    use_engine(engine)
+                    times, results[engine] = timed(fn, filters, args.repeat)
+                    lat[engine] += times
+                if not same(results["sqlite"], results["numpy"]):
+                    mismatches.append((chart, filters))
+            s50, n50 = (statistics.median(lat[e]) for e in ("sqlite", "numpy"))
+            s95, n95 = (statistics.quantiles(lat[e], n=20)[-1]
+                        for e in ("sqlite", "numpy"))
+            print(f"{chart:<18} {s50:9.2f}ms {s95:6.2f}ms "
+                  f"{n50:9.2f}ms {n95:6.2f}ms {s50 / n50:8.1f}×")
+
+        db.pool.close_all()
+        if mismatches:
+            for chart, filters in mismatches:
+                print(f"MISMATCH {chart} {filters}")
+            sys.exit(1)
+        print("\nall results match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/bench_export.py ─── JSON rows vs. Arrow / Parquet export batches
+"""
+    python benchmarks/bench_export.py --factor 1000 --table order_items
+
+Builds a scaled app.db (synth.generate_tables), then serializes one whole
+table three ways, each from a fresh cursor on the same connection:
+
+• json     – what the charts and query_sql do: ``[dict(r) for r in rows]``
+             then ``json.dumps``
+• arrow    – export.Export, Arrow IPC stream
+• parquet  – export.Export, Parquet
+
+Reports wall and CPU seconds, output bytes and peak Python memory
+(tracemalloc, measured in a second run) for each, plus the peak of
+pyarrow's own allocator, and checks that the Arrow stream reads back with
+the table's row count.
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db                                         # noqa: E402
+import load_db                                    # noqa: E402
+import export                                     # noqa: E402
+import querylog                                   # noqa: E402
+from db import connection                         # noqa: E402
+from synth import generate_tables                 # noqa: E402
+
+
+def as_json(sql: str) -> int:
+    with connection() as conn:
+        rows = conn.execute(sql).fetchall()
+        return len(json.dumps([dict(r) for r in rows]))
+
+
+def as_export(sql: str, fmt: str, sink: list | None = None) -> int:
+    ex = export.Export(sql, (), fmt, "bench")
+    size = len(chunk := ex.open())
+    if sink is not None:
+        sink.append(chunk)
+    while (chunk := ex.next()) is not None:
+        size += len(chunk)
+        if sink is not None:
+            sink.append(chunk)
+    return size
+
+
+def measure(fn, *args) -> dict:
+    """Timed run, then a second run under tracemalloc for the peak."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    size = fn(*args)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"wall": wall, "cpu": cpu, "bytes": size, "peak": peak}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--factor", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--table", default="order_items",
+                    choices=sorted(load_db.TABLES))
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        load_db.CSV_DIR     = generate_tables(tmp / "tables", args.factor, args.seed)
+        load_db.DB_PATH     = tmp / "app.db"
+        load_db.SHADOW_PATH = tmp / "app.db.shadow"
+        load_db.populate_db()
+        db.DB_PATH = db.pool.path = export.export_pool.path = load_db.DB_PATH
+        querylog.SLOW_MS = float("inf")
+
+        sql = f"SELECT * FROM {args.table}"
+        with connection() as conn:
+            rows = conn.execute(f"SELECT count(*) FROM {args.table}").fetchone()[0]
+        export._arrow()                           # import cost is not serialization
+
+        results = {"json":    measure(as_json, sql),
+                   "arrow":   measure(as_export, sql, "arrow"),
+                   "parquet": measure(as_export, sql, "parquet")}
+
+        chunks = []
+        as_export(sql, "arrow", chunks)
+        pa = export._arrow()
+        read = pa.ipc.open_stream(b"".join(chunks)).read_all().num_rows
+        db.pool.close_all()
+        export.export_pool.close_all()
+
+    print(f"\n{args.table}: {rows:,} rows, batches of {export.BATCH_ROWS:,}\n")
+    print(f"{'format':<8} {'wall':>8} {'cpu':>8} {'rows/s':>12} {'MiB out':>8} "
+          f"{'peak MiB':>9}")
+    for fmt, r in results.items():
+        print(f"{fmt:<8} {r['wall']:7.2f}s {r['cpu']:7.2f}s "
+              f"{rows / r['wall']:12,.0f} {r['bytes'] / 2**20:8.1f} "
+              f"{r['peak'] / 2**20:9.1f}")
+    print(f"pyarrow allocator peak: "
+          f"{pa.default_memory_pool().max_memory() / 2**20:,.1f} MiB")
+    base = results["json"]["cpu"]
+    print(f"\nCPU vs json: arrow {results['arrow']['cpu'] / base:.0%}, "
+          f"parquet {results['parquet']['cpu'] / base:.0%}")
+    if read != rows:
+        print(f"MISMATCH: arrow stream has {read} rows, table has {rows}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_load.py ─── serial vs. parallel populate_db()
+"""
+    python benchmarks/bench_load.py --factor 2000 --workers 1 2 4
+
+Builds a scaled copy of backend/tables in a temp dir (see synth.py), then
+times a full populate_db() into a temp database for each worker count.
+
+On a one-core VM, ×2000 (326 MiB of CSV, 3.8M rows): workers=1 53.1s,
+workers=2 67.8s (×0.78). The workers only help with cores to run on; see
+load_db.py §4b.
+"""
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import load_db                                    # noqa: E402
+from synth import scale_tables                    # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--factor", type=int, default=1000,
+                    help="copies of each CSV (default: 1000)")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        csv_dir = scale_tables(tmp / "tables", args.factor)
+        size = sum(p.stat().st_size for p in csv_dir.glob("*.csv"))
+        print(f"dataset: ×{args.factor}, {size / 2**20:,.1f} MiB of CSV")
+
+        load_db.CSV_DIR     = csv_dir
+        load_db.DB_PATH     = tmp / "app.db"
+        load_db.SHADOW_PATH = tmp / "app.db.shadow"
+
+        baseline = None
+        for n in args.workers:
+            load_db.DB_PATH.unlink(missing_ok=True)
+            started = time.perf_counter()
+            load_db.populate_db(workers=n)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(f"workers={n:<2}  {elapsed:8.2f}s  speed-up ×{baseline / elapsed:.2f}\n")
+
+
+if __name__ == "__main__":
+    main()
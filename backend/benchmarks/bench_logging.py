@@ -0,0 +1,142 @@
+# benchmarks/bench_logging.py ─── per-request cost of logging: off, synchronous, queued
+"""
+    python benchmarks/bench_logging.py --requests 200 --rounds 20 --threads 8
+
+Builds a small app.db (synth.generate_tables) and calls
+analytics_runner.run_analytics with fake_crew.FakeCrew answering from a
+``--rows``-row SELECT (through sql_tool.query_sql, so the agent's SQL log
+line is on the path too) under three setups:
+
+• off    – root logger at WARNING: the INFO calls return immediately
+• sync   – what basicConfig gave before logs.py: console + file handlers
+           on the calling thread, payloads logged whole
+• queue  – logs.configure(): one QueueHandler, lazy formatting, payloads
+           truncated to LOG_PAYLOAD_MAX, rotating files on the listener
+
+Console output goes to /dev/null in every mode; files go to a temp dir.
+The modes take turns for ``--rounds`` rounds of ``--requests`` calls, one
+at a time and then from ``--threads`` threads. Reports p50 / p95 per call
+over all rounds, throughput (median round) and the bytes logged per call.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("CHAT_FAKE_CREW", "1")
+
+import db                                         # noqa: E402
+import logs                                       # noqa: E402
+import crew                                       # noqa: E402
+import load_db                                    # noqa: E402
+import querylog                                   # noqa: E402
+import analytics_runner                           # noqa: E402
+from fake_crew import FakeCrew                    # noqa: E402
+from synth import generate_tables                 # noqa: E402
+
+MESSAGE = "Quais itens de pedido tivemos?"
+
+
+def _reset() -> None:
+    logs.shutdown()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def setup(mode: str, log_dir: Path, devnull) -> None:
+    _reset()
+    root = logging.getLogger()
+    logs.DIR, logs.PAYLOAD_MAX = log_dir, int(os.getenv("LOG_PAYLOAD_MAX", "500"))
+    if mode == "sync":
+        formatter = logging.Formatter(logs.FORMAT)
+        for handler in (logging.StreamHandler(devnull),
+                        logging.FileHandler(log_dir / logs.FILE, encoding="utf-8")):
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        logs.PAYLOAD_MAX = 0                          # whole payloads, as before
+        return
+    stderr, sys.stderr = sys.stderr, devnull         # the listener's console handler
+    try:
+        logs.configure()
+    finally:
+        sys.stderr = stderr
+    root.setLevel(logging.WARNING if mode == "off" else logging.INFO)
+
+
+def logged_bytes(log_dir: Path) -> int:
+    return sum(p.stat().st_size for p in log_dir.glob("*.log*"))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200, help="calls per round")
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--rows", type=int, default=500, help="rows in the crew's answer")
+    ap.add_argument("--factor", type=int, default=5)
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        tmp = Path(tmp)
+        load_db.CSV_DIR     = generate_tables(tmp / "tables", args.factor)
+        load_db.DB_PATH     = tmp / "app.db"
+        load_db.SHADOW_PATH = tmp / "app.db.shadow"
+        load_db.populate_db()
+        db.DB_PATH = db.pool.path = load_db.DB_PATH
+        querylog.SLOW_MS = float("inf")
+        crew._crew = FakeCrew(query=f"SELECT * FROM order_items LIMIT {args.rows}")
+        payload = len(str(crew._crew.kickoff({"input": MESSAGE})))   # also fills the SQL cache
+
+        modes = ("off", "sync", "queue")
+        times = {mode: [] for mode in modes}
+        rates = {mode: [] for mode in modes}
+        dropped = dict.fromkeys(modes, 0)
+        for mode in modes:
+            (tmp / f"logs-{mode}").mkdir()
+        for _ in range(10):                           # warm-up, unlogged
+            analytics_runner.run_analytics(MESSAGE)
+        for _ in range(args.rounds):
+            for mode in modes:
+                setup(mode, tmp / f"logs-{mode}", devnull)
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    analytics_runner.run_analytics(MESSAGE)
+                    times[mode].append((time.perf_counter() - started) * 1e6)
+                started = time.perf_counter()
+                with ThreadPoolExecutor(args.threads) as pool:
+                    list(pool.map(lambda _: analytics_runner.run_analytics(MESSAGE),
+                                  range(args.requests)))
+                rates[mode].append(args.requests / (time.perf_counter() - started))
+                dropped[mode] += logs.stats()["dropped"]
+                _reset()                              # flushes the queue
+        calls = 2 * args.requests * args.rounds
+        for mode in modes:
+            q = statistics.quantiles(times[mode], n=20)
+            results[mode] = (statistics.median(times[mode]), q[18],
+                             statistics.median(rates[mode]),
+                             logged_bytes(tmp / f"logs-{mode}") / calls, dropped[mode])
+        db.pool.close_all()
+
+    print(f"\nrun_analytics with a {payload:,}-char crew answer, {args.rounds} rounds "
+          f"of {args.requests} calls; throughput with {args.threads} threads\n")
+    print(f"{'mode':<6} {'p50':>9} {'p95':>9} {'req/s':>9} {'log B/req':>10} {'dropped':>8}")
+    for mode, (p50, p95, rate, size, dropped) in results.items():
+        print(f"{mode:<6} {p50:7.1f}µs {p95:7.1f}µs {rate:9,.0f} {size:10,.0f} {dropped:>8}")
+    off = results["off"][0]
+    print(f"\nlogging overhead per request (p50): "
+          + ", ".join(f"{m} {results[m][0] - off:+.1f}µs" for m in ("sync", "queue")))
+
+
+if __name__ == "__main__":
+    main()
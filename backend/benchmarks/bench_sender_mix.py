@@ -0,0 +1,111 @@
+# benchmarks/bench_sender_mix.py ─── exact vs. ?approx=true sender mix at high cardinality
+"""
+    python benchmarks/bench_sender_mix.py --rows 10000000 --senders 100000
+
+Builds an app.db whose campaigns table has ``--rows`` rows spread over
+``--senders`` Zipf-distributed senders (synth.generate_campaigns), then,
+for a few date ranges, runs the sender-mix chart exactly and with
+approx=true (bypassing the chart cache) and reports:
+
+• p50 latency of each mode
+• recall of the exact top 10 and whether the sends of the senders found
+  match exactly
+• the candidates recounted, the bound on any sender that was never a
+  candidate (max_missed_sends) and whether the top 10 is guaranteed
+  ("-": no whole month in range, approx=true ran the exact query)
+
+Exits 1 if a result flagged exact differs from the exact path.
+"""
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db                                         # noqa: E402
+import load_db                                    # noqa: E402
+import querylog                                   # noqa: E402
+import campaigns                                  # noqa: E402
+from synth import generate_campaigns              # noqa: E402
+
+RANGES = [
+    ("everything",        None,         None),
+    ("one quarter",       "2025-01-01", "2025-03-31"),
+    ("partial months",    "2024-12-10", "2025-02-20"),
+    ("inside one month",  "2025-02-03", "2025-02-17"),
+    ("open end",          "2025-01-15", None),
+]
+
+
+def timed(fn, repeat: int, *args) -> tuple[float, dict]:
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--senders", type=int, default=100_000)
+    ap.add_argument("--skew", type=float, default=1.1, help="Zipf exponent")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        started = time.perf_counter()
+        load_db.CSV_DIR = generate_campaigns(tmp / "tables", args.rows, args.senders,
+                                             args.seed, args.skew)
+        print(f"generated in {time.perf_counter() - started:.0f}s")
+        load_db.DB_PATH     = tmp / "app.db"
+        load_db.SHADOW_PATH = tmp / "app.db.shadow"
+        started = time.perf_counter()
+        load_db.populate_db()
+        print(f"loaded in {time.perf_counter() - started:.0f}s")
+        db.DB_PATH = db.pool.path = load_db.DB_PATH
+        querylog.SLOW_MS = float("inf")
+
+        with db.connection() as conn:
+            sizes = {t: conn.execute(f"SELECT count(*) FROM {t}").fetchone()[0]
+                     for t in ("campaigns", "campaigns_monthly", "sender_sketch")}
+        results, wrong = [], []
+        for name, lo, hi in RANGES:
+            exact_ms, exact = timed(campaigns._email_sender_mix, args.repeat, lo, hi)
+            approx_ms, approx = timed(campaigns._email_sender_mix, args.repeat,
+                                      lo, hi, True)
+            truth = {r["sender"]: r["sends"] for r in exact["data"]}
+            found = {r["sender"]: r["sends"] for r in approx["data"]}
+            hits = truth.keys() & found.keys()
+            # no whole month in range: the approx route answers exactly
+            info = approx.get("approx", {"candidates": "-", "max_missed_sends": 0,
+                                         "exact": True})
+            if info["exact"] and exact["data"] != approx["data"]:
+                wrong.append(name)
+            results.append((name, exact_ms, approx_ms, len(hits) / max(len(truth), 1),
+                            all(truth[s] == found[s] for s in hits), info))
+        db.pool.close_all()
+
+    print(f"\n{sizes['campaigns']:,} campaigns, {args.senders:,} senders "
+          f"(Zipf {args.skew}); campaigns_monthly {sizes['campaigns_monthly']:,} rows, "
+          f"sender_sketch {sizes['sender_sketch']:,} rows\n")
+    print(f"{'range':<17} {'exact p50':>10} {'approx p50':>11} {'speed-up':>9} "
+          f"{'recall':>7} {'sends':>6} {'cands':>6} {'max missed':>13} {'exact?':>7}")
+    for name, exact_ms, approx_ms, recall, same, info in results:
+        print(f"{name:<17} {exact_ms:8.1f}ms {approx_ms:9.1f}ms "
+              f"{exact_ms / approx_ms:8.1f}× {recall:7.0%} {'=' if same else '≠':>6} "
+              f"{info['candidates']:>6} {info['max_missed_sends']:>13,} "
+              f"{'yes' if info['exact'] else 'no':>7}")
+    if wrong:
+        print(f"\nWRONG: flagged exact but different from the exact path: {wrong}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_serialize.py ─── chart payloads: JSONResponse vs. orjson, columns, gzip
+"""
+    python benchmarks/bench_serialize.py --factor 100 --repeat 200
+
+Builds a scaled app.db (synth.generate_tables), computes every chart once
+(no filters, the largest payload each serves) and then times only the
+encoding, per endpoint:
+
+• before   – ``JSONResponse(payload).body``, what serve_chart used to send
+• rows     – responses.dumps(payload), the default ``format=rows``
+• columns  – responses.dumps(to_columns(payload)), ``format=columns``
+
+and reports the bytes on the wire: before (never compressed), then rows
+and columns as identity, gzip and (when the brotli module is installed)
+br. Compressed sizes are what serve_chart would send, i.e. bodies under
+RESPONSE_COMPRESS_MIN bytes go out as they are.
+"""
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse        # noqa: E402
+
+import db                                         # noqa: E402
+import load_db                                    # noqa: E402
+import querylog                                   # noqa: E402
+import responses                                  # noqa: E402
+import analytics                                  # noqa: E402
+import campaigns                                  # noqa: E402
+from synth import generate_tables                 # noqa: E402
+
+CHARTS = {
+    "aov":              analytics._aov,
+    "category-mix":     analytics._category_mix,
+    "repeat-funnel":    analytics._repeat_funnel,
+    "vendas_por_mes":   analytics._vendas_por_mes,
+    "commerce-bundle":  analytics._commerce_bundle,
+    "cohort-retention": analytics._cohort_retention,
+    "rfm":              analytics._rfm,
+    "email-volume":     campaigns._email_volume,
+    "email-engagement": campaigns._email_engagement,
+    "email-sender-mix": campaigns._email_sender_mix,
+    "email-unsub-rate": campaigns._email_unsub_rate,
+    "campaign-bundle":  campaigns._campaign_bundle,
+}
+
+ENCODERS = {
+    "before":  lambda p: JSONResponse(p).body,
+    "rows":    responses.dumps,
+    "columns": lambda p: responses.dumps(responses.to_columns(p)),
+}
+
+
+def call(fn):
+    return fn(*[None] * fn.__code__.co_argcount)
+
+
+def timed_us(encode, payload, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(payload)
+        times.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(times)
+
+
+def wire(data: bytes, encoding: str | None) -> int:
+    if encoding is None or len(data) < responses.COMPRESS_MIN_BYTES:
+        return len(data)
+    return len(responses.compress(data, encoding))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--factor", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        load_db.CSV_DIR     = generate_tables(tmp / "tables", args.factor, args.seed)
+        load_db.DB_PATH     = tmp / "app.db"
+        load_db.SHADOW_PATH = tmp / "app.db.shadow"
+        load_db.populate_db()
+        db.DB_PATH = db.pool.path = load_db.DB_PATH
+        querylog.SLOW_MS = float("inf")
+        payloads = {chart: call(fn) for chart, fn in CHARTS.items()}
+        db.pool.close_all()
+
+    encoder = "orjson" if responses.orjson is not None else "json (orjson missing)"
+    encodings = [None, *responses.ENCODINGS]
+    print(f"\nencoder: {encoder}; compression at ≥ {responses.COMPRESS_MIN_BYTES} B "
+          f"({', '.join(responses.ENCODINGS)}); median of {args.repeat}\n")
+    sized = [(fmt, e) for fmt in ("rows", "columns") for e in encodings]
+    print(f"{'':<18} {'encode time':^29}   {'bytes on the wire':^{9 + 9 * len(sized)}}")
+    print(f"{'chart':<18} {'before':>9} {'rows':>9} {'columns':>9}   {'before':>8}"
+          + "".join(f" {fmt[:3] + (' ' + e if e else ''):>8}" for fmt, e in sized))
+
+    total = {name: 0.0 for name in ENCODERS}
+    for chart, payload in payloads.items():
+        us = {name: timed_us(enc, payload, args.repeat) for name, enc in ENCODERS.items()}
+        body = {name: enc(payload) for name, enc in ENCODERS.items()}
+        if responses.orjson is not None:
+            assert responses.orjson.loads(body["rows"]) == responses.orjson.loads(body["before"])
+        for name in total:
+            total[name] += us[name]
+        print(f"{chart:<18} {us['before']:7.1f}µs {us['rows']:7.1f}µs "
+              f"{us['columns']:7.1f}µs   {len(body['before']):>8,}"
+              + "".join(f" {wire(body[fmt], e):>8,}" for fmt, e in sized))
+
+    print(f"\nencode time, all charts: before {total['before']:.0f}µs, "
+          f"rows {total['rows']:.0f}µs ({total['before'] / total['rows']:.1f}× faster), "
+          f"columns {total['columns']:.0f}µs; each is paid once per cached chart")
+
+
+if __name__ == "__main__":
+    main()
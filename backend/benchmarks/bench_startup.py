@@ -0,0 +1,98 @@
+# benchmarks/bench_startup.py ─── cold start: import main → first chart
+"""
+    python benchmarks/bench_startup.py --budget 1.5
+
+Starts a fresh interpreter per mode under ``python -X importtime`` and
+measures how long ``import main`` takes and when the first /charts/aov
+answer comes back:
+
+• charts-only – CHAT_ENABLED=0, crewai is never imported
+• lazy        – default worker (warm-up disabled so it doesn't skew timing)
+• eager       – the crew built at import time, as before crew.py
+
+Prints the slowest top-level imports per mode and exits 1 if a
+non-eager mode's first chart misses --budget seconds.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import time, json
+t0 = time.perf_counter()
+if {eager}:
+    import crew
+    crew.get_crew()
+import main
+t_import = time.perf_counter() - t0
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    status = client.get("/charts/aov").status_code
+t_ready = time.perf_counter() - t0
+import sys
+print(json.dumps({{"import": t_import, "ready": t_ready, "status": status,
+                  "crewai": "crewai" in sys.modules}}))
+"""
+
+MODES = {
+    "charts-only": ({"CHAT_ENABLED": "0"}, False),
+    "lazy":        ({"CREW_WARMUP": "0"}, False),
+    "eager":       ({}, True),
+}
+
+
+def parse_importtime(stderr: str) -> list[tuple[float, str]]:
+    """(cumulative seconds, module) for top-level imports and their direct children."""
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("     "):
+            continue                           # keep depth 0 and 1
+        out.append((int(cumulative) / 1e6, name.rstrip()[1:]))
+    return out
+
+
+def run_mode(env_extra: dict, eager: bool) -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "x"),
+           **env_extra}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(eager=eager)],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = sorted(parse_importtime(proc.stderr), reverse=True)
+    return result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget", type=float, default=1.5,
+                    help="seconds until the first chart answers (default: 1.5)")
+    ap.add_argument("--top", type=int, default=8,
+                    help="slowest imports to list per mode")
+    args = ap.parse_args()
+
+    over = []
+    for name, (env_extra, eager) in MODES.items():
+        r = run_mode(env_extra, eager)
+        print(f"{name:<12} import main {r['import']:6.2f}s  "
+              f"first chart {r['ready']:6.2f}s  (HTTP {r['status']}, "
+              f"crewai {'loaded' if r['crewai'] else 'not loaded'})")
+        for seconds, module in r["imports"][:args.top]:
+            print(f"{'':14}{seconds:6.3f}s  {module}")
+        if not eager and r["ready"] > args.budget:
+            over.append(name)
+
+    if over:
+        print(f"over the {args.budget}s budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# benchmarks/bench_suite.py ─── loader throughput + /charts/* latency under load
+"""
+    python benchmarks/bench_suite.py --factor 100 --concurrency 8 \\
+        --requests 400 --out bench-results.json
+
+1. generates ``factor``× tables in a temp dir (synth.generate_tables, or
+   --replicate for verbatim copies) and times populate_db()
+2. points the app at that database and fires ``--requests`` requests per
+   /charts/* route through the ASGI app (fastapi TestClient), from
+   ``--concurrency`` threads, with a mix of filters
+
+Writes p50 / p95 / p99 latency, requests/s and error counts per route as
+JSON together with the commit and environment, so runs can be diffed
+across commits. The chart cache is disabled unless --cache is given.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+# chart-only worker: no crewai import, no warm-up thread
+os.environ.setdefault("CHAT_ENABLED", "0")
+
+import db                                         # noqa: E402
+import load_db                                    # noqa: E402
+from synth import generate_tables, scale_tables   # noqa: E402
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def count_rows(csv_dir: Path) -> dict:
+    return {p.stem: sum(1 for _ in open(p, encoding="utf-8")) - 1
+            for p in sorted(csv_dir.glob("*.csv"))}
+
+
+def bench_load(csv_dir: Path, db_path: Path, workers: int) -> dict:
+    load_db.CSV_DIR     = csv_dir
+    load_db.DB_PATH     = db_path
+    load_db.SHADOW_PATH = db_path.with_name(db_path.name + ".shadow")
+    rows = count_rows(csv_dir)
+    started = time.perf_counter()
+    load_db.populate_db(workers=workers)
+    seconds = time.perf_counter() - started
+    return {"workers": workers, "seconds": seconds, "rows": rows,
+            "rows_per_second": sum(rows.values()) / seconds,
+            "db_bytes": db_path.stat().st_size}
+
+
+def filter_mix(db_path: Path, rng: random.Random, n: int = 12) -> dict:
+    """Query strings per router: no filter, or a random date range plus
+    sometimes a category / product / sender filter."""
+    conn = sqlite3.connect(db_path)
+    lo, hi = conn.execute("SELECT min(substr(order_date, 1, 10)), "
+                          "max(substr(order_date, 1, 10)) FROM orders").fetchone()
+    categories = [r[0] for r in conn.execute("SELECT DISTINCT category FROM products")]
+    products   = [r[0] for r in conn.execute("SELECT product_id FROM products")]
+    senders    = [r[0] for r in conn.execute(
+        "SELECT DISTINCT email_sender_name FROM campaigns")]
+    c_lo, c_hi = conn.execute("SELECT min(send_date_iso), max(send_date_iso) "
+                              "FROM campaigns").fetchone()
+    conn.close()
+
+    def dates(a, b):
+        a, b = datetime.fromisoformat(a).toordinal(), datetime.fromisoformat(b).toordinal()
+        x, y = sorted(rng.randint(a, b) for _ in range(2))
+        return (datetime.fromordinal(x).date().isoformat(),
+                datetime.fromordinal(y).date().isoformat())
+
+    commerce, campaign = [""], [""]
+    for _ in range(n):
+        d0, d1 = dates(lo, hi)
+        extra = rng.choice(["", f"&category={rng.choice(categories)}",
+                            f"&product_id={rng.choice(products)}"])
+        commerce.append(f"?data_inicial={d0}&data_final={d1}{extra}")
+        d0, d1 = dates(c_lo, c_hi)
+        extra = rng.choice(["", f"&sender={rng.choice(senders)}"])
+        campaign.append(f"?data_inicial={d0}&data_final={d1}{extra}")
+    return {"commerce": commerce, "campaigns": campaign}
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def bench_endpoints(client, routes, queries, requests: int, concurrency: int,
+                    rng: random.Random) -> dict:
+    results = {}
+    for route, tag in routes:
+        urls = [route + rng.choice(queries[tag]) for _ in range(requests)]
+
+        def hit(url):
+            started = time.perf_counter()
+            status = client.get(url).status_code
+            return time.perf_counter() - started, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(hit, urls))
+        wall = time.perf_counter() - started
+
+        ms = [s * 1000 for s, _ in samples]
+        results[route] = {
+            "requests": requests,
+            "errors":   sum(status != 200 for _, status in samples),
+            "rps":      requests / wall,
+            "p50_ms":   percentile(ms, 50),
+            "p95_ms":   percentile(ms, 95),
+            "p99_ms":   percentile(ms, 99),
+            "max_ms":   max(ms),
+        }
+        r = results[route]
+        print(f"{route:<28} {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.2f}ms  "
+              f"p95 {r['p95_ms']:7.2f}ms  p99 {r['p99_ms']:7.2f}ms  "
+              f"errors {r['errors']}")
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--factor", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--replicate", action="store_true",
+                    help="verbatim copies of the CSVs instead of sampled rows")
+    ap.add_argument("--workers", type=int, default=1, help="populate_db workers")
+    ap.add_argument("--requests", type=int, default=200, help="per route")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--cache", action="store_true", help="keep the chart cache on")
+    ap.add_argument("--out", type=Path, default=Path("bench-results.json"))
+    args = ap.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        make = scale_tables if args.replicate else (
+            lambda dst, f: generate_tables(dst, f, args.seed))
+        csv_dir = make(tmp / "tables", args.factor)
+        load = bench_load(csv_dir, tmp / "app.db", args.workers)
+        print(f"\npopulate_db: {sum(load['rows'].values()):,} rows in "
+              f"{load['seconds']:.2f}s ({load['rows_per_second']:,.0f} rows/s)\n")
+
+        db.DB_PATH = db.pool.path = load_db.DB_PATH
+
+        from fastapi.testclient import TestClient
+        import main as app_main
+        from chart_cache import cache
+        from analytics import router as commerce_router
+        from campaigns import router as campaigns_router
+
+        if not args.cache:
+            cache.max_entries = 0                 # every request computes
+        routes = [(r.path, tag)
+                  for router, tag in ((commerce_router, "commerce"),
+                                      (campaigns_router, "campaigns"))
+                  for r in router.routes if "GET" in r.methods]
+        queries = filter_mix(load_db.DB_PATH, rng)
+
+        with TestClient(app_main.app) as client:
+            endpoints = bench_endpoints(client, routes, queries,
+                                        args.requests, args.concurrency, rng)
+        db.pool.close_all()
+
+    report = {
+        "meta": {
+            "commit":      git_commit(),
+            "timestamp":   datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python":      platform.python_version(),
+            "sqlite":      sqlite3.sqlite_version,
+            "cpus":        os.cpu_count(),
+            "factor":      args.factor,
+            "generator":   "replicate" if args.replicate else "sampled",
+            "seed":        args.seed,
+            "requests":    args.requests,
+            "concurrency": args.concurrency,
+            "chart_cache": args.cache,
+        },
+        "populate_db": load,
+        "endpoints":   endpoints,
+    }
+    args.out.write_text(json.dumps(report, indent=2))
+    print(f"\nwrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# benchmarks/synth.py ─── scaled-up copies of backend/tables for benchmarks
+"""
+``scale_tables(dst, factor)`` writes every CSV of backend/tables into
+``dst`` repeated ``factor`` times, shifting the integer keys of each copy
+so primary keys stay unique and foreign keys keep pointing at the same
+copy's rows.
+
+``generate_tables(dst, factor, seed)`` samples new rows from the source
+distributions instead, so dates, senders and baskets don't repeat.
+
+    python benchmarks/synth.py --factor 100 --out /tmp/tables
+"""
+import csv
+import random
+import itertools
+import shutil
+import argparse
+from pathlib import Path
+from collections import Counter
+from datetime import datetime, timedelta
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "tables"
+
+# CSV column → key space it belongs to (shifted by that table's row span)
+KEYS = {
+    "contacts":    {"contact_id": "contacts"},
+    "products":    {"product_id": "products"},
+    "orders":      {"order_id": "orders", "contact_id": "contacts"},
+    "order_items": {"order_item_id": "order_items", "order_id": "orders",
+                    "product_id": "products"},
+    "campaigns":   {"email_job_id": "campaigns"},
+}
+UNIQUE_EMAILS = {"contacts": "email"}        # UNIQUE in SCHEMA_DDL
+
+
+def _span(path: Path, column: str) -> int:
+    with open(path, newline="", encoding="utf-8") as fh:
+        return max(int(float(r[column])) for r in csv.DictReader(fh)) + 1
+
+
+def scale_tables(dst: Path, factor: int, src: Path = SRC_DIR) -> Path:
+    dst = Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+    pk = {"contacts": "contact_id", "products": "product_id", "orders": "order_id",
+          "order_items": "order_item_id", "campaigns": "email_job_id"}
+    spans = {t: _span(src / f"{t}.csv", c) for t, c in pk.items()}
+
+    for tbl, keys in KEYS.items():
+        with open(src / f"{tbl}.csv", newline="", encoding="utf-8") as fh:
+            reader = csv.reader(fh)
+            header = next(reader)
+            rows = list(reader)
+        shift = [(header.index(col), spans[space]) for col, space in keys.items()]
+        email = header.index(UNIQUE_EMAILS[tbl]) if tbl in UNIQUE_EMAILS else None
+        with open(dst / f"{tbl}.csv", "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            for copy in range(factor):
+                for row in rows:
+                    row = list(row)
+                    for i, span in shift:
+                        if row[i]:
+                            row[i] = int(float(row[i])) + copy * span
+                    if email is not None and copy and row[email]:
+                        user, _, domain = row[email].partition("@")
+                        row[email] = f"{user}+{copy}@{domain}"
+                    writer.writerow(row)
+    return dst
+
+
+# ── realistic generator ──────────────────────────────────────────────────────
+def _read(src: Path, tbl: str) -> list[dict]:
+    with open(src / f"{tbl}.csv", newline="", encoding="utf-8") as fh:
+        return list(csv.DictReader(fh))
+
+
+def _random_time(rng, month: str) -> datetime:
+    """A uniformly random instant inside ``month`` ('YYYY-MM')."""
+    start = datetime.strptime(month, "%Y-%m")
+    end   = (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(seconds=rng.randrange(int((end - start).total_seconds())))
+
+
+def generate_tables(dst: Path, factor: int, seed: int = 0,
+                    src: Path = SRC_DIR) -> Path:
+    """
+    ``factor``× contacts, orders, order_items and campaigns sampled from the
+    empirical distributions of backend/tables, instead of verbatim copies:
+
+    • order month, orders per contact, basket size, product popularity,
+      qty and discount (unit_price / price) follow the source rows
+    • grand_total is the sum of the order's lines, as in the source
+    • campaigns pick a source campaign (sender, content, subject), a month
+      from the source send months, and jitter sends and open / click /
+      unsubscribe rates around it
+
+    The product catalog is kept as is: more customers, same shelf.
+    """
+    rng = random.Random(seed)
+    dst = Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+
+    contacts = _read(src, "contacts")
+    products = _read(src, "products")
+    orders   = _read(src, "orders")
+    items    = _read(src, "order_items")
+    camps    = _read(src, "campaigns")
+
+    price        = {p["product_id"]: float(p["price"]) for p in products}
+    per_contact  = list(Counter(o["contact_id"] for o in orders).values())
+    basket_sizes = list(Counter(i["order_id"] for i in items).values())
+    order_months = [o["order_date"][:7] for o in orders]
+    popularity   = [i["product_id"] for i in items]
+    qtys         = [i["qty"] for i in items]
+    discounts    = [float(i["unit_price"]) / price[i["product_id"]]
+                    for i in items if price.get(i["product_id"])]
+    send_months  = [f"{c['send_date'][6:10]}-{c['send_date'][3:5]}" for c in camps]
+
+    def write(tbl, header, rows):
+        with open(dst / f"{tbl}.csv", "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    # contacts: source people, unique e-mails
+    n_contacts = len(contacts) * factor
+    def contact_rows():
+        for cid in range(1, n_contacts + 1):
+            c = rng.choice(contacts)
+            user, _, domain = c["email"].partition("@")
+            created = _random_time(rng, rng.choice(order_months))
+            yield (cid, f"{user}+{cid}@{domain}", c["phone"], c["full_name"],
+                   created.isoformat(timespec="seconds"))
+    write("contacts", list(contacts[0]), contact_rows())
+
+    shutil.copyfile(src / "products.csv", dst / "products.csv")
+
+    # orders + items: each contact places a source-like number of orders
+    placed = []
+    for cid in range(1, n_contacts + 1):
+        if rng.random() < len(per_contact) / len(contacts):   # some never buy
+            for _ in range(rng.choice(per_contact)):
+                placed.append((_random_time(rng, rng.choice(order_months)), cid))
+    placed.sort()
+
+    order_rows, item_rows = [], []
+    for oid, (when, cid) in enumerate(placed, start=1):
+        total = 0.0
+        for _ in range(rng.choice(basket_sizes)):
+            pid = rng.choice(popularity)
+            qty = int(rng.choice(qtys))
+            unit = round(price[pid] * rng.choice(discounts), 2)
+            total += qty * unit
+            item_rows.append((len(item_rows) + 1, oid, pid, qty, unit))
+        order_rows.append((oid, cid, when.isoformat(timespec="seconds"),
+                           round(total, 2)))
+    write("orders", list(orders[0]), order_rows)
+    write("order_items", list(items[0]), item_rows)
+
+    # campaigns: jitter a source campaign's volume and rates
+    def campaign_rows():
+        for n in range(len(camps) * factor):
+            c     = rng.choice(camps)
+            sends = max(1, int(int(c["email_sends"]) * rng.lognormvariate(0, 0.3)))
+            opens = min(sends, int(sends * int(c["email_unique_opens"])
+                                   / int(c["email_sends"]) * rng.uniform(0.8, 1.2)))
+            clicks = min(opens, int(opens * int(c["email_unique_clicks"])
+                                    / max(int(c["email_unique_opens"]), 1)
+                                    * rng.uniform(0.8, 1.2)))
+            unsubs = min(sends, int(sends * int(c["email_unique_unsubscribes"])
+                                    / int(c["email_sends"]) * rng.uniform(0.8, 1.2)))
+            sent = _random_time(rng, rng.choice(send_months))
+            yield (sent.strftime("%d/%m/%Y"), 4_000_000 + n, c["email_sender_name"],
+                   c["email_content_name"], c["email_subject"],
+                   sends, opens, clicks, unsubs)
+    write("campaigns", list(camps[0]), campaign_rows())
+    return dst
+
+
+def generate_campaigns(dst: Path, rows: int, senders: int, seed: int = 0,
+                       skew: float = 1.1, src: Path = SRC_DIR) -> Path:
+    """
+    ``rows`` campaigns spread over ``senders`` synthetic sender names with
+    Zipf(``skew``) popularity – a high-cardinality, long-tailed sender mix –
+    with send months and volumes sampled from backend/tables. The other
+    tables are copied as they are.
+    """
+    rng = random.Random(seed)
+    dst = Path(dst)
+    dst.mkdir(parents=True, exist_ok=True)
+    for tbl in KEYS:
+        if tbl != "campaigns":
+            shutil.copyfile(src / f"{tbl}.csv", dst / f"{tbl}.csv")
+
+    camps  = _read(src, "campaigns")
+    names  = [f"Remetente {rank:06d}" for rank in range(1, senders + 1)]
+    weights = list(itertools.accumulate(1 / rank ** skew
+                                        for rank in range(1, senders + 1)))
+    months = sorted({f"{c['send_date'][6:10]}-{c['send_date'][3:5]}" for c in camps})
+    days   = [(datetime.strptime(m, "%Y-%m") + timedelta(days=d)).strftime("%d/%m/%Y")
+              for m in months for d in range(28)]
+
+    with open(dst / "campaigns.csv", "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(list(camps[0]))
+        batch = 100_000
+        for start in range(0, rows, batch):
+            n = min(batch, rows - start)
+            picks = rng.choices(names, cum_weights=weights, k=n)
+            for i, (sender, c) in enumerate(zip(picks, rng.choices(camps, k=n))):
+                sends = int(c["email_sends"])
+                writer.writerow((rng.choice(days), 4_000_000 + start + i, sender,
+                                 c["email_content_name"], c["email_subject"], sends,
+                                 c["email_unique_opens"], c["email_unique_clicks"],
+                                 c["email_unique_unsubscribes"]))
+    return dst
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--factor", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--replicate", action="store_true",
+                    help="verbatim copies (scale_tables) instead of sampling")
+    args = ap.parse_args()
+    if args.replicate:
+        scale_tables(args.out, args.factor)
+    else:
+        generate_tables(args.out, args.factor, args.seed)
+    for path in sorted(args.out.glob("*.csv")):
+        with open(path, encoding="utf-8") as fh:
+            print(f"{path.name:<16} {sum(1 for _ in fh) - 1:>12,} rows")
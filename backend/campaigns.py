@@ -1,17 +1,19 @@
 # campaigns.py ─── email marketing dashboards
-import sqlite3, logging
-from pathlib import Path
-from fastapi import APIRouter, Query, HTTPException
+import json
+import logging
+from fastapi import APIRouter, Query, HTTPException, Request
+
+from db import connection
+from querylog import query
+from executors import Saturated
+from chart_cache import serve_chart
+from rollups import month_span, month_split, rollup_filters
+import columnar
+import sketches
 
 router = APIRouter(prefix="/charts", tags=["campaigns"])
 logger = logging.getLogger("campaigns")
 
-DB_PATH = Path(__file__).with_name("app.db")
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 # ── helpers ──────────────────────────────────────────────────────────────────
 def build_campaign_filters(
     data_inicial: str | None = None,
@@ -25,140 +27,342 @@ def build_campaign_filters(
         conds.append("email_sender_name = ?")
         params.append(sender)
 
-    # convert dd/mm/YYYY to ISO for date()
-    def to_iso_col(col="send_date"):
-        #  30/03/2025 → 2025-03-30
-        return (
-            f"substr({col}, 7, 4) || '-' || "
-            f"substr({col}, 4, 2) || '-' || "
-            f"substr({col}, 1, 2)"
-        )
-
+    # send_date_iso is written by load_db.py, so these are plain range
+    # predicates on idx_campaigns_date_sender (date() only touches the param)
     if data_inicial:
-        conds.append(f"date({to_iso_col()}) >= date(?)")
+        conds.append("send_date_iso >= date(?)")
         params.append(data_inicial)
     if data_final:
-        conds.append(f"date({to_iso_col()}) <= date(?)")
+        conds.append("send_date_iso <= date(?)")
         params.append(data_final)
 
     return (" AND ".join(conds), params)
 
+# column names of the raw table vs. the campaigns_monthly rollup (load_db.py)
+RAW_COLS = {
+    "mes":    "substr(send_date_iso, 1, 7)",
+    "sends":  "email_sends",
+    "opens":  "email_unique_opens",
+    "clicks": "email_unique_clicks",
+    "unsubs": "email_unique_unsubscribes",
+}
+ROLLUP_COLS = {k: k for k in RAW_COLS}
+
+# what each chart selects per month, in monthly_sql's {placeholder} names;
+# rates come out as rounded percentages, so rows go to the client as they are
+MEASURES = {
+    "email-volume":     "SUM({sends}) AS sends",
+    "email-engagement": "COALESCE(ROUND(SUM({opens}) * 1.0 / SUM({sends}) * 100, 2), 0)"
+                        " AS open_rate, "
+                        "COALESCE(ROUND(SUM({clicks}) * 1.0 / NULLIF(SUM({opens}),0)"
+                        " * 100, 2), 0) AS click_rate",
+    "email-unsub-rate": "COALESCE(ROUND(SUM({unsubs})*1.0 / SUM({sends}) * 100, 3), 0)"
+                        " AS unsub_rate",
+    "campaign-bundle":  "SUM({sends}) AS sends, SUM({opens}) AS opens, "
+                        "SUM({clicks}) AS clicks, SUM({unsubs}) AS unsubs",
+}
+# what /email-sender-mix selects per sender, in the same placeholder names
+SENDER_MIX_MEASURES = ("SUM({sends}) AS sends, "
+                       "COALESCE(ROUND(SUM({opens})*1.0 / SUM({sends}) * 100, 2), 0)"
+                       " AS open_rate")
+
+def monthly_sql(measures: str, data_inicial, data_final, sender,
+                by_sender: bool = False):
+    """
+    ``SELECT mes, <measures> … GROUP BY mes`` over campaigns_monthly when the
+    range covers whole months, over the raw campaigns table otherwise.
+    ``measures`` names columns as {sends}, {opens}, {clicks}, {unsubs};
+    ``by_sender`` adds a ``sender`` column to the grouping.
+    """
+    span = month_span(data_inicial, data_final)
+    if span is not None:
+        where, params = rollup_filters(span, email_sender_name=sender)
+        cols, table = ROLLUP_COLS, "campaigns_monthly"
+    else:
+        where, params = build_campaign_filters(data_inicial, data_final, sender)
+        cols, table = RAW_COLS, "campaigns"
+    group = "mes, sender" if by_sender else "mes"
+    sql = (f"SELECT {cols['mes']} AS mes, "
+           f"{'email_sender_name AS sender, ' if by_sender else ''}"
+           f"{measures.format(**cols)} FROM {table}")
+    if where:
+        sql += f" WHERE {where}"
+    sql += f" GROUP BY {group} ORDER BY mes;"
+    return sql, params
+
 # ── 1) Volume por mês ────────────────────────────────────────────────────────
+def _email_volume(data_inicial, data_final, sender):
+    if columnar.enabled():
+        return columnar.email_volume(data_inicial, data_final, sender)
+    sql, params = monthly_sql(
+        MEASURES["email-volume"], data_inicial, data_final, sender)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    return {"data": [dict(r) for r in rows]}
+
 @router.get("/email-volume")
-def email_volume(
+async def email_volume(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
     sender:       str | None = Query(None),
 ):
     """Total de envios por mês."""
-    conn = get_conn()
     try:
-        where, params = build_campaign_filters(data_inicial, data_final, sender)
-        sql = (
-            "SELECT strftime('%Y-%m', "
-            "        substr(send_date,7,4)||'-'||substr(send_date,4,2)||'-'||substr(send_date,1,2)) AS mes, "
-            "SUM(email_sends) AS sends "
-            "FROM campaigns"
-        )
-        if where:
-            sql += f" WHERE {where}"
-        sql += " GROUP BY mes ORDER BY mes;"
-        rows = conn.execute(sql, params).fetchall()
-        return {"data": [dict(r) for r in rows]}
+        return await serve_chart(request, _email_volume,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 sender=sender)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/email-volume")
         raise HTTPException(500)
-    finally:
-        conn.close()
 
 # ── 2) Engajamento por mês ───────────────────────────────────────────────────
+def _email_engagement(data_inicial, data_final, sender):
+    if columnar.enabled():
+        return columnar.email_engagement(data_inicial, data_final, sender)
+    sql, params = monthly_sql(
+        MEASURES["email-engagement"], data_inicial, data_final, sender)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    return {"data": [dict(r) for r in rows]}
+
 @router.get("/email-engagement")
-def email_engagement(
+async def email_engagement(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
     sender:       str | None = Query(None),
 ):
     """Taxas de abertura e clique % por mês."""
-    conn = get_conn()
     try:
-        where, params = build_campaign_filters(data_inicial, data_final, sender)
-        sql = (
-            "SELECT strftime('%Y-%m', "
-            "        substr(send_date,7,4)||'-'||substr(send_date,4,2)||'-'||substr(send_date,1,2)) AS mes, "
-            "SUM(email_unique_opens) * 1.0 / SUM(email_sends)  AS open_rate, "
-            "SUM(email_unique_clicks) * 1.0 / NULLIF(SUM(email_unique_opens),0) AS click_rate "
-            "FROM campaigns"
-        )
-        if where:
-            sql += f" WHERE {where}"
-        sql += " GROUP BY mes ORDER BY mes;"
-        rows = conn.execute(sql, params).fetchall()
-        return {"data": [
-            {"mes": r["mes"],
-             "open_rate": round(r["open_rate"] * 100, 2) if r["open_rate"] is not None else 0,
-             "click_rate": round(r["click_rate"] * 100, 2) if r["click_rate"] is not None else 0}
-            for r in rows]}
+        return await serve_chart(request, _email_engagement,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 sender=sender)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/email-engagement")
         raise HTTPException(500)
-    finally:
-        conn.close()
 
 # ── 3) Mix por remetente ─────────────────────────────────────────────────────
+SENDER_MIX_TOP = 10
+
+def email_sender_mix_sql(data_inicial=None, data_final=None):
+    where, params = build_campaign_filters(data_inicial, data_final)
+    sql = (f"SELECT email_sender_name AS sender, "
+           f"{SENDER_MIX_MEASURES.format(**RAW_COLS)} FROM campaigns")
+    if where:
+        sql += f" WHERE {where}"
+    return sql + f" GROUP BY sender ORDER BY sends DESC LIMIT {SENDER_MIX_TOP};", params
+
+# ?approx=true: candidates from the per-month top-sender summaries
+# (sketches.py), recounted exactly from the rollup for whole months and
+# from the raw table for the days at either end
+SKETCH_SQL = ("SELECT mes, email_sender_name, sends FROM sender_sketch"
+              "{where};")
+SKETCH_MONTHS_SQL = "SELECT mes, floor FROM sender_sketch_month{where};"
+def sender_recount_sql(span, edges, senders: list):
+    """
+    Exact sends / open rate of ``senders`` over ``month_split``'s pieces.
+    On the rollup the candidate list drives the join (one index seek per
+    sender); the edge days are read in one pass over their date range.
+    """
+    names = json.dumps([s for s in senders if s is not None])
+    pieces = []                           # (table, sends, opens, where, params)
+    if span is not None:
+        where, span_params = rollup_filters(span)
+        pieces.append(("campaigns_monthly", "sends", "opens", where, span_params))
+    for lo, hi in edges:
+        pieces.append(("campaigns", "email_sends", "email_unique_opens",
+                       "send_date_iso >= date(?) AND send_date_iso <= date(?)",
+                       [lo, hi]))
+    parts, params = [], []
+    for table, sends, opens, where, piece_params in pieces:
+        if table == "campaigns_monthly":
+            picks = [("json_each(?) AS j CROSS JOIN campaigns_monthly",
+                      "email_sender_name = j.value", [names])]
+        else:
+            picks = [(table, "email_sender_name IN (SELECT value FROM json_each(?) AS j)",
+                      [names])]
+        if None in senders:
+            picks.append((table, "email_sender_name IS NULL", []))
+        for source, cond, pick_params in picks:
+            parts.append(f"SELECT email_sender_name AS sender, {sends} AS sends, "
+                         f"{opens} AS opens FROM {source} "
+                         f"WHERE {cond}" + (f" AND {where}" if where else ""))
+            params += [*pick_params, *piece_params]
+    sql = (f"SELECT sender, {SENDER_MIX_MEASURES.format(**ROLLUP_COLS)} "
+           f"FROM ({' UNION ALL '.join(parts)}) "
+           f"GROUP BY sender ORDER BY sends DESC LIMIT {SENDER_MIX_TOP};")
+    return sql, params
+
+def sender_sketch_sql(data_inicial=None, data_final=None):
+    """(summaries sql, floors sql, params) of every month the range touches."""
+    where, params = rollup_filters((data_inicial and data_inicial[:7],
+                                    data_final and data_final[:7]))
+    where = f" WHERE {where}" if where else ""
+    return SKETCH_SQL.format(where=where), SKETCH_MONTHS_SQL.format(where=where), params
+
+def _email_sender_mix_approx(data_inicial, data_final):
+    split = month_split(data_inicial, data_final)
+    if split is None or split[0] is None:
+        # not a date, or no whole month: the recount would read the same
+        # raw rows as the exact query, so answer exactly
+        return None
+    span, edges = split
+    sketch_sql, months_sql, params = sender_sketch_sql(data_inicial, data_final)
+    with connection() as conn:
+        entries = query(conn, sketch_sql, params)
+        months  = query(conn, months_sql, params)
+        whole = {m["mes"] for m in months
+                 if (span[0] is None or m["mes"] >= span[0])
+                 and (span[1] is None or m["mes"] <= span[1])}
+        senders, missed = sketches.candidates(
+            [tuple(e) for e in entries], [tuple(m) for m in months],
+            whole, SENDER_MIX_TOP)
+        rows = []
+        if senders:
+            sql, params = sender_recount_sql(span, edges, senders)
+            rows = [dict(r) for r in query(conn, sql, params)]
+    complete = len(rows) == SENDER_MIX_TOP
+    return {"data": rows,
+            "approx": {"candidates": len(senders),
+                       "max_missed_sends": missed,
+                       "exact": missed == 0 or (complete and rows[-1]["sends"] >= missed)}}
+
+def _email_sender_mix(data_inicial, data_final, approx=None):
+    if approx:
+        result = _email_sender_mix_approx(data_inicial, data_final)
+        if result is not None:
+            return result
+    if columnar.enabled():
+        return columnar.email_sender_mix(data_inicial, data_final)
+    sql, params = email_sender_mix_sql(data_inicial, data_final)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    return {"data": [dict(r) for r in rows]}
+
 @router.get("/email-sender-mix")
-def email_sender_mix(
+async def email_sender_mix(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
+    approx:       bool       = Query(False),
 ):
-    """Top 10 remetentes por volume + % abertura."""
-    conn = get_conn()
+    """
+    Top 10 remetentes por volume + % abertura. ``approx=true`` escolhe os
+    candidatos pelos resumos mensais (sketches.py), reconta-os exatamente e
+    devolve em ``approx`` o máximo que um remetente ausente poderia ter.
+    Sem nenhum mês inteiro no intervalo, a resposta é a exata (sem ``approx``).
+    """
     try:
-        where, params = build_campaign_filters(data_inicial, data_final)
-        sql = (
-            "SELECT email_sender_name AS sender, "
-            "       SUM(email_sends)  AS sends, "
-            "       SUM(email_unique_opens)*1.0 / SUM(email_sends) AS open_rate "
-            "FROM campaigns"
-        )
-        if where:
-            sql += f" WHERE {where}"
-        sql += " GROUP BY sender ORDER BY sends DESC LIMIT 10;"
-        rows = conn.execute(sql, params).fetchall()
-        return {"data": [
-            {"sender": r["sender"],
-             "sends": r["sends"],
-             "open_rate": round(r["open_rate"] * 100, 2)} for r in rows]}
+        return await serve_chart(request, _email_sender_mix,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 approx=approx or None)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/email-sender-mix")
         raise HTTPException(500)
-    finally:
-        conn.close()
 
 # ── 4) Taxa de descadastro ──────────────────────────────────────────────────
+def _email_unsub_rate(data_inicial, data_final, sender):
+    if columnar.enabled():
+        return columnar.email_unsub_rate(data_inicial, data_final, sender)
+    sql, params = monthly_sql(
+        MEASURES["email-unsub-rate"], data_inicial, data_final, sender)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    return {"data": [dict(r) for r in rows]}
+
 @router.get("/email-unsub-rate")
-def email_unsub_rate(
+async def email_unsub_rate(
+    request:      Request,
     data_inicial: str | None = Query(None),
     data_final:   str | None = Query(None),
     sender:       str | None = Query(None),
 ):
     """% descadastro por mês."""
-    conn = get_conn()
     try:
-        where, params = build_campaign_filters(data_inicial, data_final, sender)
-        sql = (
-            "SELECT strftime('%Y-%m', "
-            "        substr(send_date,7,4)||'-'||substr(send_date,4,2)||'-'||substr(send_date,1,2)) AS mes, "
-            "SUM(email_unique_unsubscribes)*1.0 / SUM(email_sends) AS unsub_rate "
-            "FROM campaigns"
-        )
-        if where:
-            sql += f" WHERE {where}"
-        sql += " GROUP BY mes ORDER BY mes;"
-        rows = conn.execute(sql, params).fetchall()
-        return {"data": [
-            {"mes": r["mes"], "unsub_rate": round(r["unsub_rate"] * 100, 3)} for r in rows]}
+        return await serve_chart(request, _email_unsub_rate,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 sender=sender)
+    except Saturated:
+        raise
     except Exception:
         logger.exception("Error in /charts/email-unsub-rate")
         raise HTTPException(500)
-    finally:
-        conn.close()
+
+# ── Campaign bundle: all four charts from one grouped pass ──────────────────
+def campaign_bundle_sql(data_inicial=None, data_final=None, sender=None):
+    """
+    One (month × sender) aggregate grouped twice: by month, with the sender
+    filter, and by sender, without it (/email-sender-mix ignores it). Both
+    use the single charts' MEASURES, so the rates are rounded by SQLite
+    exactly as there. Rows are (chart, name, sends, open_rate, click_rate,
+    unsub_rate) with chart 'mes' then 'sender', each part in its chart's order.
+    """
+    grouped, params = monthly_sql(
+        MEASURES["campaign-bundle"], data_inicial, data_final, None,
+        by_sender=True)
+    monthly = ", ".join(MEASURES[chart] for chart in
+                        ("email-volume", "email-engagement", "email-unsub-rate"))
+    where = ""
+    if sender:
+        where = " WHERE sender = ?"
+        params = [*params, sender]
+    sql = (f"WITH by_sender AS ({grouped.rstrip(';')}) "
+           f"SELECT * FROM (SELECT 'mes' AS chart, mes AS name, "
+           f"{monthly.format(**ROLLUP_COLS)} FROM by_sender{where} "
+           f"GROUP BY mes ORDER BY mes) "
+           f"UNION ALL "
+           f"SELECT * FROM (SELECT 'sender', sender, "
+           f"{SENDER_MIX_MEASURES.format(**ROLLUP_COLS)}, NULL, NULL FROM by_sender "
+           f"GROUP BY sender ORDER BY sends DESC LIMIT {SENDER_MIX_TOP});")
+    return sql, params
+
+def _campaign_bundle(data_inicial, data_final, sender):
+    if columnar.enabled():
+        return columnar.campaign_bundle(data_inicial, data_final, sender)
+    sql, params = campaign_bundle_sql(data_inicial, data_final, sender)
+    with connection() as conn:
+        rows = query(conn, sql, params)
+    months  = [r for r in rows if r["chart"] == "mes"]
+    senders = [r for r in rows if r["chart"] == "sender"]
+    return {"data": {
+        "email_volume": [
+            {"mes": r["name"], "sends": r["sends"]} for r in months],
+        "email_engagement": [
+            {"mes": r["name"], "open_rate": r["open_rate"],
+             "click_rate": r["click_rate"]} for r in months],
+        "email_sender_mix": [
+            {"sender": r["name"], "sends": r["sends"], "open_rate": r["open_rate"]}
+            for r in senders],
+        "email_unsub_rate": [
+            {"mes": r["name"], "unsub_rate": r["unsub_rate"]} for r in months],
+    }}
+
+@router.get("/campaign-bundle")
+async def campaign_bundle(
+    request:      Request,
+    data_inicial: str | None = Query(None),
+    data_final:   str | None = Query(None),
+    sender:       str | None = Query(None),
+):
+    """/email-volume, /email-engagement, /email-sender-mix e /email-unsub-rate numa resposta."""
+    try:
+        return await serve_chart(request, _campaign_bundle,
+                                 data_inicial=data_inicial,
+                                 data_final=data_final,
+                                 sender=sender)
+    except Saturated:
+        raise
+    except Exception:
+        logger.exception("Error in /charts/campaign-bundle")
+        raise HTTPException(500)
@@ -0,0 +1,240 @@
+# chart_cache.py ─── in-process LRU/TTL result cache for the /charts/* routers
+"""
+Dashboards ask for the same few filter combinations over and over, so the
+chart routers go through ``serve_chart`` instead of querying directly:
+
+• key  = request path + normalized filters (None / "" dropped, dates ISO)
+• each entry remembers the app.db generation it was computed against;
+  load_db.populate_db() bumps that generation, which empties the cache
+• ETag = build id + generation + key, so a browser revalidating an
+  unchanged chart gets ``304 Not Modified`` before we even look at the
+  cache (the build id because a recreated app.db restarts the generation)
+• misses are single-flight: identical requests that arrive while the
+  first one is still computing wait for its result instead of each
+  running the query (``flights``; CHART_SINGLE_FLIGHT=0 turns it off)
+• entries are ``responses.Body``: the JSON (``?format=rows|columns``) and
+  its gzip / brotli forms are encoded once per entry, not per request
+• after a rebuild, warmer.py fills the cache with the dashboard presets
+  through ``warm`` before most users ask
+
+Tune with CHART_CACHE_SIZE / CHART_CACHE_TTL; counters live at
+GET /stats/chart-cache.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+import metrics
+import responses
+from db import build_id, generation
+from executors import db_executor
+
+CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "1024"))
+CACHE_TTL  = float(os.getenv("CHART_CACHE_TTL", "300"))      # seconds
+SINGLE_FLIGHT = os.getenv("CHART_SINGLE_FLIGHT", "1") != "0"
+
+
+class ChartCache:
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self._entries: OrderedDict = OrderedDict()    # key → (expires, Body)
+        self._generation = None
+        self._lock  = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0,
+                       "expirations": 0, "invalidations": 0}
+
+    def _sync_generation(self, gen: int) -> None:
+        if gen != self._generation:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._generation = gen
+
+    def get(self, key, gen: int):
+        with self._lock:
+            self._sync_generation(gen)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, gen: int, payload, ttl: float | None = None) -> None:
+        with self._lock:
+            if self._generation is not None and gen < self._generation:
+                return                    # computed before a rebuild landed
+            self._sync_generation(gen)
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def contains(self, key, gen: int) -> bool:
+        """Like ``get`` is not None, without counting a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (gen == self._generation and entry is not None
+                    and entry[0] >= time.monotonic())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats,
+                    "entries":     len(self._entries),
+                    "max_entries": self.max_entries,
+                    "ttl":         self.ttl,
+                    "generation":  self._generation}
+
+
+cache = ChartCache()
+
+
+class SingleFlight:
+    """
+    One computation per key at a time, shared by every caller that asks
+    while it runs. The work is its own task and callers await it through
+    ``shield``, so a client that disconnects does not cancel the others.
+    Lives on the event loop: no locks needed.
+    """
+
+    def __init__(self, enabled: bool = SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._inflight: dict = {}                     # key → asyncio.Task
+        self._stats = {"computations": 0, "coalesced": 0}
+
+    async def run(self, key, endpoint: str, fn, *args, **kwargs):
+        if not self.enabled:
+            self._stats["computations"] += 1
+            return await fn(*args, **kwargs)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self._stats["computations"] += 1
+        else:
+            self._stats["coalesced"] += 1
+            metrics.CHART_COALESCED.inc(endpoint=endpoint)
+        return await asyncio.shield(task)
+
+    def _done(self, key, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()          # retrieved, even if every caller left
+
+    def stats(self) -> dict:
+        return {**self._stats, "enabled": self.enabled,
+                "in_flight": len(self._inflight)}
+
+
+flights = SingleFlight()
+
+
+# ── helpers ──────────────────────────────────────────────────────────────────
+def normalize_filters(filters: dict) -> dict:
+    """Drop empty filters and spell dates one way, so equal requests share a key."""
+    out = {}
+    for name, value in filters.items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if name.startswith("data_"):
+                try:
+                    value = date.fromisoformat(value[:10]).isoformat()
+                except ValueError:
+                    pass
+        out[name] = value
+    return out
+
+
+def cache_key(endpoint: str, filters: dict) -> tuple:
+    return (endpoint, tuple(sorted(filters.items())))
+
+
+def make_etag(build: str, gen: int, key: tuple, fmt: str = "rows") -> str:
+    if fmt != "rows":                 # the default keeps the digests it always had
+        key = (*key, fmt)
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    return f'W/"{build}-{gen}-{digest}"' if build else f'W/"{gen}-{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+async def serve_chart(request: Request, compute, **filters) -> Response:
+    """
+    Answer a chart request from the cache, or run ``compute(**filters)`` on
+    the DB executor – once for all identical concurrent requests – and
+    remember the result for the current DB generation.
+    """
+    fmt = request.query_params.get("format", "rows")
+    if fmt not in responses.FORMATS:
+        return JSONResponse({"detail": f"format must be one of {responses.FORMATS}"},
+                            status_code=400)
+    normalized = normalize_filters(filters)
+    gen     = generation()
+    key     = cache_key(request.url.path, normalized)
+    etag    = make_etag(build_id(), gen, key, fmt)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = cache.get(key, gen)
+    if body is None:
+        args = {name: normalized.get(name) for name in filters}
+        body = await flights.run((gen, key), request.url.path,
+                                 _compute_and_store, key, gen, compute, args)
+    return responses.render(body, fmt, request.headers.get("accept-encoding"), headers)
+
+
+async def warm(path: str, compute, executor, **filters) -> bool:
+    """
+    Compute and cache the chart ``serve_chart`` would answer for ``path`` +
+    ``filters``, on ``executor``; False if it was cached already. A live
+    request for the same chart meanwhile waits for this computation. The
+    entry does not expire; only a rebuild or LRU eviction drops it.
+    """
+    normalized = normalize_filters(filters)
+    gen = generation()
+    key = cache_key(path, normalized)
+    if cache.contains(key, gen):
+        return False
+    args = {name: normalized.get(name) for name in filters}
+    await flights.run((gen, key), path, _compute_and_store,
+                      key, gen, compute, args, executor, float("inf"))
+    return True
+
+
+async def _compute_and_store(key, gen: int, compute, args: dict,
+                             executor=db_executor, ttl: float | None = None
+                             ) -> responses.Body:
+    body = responses.Body(await executor.run(compute, **args))
+    cache.put(key, gen, body, ttl)
+    return body
@@ -0,0 +1,178 @@
+# chat_cache.py ─── two-level cache for the /chat (LLM) path
+"""
+Users repeat the same questions word for word, and every repeat used to
+cost a full crew kickoff (seconds of LLM latency plus tokens).
+
+• ``answers``     – normalized question  → the /chat JSON reply
+• ``sql_results`` – normalized SQL text  → the ``query_sql`` tool output
+
+Both are bounded LRUs keyed on the app.db generation, so a rebuild by
+load_db.py invalidates them. Set CHAT_CACHE_DB=<file> to write entries
+through to a local SQLite file as well, so they survive restarts.
+
+``cached_kickoff`` takes the crew as an argument, so a stub with a
+``kickoff()`` method is all a test needs – no network involved.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import metrics
+from db import generation
+
+ANSWER_ENTRIES = int(os.getenv("CHAT_CACHE_ANSWERS", "512"))
+SQL_ENTRIES    = int(os.getenv("CHAT_CACHE_SQL", "1024"))
+CACHE_DB       = os.getenv("CHAT_CACHE_DB")          # optional persistence
+
+
+# ── normalization ────────────────────────────────────────────────────────────
+def normalize_question(text: str) -> str:
+    """'  Faturamento por mês em 2024? ' → 'faturamento por mês em 2024'."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(text.split()).rstrip(" ?!.")
+
+
+_SQL_LITERALS = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and keyword case outside string literals."""
+    parts = _SQL_LITERALS.split(sql.strip().rstrip(";").strip())
+    return "".join(
+        part if i % 2 else " ".join(part.split()).lower()
+        for i, part in enumerate(parts))
+
+
+# ── storage ──────────────────────────────────────────────────────────────────
+class _DiskStore:
+    """Write-through SQLite file behind the in-memory LRUs."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_cache ("
+            " kind TEXT, key TEXT, generation INTEGER, value TEXT,"
+            " used REAL, PRIMARY KEY (kind, key))")
+
+    def get(self, kind: str, key: str, gen: int):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM chat_cache "
+                "WHERE kind = ? AND key = ? AND generation = ?",
+                (kind, key, gen)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, kind: str, key: str, gen: int, value, keep: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_cache VALUES (?, ?, ?, ?, ?)",
+                (kind, key, gen, json.dumps(value, default=str), time.time()))
+            # same bound as the memory LRU; stale generations go first
+            self._conn.execute(
+                "DELETE FROM chat_cache WHERE kind = ? AND key NOT IN ("
+                " SELECT key FROM chat_cache WHERE kind = ? AND generation = ?"
+                " ORDER BY used DESC LIMIT ?)",
+                (kind, kind, gen, keep))
+
+
+class GenerationLRU:
+    def __init__(self, kind: str, max_entries: int, disk: _DiskStore | None = None):
+        self.kind        = kind
+        self.max_entries = max_entries
+        self._disk       = disk
+        self._entries: OrderedDict = OrderedDict()
+        self._generation = None
+        self._lock  = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0,
+                       "evictions": 0, "invalidations": 0}
+
+    def _sync_generation(self, gen: int) -> None:
+        if gen != self._generation:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._generation = gen
+
+    def _remember(self, key: str, value) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str, gen: int):
+        with self._lock:
+            self._sync_generation(gen)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+        value = self._disk.get(self.kind, key, gen) if self._disk else None
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["disk_hits"] += 1
+                if gen == self._generation:
+                    self._remember(key, value)
+        return value
+
+    def put(self, key: str, gen: int, value) -> None:
+        with self._lock:
+            self._sync_generation(gen)
+            self._remember(key, value)
+        if self._disk:
+            self._disk.put(self.kind, key, gen, value, self.max_entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries),
+                    "max_entries": self.max_entries,
+                    "generation": self._generation}
+
+
+_disk       = _DiskStore(CACHE_DB) if CACHE_DB else None
+answers     = GenerationLRU("answer", ANSWER_ENTRIES, _disk)
+sql_results = GenerationLRU("sql", SQL_ENTRIES, _disk)
+
+
+# ── entry points ─────────────────────────────────────────────────────────────
+def cached_sql(query: str, run) -> str:
+    """``run(query)`` → JSON text, memoized on the normalized SQL. Errors are not cached."""
+    key, gen = normalize_sql(query), generation()
+    hit = sql_results.get(key, gen)
+    if hit is not None:
+        return hit
+    out = run(query)
+    if not out.startswith('{"error"'):
+        sql_results.put(key, gen, out)
+    return out
+
+
+def cached_kickoff(crew, message: str) -> dict:
+    """The /chat reply for ``message``, from cache or from ``crew.kickoff``."""
+    key, gen = normalize_question(message), generation()
+    hit = answers.get(key, gen)
+    if hit is not None:
+        return hit
+    started, outcome = time.perf_counter(), "error"
+    try:
+        out = crew.kickoff({"input": message}).dict()
+        outcome = "ok"
+    finally:
+        metrics.KICKOFF_SECONDS.observe(time.perf_counter() - started,
+                                        outcome=outcome)
+    answers.put(key, gen, out)
+    return out
+
+
+def stats() -> dict:
+    return {"answers": answers.stats(), "sql_results": sql_results.stats(),
+            "persistent": CACHE_DB}
@@ -0,0 +1,90 @@
+# chat_events.py ─── progress events from a running crew, for /chat/stream
+"""
+While a crew works, the code it calls reports what it is doing:
+
+• ``sql``       – {"query": ...}            the SELECT the agent generated
+• ``rows``      – {"rows": [...]}           result rows, ROW_BATCH at a time
+• ``reasoning`` – {"text": ...}             LLM tokens as they stream in
+
+``emit()`` hands each event to the sink installed with ``capture()`` for the
+current context, and is a no-op otherwise, so plain /chat pays nothing. The
+sink travels into the crew's worker thread with the request context (see
+executors.BoundedExecutor.submit).
+
+``EventStream`` is that sink for an SSE response: events are pushed from
+worker threads onto the event loop and written out as
+``event: <name>\\ndata: <json>\\n\\n``, ending with ``final`` (the /chat
+reply) or ``error``, then ``done``.
+"""
+import json
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ROW_BATCH = 200
+
+logger = logging.getLogger("chat_events")
+
+_sink: ContextVar = ContextVar("chat_event_sink", default=None)
+
+
+def emit(event: str, data: dict) -> None:
+    sink = _sink.get()
+    if sink is not None:
+        sink(event, data)
+
+
+def listening() -> bool:
+    return _sink.get() is not None
+
+
+def emit_rows(rows: list) -> None:
+    for i in range(0, len(rows), ROW_BATCH):
+        emit("rows", {"rows": rows[i:i + ROW_BATCH]})
+
+
+@contextmanager
+def capture(sink):
+    """Send events emitted in this context (and work submitted from it) to ``sink``."""
+    token = _sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _sink.reset(token)
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class EventStream:
+    """Thread-safe sink that turns emitted events into an SSE body."""
+
+    def __init__(self):
+        self._loop  = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def __call__(self, event: str, data: dict) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (event, data))
+
+    async def body(self, job: asyncio.Future):
+        """Relay events until ``job`` finishes, then its result as ``final``."""
+        while not job.done():
+            getter = asyncio.ensure_future(self._queue.get())
+            await asyncio.wait({getter, job}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break
+            yield sse(*getter.result())
+
+        # events emitted before the job returned are already queued
+        while not self._queue.empty():
+            yield sse(*self._queue.get_nowait())
+
+        try:
+            yield sse("final", job.result())
+        except Exception as exc:
+            logger.exception("Error in /chat/stream")
+            yield sse("error", {"detail": str(exc) or type(exc).__name__})
+        yield sse("done", {})
@@ -0,0 +1,424 @@
+# columnar.py ─── optional NumPy engine for the /charts/* aggregations
+"""
+app.db only changes when load_db.py rebuilds it, so the chart tables can
+live in memory as column arrays and every chart becomes a masked
+``np.bincount`` over a dense month (or category / sender / contact) code
+instead of a SQL scan:
+
+• dates   → int64 days since 1970-01-01 (NaT where the text is NULL)
+• months  → dense code into ``months`` ('YYYY-MM' labels, sorted)
+• category, email_sender_name, contact_id → dictionary codes
+
+NULL is a group of its own, as in SQL's GROUP BY: a NULL month, category
+or sender gets code 0 and label None (sorted first, like ORDER BY), and a
+sum over only NULL values is None, not 0.
+
+Enable with CHART_ENGINE=numpy. The snapshot is loaded on first use and
+reloaded when the app.db generation changes. Results match the SQLite
+path (benchmarks/bench_columnar.py checks every chart); float sums can
+differ in the last ulp because the summation order differs.
+"""
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import date
+
+from db import connection, generation
+
+ENGINE = os.getenv("CHART_ENGINE", "sqlite")
+
+logger = logging.getLogger("columnar")
+
+np = None
+if ENGINE == "numpy":                    # SQLite-only workers never import NumPy
+    try:
+        import numpy as np
+    except ImportError:
+        logger.warning("CHART_ENGINE=numpy but NumPy is not installed; using SQLite")
+
+
+def enabled() -> bool:
+    return ENGINE == "numpy" and np is not None
+
+
+# ── loading ──────────────────────────────────────────────────────────────────
+def _days(texts) -> "np.ndarray":
+    """ISO date/datetime text → days since epoch (NaT for NULL)."""
+    return (np.array([t[:10] if t else "NaT" for t in texts],
+                     dtype="datetime64[D]").astype(np.int64))
+
+NAT = np.iinfo(np.int64).min if np is not None else None
+
+
+def _encode(values) -> tuple["np.ndarray", list]:
+    """Dictionary-encode ``values``: (codes, labels) with labels sorted,
+    None first when there is a NULL."""
+    labels = sorted({v for v in values if v is not None})
+    if None in values:
+        labels.insert(0, None)
+    index  = {v: i for i, v in enumerate(labels)}
+    codes  = np.fromiter((index[v] for v in values),
+                         dtype=np.int32, count=len(values))
+    return codes, labels
+
+
+def _nullable(values) -> tuple["np.ndarray", "np.ndarray"]:
+    """(values with NULL as 0, mask of the non-NULL ones)."""
+    return (np.array([v or 0 for v in values], dtype=np.int64),
+            np.fromiter((v is not None for v in values),
+                        dtype=bool, count=len(values)))
+
+
+class _MonthIndex:
+    """Dense month codes shared by orders and campaigns."""
+
+    def __init__(self, *day_arrays):
+        months = [((d[d != NAT]).astype("datetime64[D]")
+                   .astype("datetime64[M]").astype(np.int64))
+                  for d in day_arrays]
+        self.keys = np.unique(np.concatenate(months)) if months else np.array([])
+        self.labels = [str(m) for m in
+                       self.keys.astype("datetime64[M]")]
+        # a NULL date is the NULL month, code 0
+        self.null = int(any((d == NAT).any() for d in day_arrays))
+        if self.null:
+            self.labels.insert(0, None)
+
+    def code(self, days: "np.ndarray") -> "np.ndarray":
+        valid = days != NAT
+        months = np.where(valid, days, 0).astype("datetime64[D]") \
+                   .astype("datetime64[M]").astype(np.int64)
+        return np.where(valid, np.searchsorted(self.keys, months) + self.null,
+                        0).astype(np.int32)
+
+
+class Snapshot:
+    """Column arrays of orders, order_items, products and campaigns."""
+
+    def __init__(self, conn, gen: int):
+        self.generation = gen
+
+        o = conn.execute("SELECT order_id, contact_id, order_date, grand_total "
+                         "FROM orders ORDER BY order_id").fetchall()
+        order_id, contact_id, order_date, grand_total = (
+            zip(*o) if o else ((), (), (), ()))
+        self.order_id    = np.array(order_id, dtype=np.int64)
+        self.order_day   = _days(order_date)
+        total            = np.array(grand_total, dtype=np.float64)   # NULL → NaN
+        self.has_total   = ~np.isnan(total)
+        self.grand_total = np.where(self.has_total, total, 0.0)
+        self.contact, contacts = _encode(list(contact_id))
+        self.n_contacts  = len(contacts)
+        self.no_contact  = 0 if contacts and contacts[0] is None else -1
+
+        p = dict(conn.execute("SELECT product_id, category FROM products"))
+        cat_codes, self.categories = _encode(list(p.values()))
+        product_cat = dict(zip(p.keys(), cat_codes.tolist()))
+
+        # idx_order_items_product_order order: SQLite's unfiltered
+        # category-mix plan sums in this order too, so those sums agree exactly
+        i = conn.execute("SELECT order_id, product_id, qty * unit_price "
+                         "FROM order_items ORDER BY product_id, order_id"
+                         ).fetchall()
+        item_order, item_product, line_total = zip(*i) if i else ((), (), ())
+        item_order = np.array(item_order, dtype=np.int64)
+        pos = np.searchsorted(self.order_id, item_order)
+        pos = np.minimum(pos, max(len(self.order_id) - 1, 0))
+        found = (self.order_id[pos] == item_order) if len(self.order_id) else \
+                np.zeros(len(item_order), dtype=bool)
+        # inner joins: drop items whose order or product does not exist
+        self.item_order_pos = np.where(found, pos, -1)
+        self.item_product   = np.array(item_product, dtype=np.int64)
+        self.item_category  = np.fromiter(
+            (product_cat.get(pid, -1) for pid in item_product),
+            dtype=np.int32, count=len(item_product))
+        self.item_total     = np.array(line_total, dtype=np.float64)
+
+        c = conn.execute(
+            "SELECT send_date_iso, email_sender_name, email_sends, "
+            "email_unique_opens, email_unique_clicks, email_unique_unsubscribes "
+            "FROM campaigns").fetchall()
+        send_date, sender, sends, opens, clicks, unsubs = (
+            zip(*c) if c else ((),) * 6)
+        self.send_day        = _days(send_date)
+        self.sender, self.senders = _encode(list(sender))
+        self.sends,  self.has_sends  = _nullable(sends)
+        self.opens,  self.has_opens  = _nullable(opens)
+        self.clicks, self.has_clicks = _nullable(clicks)
+        self.unsubs, self.has_unsubs = _nullable(unsubs)
+
+        self.months      = _MonthIndex(self.order_day, self.send_day)
+        self.order_month = self.months.code(self.order_day)
+        self.send_month  = self.months.code(self.send_day)
+
+    def nbytes(self) -> int:
+        return sum(v.nbytes for v in vars(self).values()
+                   if isinstance(v, np.ndarray))
+
+
+_lock = threading.Lock()
+_snapshot: Snapshot | None = None
+_stats = {"loads": 0, "load_seconds": None}
+
+
+def snapshot() -> Snapshot:
+    """The snapshot for the current app.db generation, (re)loading if needed."""
+    global _snapshot
+    gen = generation()
+    snap = _snapshot
+    if snap is not None and snap.generation == gen:
+        return snap
+    with _lock:
+        if _snapshot is None or _snapshot.generation != gen:
+            started = time.perf_counter()
+            with connection() as conn:
+                _snapshot = Snapshot(conn, gen)
+            _stats["loads"] += 1
+            _stats["load_seconds"] = time.perf_counter() - started
+            logger.info("Columnar snapshot (gen %s) loaded in %.2fs, %.1f MiB",
+                        gen, _stats["load_seconds"], _snapshot.nbytes() / 2**20)
+        return _snapshot
+
+
+def warm_up() -> threading.Thread | None:
+    if not enabled():
+        return None
+    thread = threading.Thread(target=snapshot, name="columnar-warmup",
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+def stats() -> dict:
+    snap = _snapshot
+    return {**_stats, "engine": ENGINE if enabled() else "sqlite",
+            "generation": snap.generation if snap else None,
+            "bytes": snap.nbytes() if snap else 0}
+
+
+# ── filters ──────────────────────────────────────────────────────────────────
+def _day(value: str) -> int | None:
+    try:
+        return (date.fromisoformat(value[:10]) - date(1970, 1, 1)).days
+    except ValueError:
+        return None
+
+
+def _date_mask(days, data_inicial, data_final) -> "np.ndarray":
+    """Same rows as ``col >= date(?)`` / ``col <= date(?)`` in SQL."""
+    mask = np.ones(len(days), dtype=bool)
+    for value, keep in ((data_inicial, np.greater_equal),
+                        (data_final, np.less_equal)):
+        if not value:
+            continue
+        bound = _day(value)
+        if bound is None:                # date('garbage') is NULL: no rows
+            return np.zeros(len(days), dtype=bool)
+        mask &= (days != NAT) & keep(days, bound)
+    return mask
+
+
+def order_mask(s: Snapshot, data_inicial=None, data_final=None,
+               product_id=None, category=None) -> "np.ndarray":
+    """Boolean mask over orders – the analytics.build_filters equivalent."""
+    mask = _date_mask(s.order_day, data_inicial, data_final)
+    joined = s.item_order_pos >= 0
+    if product_id is not None:
+        hit = np.zeros(len(s.order_id), dtype=bool)
+        hit[s.item_order_pos[joined & (s.item_product == product_id)]] = True
+        mask &= hit
+    if category:
+        hit = np.zeros(len(s.order_id), dtype=bool)
+        if category in s.categories:
+            code = s.categories.index(category)
+            hit[s.item_order_pos[joined & (s.item_category == code)]] = True
+        mask &= hit
+    return mask
+
+
+def campaign_mask(s: Snapshot, data_inicial=None, data_final=None,
+                  sender=None) -> "np.ndarray":
+    """Boolean mask over campaigns – build_campaign_filters equivalent."""
+    mask = _date_mask(s.send_day, data_inicial, data_final)
+    if sender:
+        code = s.senders.index(sender) if sender in s.senders else -2
+        mask &= s.sender == code
+    return mask
+
+
+def _group(codes, mask, *weights, size=0):
+    """[count, *sums] per code over the masked rows; code -1 (an inner
+    join's missing row) is skipped."""
+    keep = mask & (codes >= 0)
+    idx  = codes[keep]
+    return [np.bincount(idx, minlength=size)] + [
+        np.bincount(idx, weights=w[keep], minlength=size) for w in weights]
+
+
+# ── commerce charts ──────────────────────────────────────────────────────────
+def _monthly_orders(s, mask):
+    """[(mes, orders with a grand_total, their sum)] for months with orders;
+    like SQL's COUNT / SUM, orders without a grand_total are left out."""
+    counts, valued, sums = _group(s.order_month, mask, s.has_total, s.grand_total,
+                                  size=len(s.months.labels))
+    return [(s.months.labels[m], int(valued[m]), float(sums[m]))
+            for m in np.flatnonzero(counts)]
+
+
+def aov(data_inicial=None, data_final=None, product_id=None, category=None):
+    s = snapshot()
+    mask = order_mask(s, data_inicial, data_final, product_id, category)
+    return {"data": [{"mes": mes, "valor": _ratio(total, n)}
+                     for mes, n, total in _monthly_orders(s, mask)]}
+
+
+def vendas_por_mes(data_inicial=None, data_final=None):
+    s = snapshot()
+    mask = order_mask(s, data_inicial, data_final)
+    return {"data": [{"mes": mes, "total": total if n else None}
+                     for mes, n, total in _monthly_orders(s, mask)]}
+
+
+def category_mix(data_inicial=None, data_final=None, product_id=None,
+                 category=None):
+    s = snapshot()
+    orders = order_mask(s, data_inicial, data_final, product_id, category)
+    items  = (s.item_order_pos >= 0) & orders[np.maximum(s.item_order_pos, 0)]
+    counts, sums = _group(s.item_category, items, s.item_total,
+                          size=len(s.categories))
+    rows = [{"category": s.categories[c], "total": float(sums[c])}
+            for c in np.flatnonzero(counts)]
+    return {"data": sorted(rows, key=lambda r: r["total"], reverse=True)}
+
+
+def repeat_funnel(data_inicial=None, data_final=None, product_id=None,
+                  category=None):
+    s = snapshot()
+    mask = order_mask(s, data_inicial, data_final, product_id, category)
+    # customers only: no contact or no date is no one's order (FUNNEL_ORDERS)
+    mask = mask & (s.contact != s.no_contact) & (s.order_day != NAT)
+    per_contact = np.bincount(s.contact[mask], minlength=s.n_contacts)
+    # SUM over zero groups is NULL in SQL
+    steps = ([int((per_contact >= k).sum()) for k in (1, 2, 3)]
+             if per_contact.any() else [None, None, None])
+    return {"data": [
+        {"step": f"{k}+ orders", "customers": n}
+        for k, n in zip((1, 2, 3), steps)
+    ]}
+
+
+def commerce_bundle(data_inicial=None, data_final=None, product_id=None,
+                    category=None):
+    args = (data_inicial, data_final, product_id, category)
+    return {"data": {
+        "aov":            aov(*args)["data"],
+        "category_mix":   category_mix(*args)["data"],
+        "repeat_funnel":  repeat_funnel(*args)["data"],
+        "vendas_por_mes": vendas_por_mes(data_inicial, data_final)["data"],
+    }}
+
+
+# ── campaign charts ──────────────────────────────────────────────────────────
+def _sums(codes, mask, columns, size):
+    """(counts, [[SUM(column) per code, None where it is all NULL]])."""
+    counts, *sums = _group(codes, mask, *(v for v, _ in columns),
+                           *(present for _, present in columns), size=size)
+    totals, valued = sums[:len(columns)], sums[len(columns):]
+    return counts, [[int(t) if n else None for t, n in zip(total, nonnull)]
+                    for total, nonnull in zip(totals, valued)]
+
+
+def _campaign_columns(s):
+    return [(s.sends, s.has_sends), (s.opens, s.has_opens),
+            (s.clicks, s.has_clicks), (s.unsubs, s.has_unsubs)]
+
+
+def _monthly_campaigns(s, mask):
+    """[(mes, sends, opens, clicks, unsubs)] for months with rows."""
+    counts, totals = _sums(s.send_month, mask, _campaign_columns(s),
+                           size=len(s.months.labels))
+    return [(s.months.labels[m], *(t[m] for t in totals))
+            for m in np.flatnonzero(counts)]
+
+
+def _ratio(num, den):
+    return num * 1.0 / den if den else None
+
+
+# SQLite's ROUND rounds the decimal text of the value, Python's round() the
+# binary double (ROUND(1997 * 1.0 / 160 * 100, 2) is 1248.13, round() gives
+# 1248.12), so the rates are rounded by SQLite with campaigns.MEASURES' own
+# expression – one statement per chart, over the already summed counts
+_PERCENT_SQL = ("SELECT COALESCE(ROUND(json_extract(value, '$[0]') * 1.0 "
+                "/ json_extract(value, '$[1]') * 100, ?), 0) "
+                "FROM json_each(?) ORDER BY key")
+
+
+def _percents(pairs, digits) -> list:
+    """COALESCE(ROUND(num * 1.0 / den * 100, digits), 0) per (num, den)."""
+    if not pairs:
+        return []
+    with closing(sqlite3.connect(":memory:")) as conn:
+        return [r for r, in conn.execute(_PERCENT_SQL,
+                                         (digits, json.dumps(pairs)))]
+
+
+def _volume(rows):
+    return [{"mes": mes, "sends": sends} for mes, sends, *_ in rows]
+
+
+def _engagement(rows):
+    opens  = _percents([(o, sends) for _, sends, o, _, _ in rows], 2)
+    clicks = _percents([(c, o) for _, _, o, c, _ in rows], 2)
+    return [{"mes": row[0], "open_rate": o, "click_rate": c}
+            for row, o, c in zip(rows, opens, clicks)]
+
+
+def _unsub_rate(rows):
+    rates = _percents([(u, sends) for _, sends, _, _, u in rows], 3)
+    return [{"mes": row[0], "unsub_rate": r} for row, r in zip(rows, rates)]
+
+
+def _campaign_rows(data_inicial, data_final, sender):
+    s = snapshot()
+    return _monthly_campaigns(s, campaign_mask(s, data_inicial, data_final, sender))
+
+
+def email_volume(data_inicial=None, data_final=None, sender=None):
+    return {"data": _volume(_campaign_rows(data_inicial, data_final, sender))}
+
+
+def email_engagement(data_inicial=None, data_final=None, sender=None):
+    return {"data": _engagement(_campaign_rows(data_inicial, data_final, sender))}
+
+
+def email_unsub_rate(data_inicial=None, data_final=None, sender=None):
+    return {"data": _unsub_rate(_campaign_rows(data_inicial, data_final, sender))}
+
+
+def email_sender_mix(data_inicial=None, data_final=None):
+    s = snapshot()
+    mask = campaign_mask(s, data_inicial, data_final)
+    counts, (sends, opens) = _sums(s.sender, mask, _campaign_columns(s)[:2],
+                                   size=len(s.senders))
+    # ORDER BY sends DESC: NULL sends last
+    rows = sorted(((s.senders[c], sends[c], opens[c])
+                   for c in np.flatnonzero(counts)),
+                  key=lambda r: (r[1] is not None, r[1] or 0), reverse=True)[:10]
+    rates = _percents([(o, total) for _, total, o in rows], 2)
+    return {"data": [{"sender": name, "sends": total, "open_rate": rate}
+                     for (name, total, _), rate in zip(rows, rates)]}
+
+
+def campaign_bundle(data_inicial=None, data_final=None, sender=None):
+    rows = _campaign_rows(data_inicial, data_final, sender)
+    return {"data": {
+        "email_volume":     _volume(rows),
+        "email_engagement": _engagement(rows),
+        "email_sender_mix": email_sender_mix(data_inicial, data_final)["data"],
+        "email_unsub_rate": _unsub_rate(rows),
+    }}
@@ -0,0 +1,76 @@
+# crew.py ─── lazy access to the /chat crew
+"""
+Importing crewai and building the Agent/Task/Crew costs seconds, and chart
+requests never need it. Nothing here touches crewai until the first chat
+kickoff that misses the chat cache, or until ``warm_up()`` (started from
+main.py's lifespan) builds the crew in a background thread.
+
+• CHAT_ENABLED=0   – chart-only worker: /chat answers 404, crewai is never
+                     imported
+• CREW_WARMUP=0    – don't pre-build; the first /chat pays the load instead
+• CHAT_FAKE_CREW=1 – use fake_crew.FakeCrew (no LLM, no crewai)
+"""
+import os
+import time
+import logging
+import threading
+
+CHAT_ENABLED = os.getenv("CHAT_ENABLED", "1") != "0"
+WARMUP       = os.getenv("CREW_WARMUP", "1") != "0"
+FAKE         = bool(os.getenv("CHAT_FAKE_CREW"))
+
+logger = logging.getLogger("crew")
+
+_lock = threading.Lock()
+_crew = None
+_load_seconds = None
+
+
+def get_crew():
+    """The shared crew, built on first use (thread-safe)."""
+    global _crew, _load_seconds
+    if _crew is None:
+        with _lock:
+            if _crew is None:
+                started = time.perf_counter()
+                if FAKE:
+                    from fake_crew import FakeCrew
+                    crew = FakeCrew()
+                else:
+                    from db_agent import build_crew
+                    crew = build_crew()
+                _load_seconds = time.perf_counter() - started
+                logger.info("Crew ready in %.2fs", _load_seconds)
+                _crew = crew
+    return _crew
+
+
+class LazyCrew:
+    """Stands in for the crew until a kickoff actually needs it."""
+
+    def kickoff(self, inputs: dict):
+        return get_crew().kickoff(inputs)
+
+
+analytics_crew = LazyCrew()
+
+
+def warm_up() -> threading.Thread | None:
+    """Build the crew off the request path, unless disabled."""
+    if not (CHAT_ENABLED and WARMUP) or _crew is not None:
+        return None
+
+    def _run():
+        try:
+            get_crew()
+        except Exception:
+            logger.exception("Crew warm-up failed; /chat will retry on demand")
+
+    thread = threading.Thread(target=_run, name="crew-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def stats() -> dict:
+    return {"enabled": CHAT_ENABLED, "fake": FAKE,
+            "loaded": _crew is not None, "load_seconds": _load_seconds}
@@ -0,0 +1,222 @@
+# db.py ─── shared, read-only SQLite connection pool
+"""
+One pool of read-only connections to app.db, shared by analytics.py,
+campaigns.py and db_agent.py.
+
+• Connections are opened with a ``mode=ro`` URI, so nothing served by the
+  API can ever write to the database (load_db.py is the only writer).
+• The loader leaves app.db in WAL mode and rebuilds it in a shadow file
+  that is renamed over app.db; the pool notices the new file on the next
+  checkout and recycles its connections.
+• Each connection keeps its page cache, its mmap window and its
+  prepared-statement cache between checkouts – that is the whole point of
+  pooling instead of calling ``sqlite3.connect`` per request.
+
+Tune with DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_MMAP_SIZE, DB_CACHE_SIZE_KIB and
+DB_STATEMENT_CACHE; read ``pool.stats()`` (or GET /stats/db-pool) to size it.
+"""
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger("db")
+
+DB_PATH = Path(__file__).resolve().with_name("app.db")
+
+POOL_SIZE       = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT    = float(os.getenv("DB_POOL_TIMEOUT", "5"))            # seconds
+MMAP_SIZE       = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KIB  = int(os.getenv("DB_CACHE_SIZE_KIB", str(64 * 1024)))  # per conn
+STATEMENT_CACHE = int(os.getenv("DB_STATEMENT_CACHE", "256"))
+GENERATION_TTL  = float(os.getenv("DB_GENERATION_TTL", "1"))          # seconds
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection frees up within the pool timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, path: Path = DB_PATH, size: int = POOL_SIZE,
+                 timeout: float = POOL_TIMEOUT):
+        self.path    = Path(path)
+        self.size    = size
+        self.timeout = timeout
+        self._idle: list[sqlite3.Connection] = []   # LIFO → warmest conn first
+        self._open  = 0
+        self._epoch = 0                              # bumped by close_all()
+        self._inode = None                           # app.db file we are on
+        self._born: dict[int, int] = {}              # id(conn) → epoch
+        self._cond  = threading.Condition()
+        self._stats = {"checkouts": 0, "waits": 0, "wait_seconds": 0.0,
+                       "timeouts": 0, "opened": 0, "closed": 0, "swaps": 0}
+
+    # ── connection setup ─────────────────────────────────────────────────────
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self.path.as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,        # checked out by many worker threads
+            cached_statements=STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode != "wal":
+            logger.warning("app.db is in %s mode, not WAL – re-run load_db.py", mode)
+        return conn
+
+    # ── checkout / checkin ───────────────────────────────────────────────────
+    def _check_swap(self) -> None:
+        """load_db.py renames a new file over app.db: recycle old connections."""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        with self._cond:                  # RLock: close_all() re-enters it
+            if self._inode is None:
+                self._inode = inode
+            elif inode != self._inode:
+                self._inode = inode
+                self._stats["swaps"] += 1
+                self.close_all()
+
+    def acquire(self) -> sqlite3.Connection:
+        self._check_swap()
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if not self._idle and self._open >= self.size:
+                self._stats["waits"] += 1
+                started  = time.perf_counter()
+                deadline = started + self.timeout
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no SQLite connection free after {self.timeout}s")
+                    self._cond.wait(remaining)
+                self._stats["wait_seconds"] += time.perf_counter() - started
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1          # reserve the slot before connecting
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["opened"] += 1
+            self._born[id(conn)] = self._epoch
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()          # never park a connection holding a snapshot
+        with self._cond:
+            if self._born.get(id(conn)) == self._epoch:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            self._born.pop(id(conn), None)       # opened before close_all()
+            self._open -= 1
+            self._stats["closed"] += 1
+            self._cond.notify()
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ── housekeeping ─────────────────────────────────────────────────────────
+    def close_all(self) -> None:
+        """Close idle connections; busy ones are closed as they come back."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._epoch += 1
+            for conn in idle:
+                self._born.pop(id(conn), None)
+            self._open -= len(idle)
+            self._stats["closed"] += len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "size":   self.size,
+                "open":   self._open,
+                "idle":   len(self._idle),
+                "in_use": self._open - len(self._idle),
+            }
+
+
+pool = ConnectionPool()
+
+
+def connection():
+    """``with connection() as conn:`` – borrow a pooled read-only connection."""
+    return pool.connection()
+
+
+# ── Generation counter ───────────────────────────────────────────────────────
+# load_db.populate_db() bumps PRAGMA user_version on every rebuild; caches
+# compare it to decide whether what they hold is still valid. The value is
+# re-read at most every GENERATION_TTL seconds on a private connection, so
+# it is safe to call from the event loop.
+#
+# user_version starts over at 1 when app.db is deleted and built again, so
+# every build also stores a random id (_build, see load_db.py): ETags carry
+# it, and a new build whose user_version is not past the one already seen
+# moves this process's generation on anyway (``offset``).
+_gen_lock  = threading.Lock()
+_gen_state = {"value": 0, "offset": 0, "build": "", "checked": 0.0}
+
+
+def _read_generation() -> None:
+    now = time.monotonic()
+    if now - _gen_state["checked"] < GENERATION_TTL:
+        return
+    with _gen_lock:
+        if now - _gen_state["checked"] >= GENERATION_TTL:
+            try:
+                conn = sqlite3.connect(f"{DB_PATH.as_uri()}?mode=ro", uri=True)
+                try:
+                    version = conn.execute("PRAGMA user_version").fetchone()[0]
+                    try:
+                        build = conn.execute("SELECT id FROM _build").fetchone()[0]
+                    except (sqlite3.OperationalError, TypeError):
+                        build = ""                   # built before build ids
+                finally:
+                    conn.close()
+                if (build != _gen_state["build"]
+                        and version + _gen_state["offset"] <= _gen_state["value"]):
+                    _gen_state["offset"] = _gen_state["value"] + 1 - version
+                _gen_state.update(value=version + _gen_state["offset"], build=build)
+            except sqlite3.Error:
+                logger.warning("could not read app.db generation", exc_info=True)
+            _gen_state["checked"] = now
+
+
+def generation() -> int:
+    _read_generation()
+    return _gen_state["value"]
+
+
+def build_id() -> str:
+    """The random id of the app.db build being served ('' for older files)."""
+    _read_generation()
+    return _gen_state["build"]
@@ -0,0 +1,103 @@
+# executors.py ─── bounded thread pools that keep blocking work off the event loop
+"""
+Two separately sized pools:
+
+• ``db_executor``   – SQLite reads behind /charts/* (sized to the DB pool)
+• ``crew_executor`` – CrewAI kickoffs behind /chat (slow LLM round-trips)
+
+Each pool has its own queue-depth limit, so a burst of chat traffic can fill
+``crew_executor`` without delaying a single chart. When a pool is full the
+call fails fast with ``Saturated``; main.py turns that into
+``503 Service Unavailable`` with a ``Retry-After`` header.
+"""
+import os
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from db import POOL_SIZE, PoolTimeout
+
+
+class Saturated(RuntimeError):
+    """A pool has no free worker and its queue is full."""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"{pool} pool saturated")
+        self.pool        = pool
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, workers: int, max_queue: int,
+                 retry_after: int, overload_errors: tuple = ()):
+        self.name        = name
+        self.workers     = workers
+        self.max_queue   = max_queue
+        self.retry_after = retry_after
+        # errors raised *inside* the job that also mean "try again later"
+        self._overload_errors = overload_errors
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix=f"{name}-worker")
+        self._lock     = threading.Lock()
+        self._pending  = 0            # running + queued
+        self._stats    = {"submitted": 0, "rejected": 0, "completed": 0}
+
+    def _done(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._stats["completed"] += 1
+
+    def submit(self, fn, /, *args, **kwargs) -> asyncio.Future:
+        """
+        Queue ``fn`` now and return an awaitable for its result. Raises
+        ``Saturated`` right away, before the caller commits to a response.
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise Saturated(self.name, self.retry_after)
+            self._pending += 1
+            self._stats["submitted"] += 1
+        ctx = contextvars.copy_context()         # keep request-scoped contextvars
+        try:
+            future = self._executor.submit(ctx.run, fn, *args, **kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn, /, *args, **kwargs):
+        """Run ``fn`` on this pool; raise ``Saturated`` instead of queueing forever."""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await future
+        except self._overload_errors as exc:
+            raise Saturated(self.name, self.retry_after) from exc
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats,
+                    "workers":   self.workers,
+                    "max_queue": self.max_queue,
+                    "pending":   self._pending}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+db_executor = BoundedExecutor(
+    "db",
+    workers=int(os.getenv("DB_WORKERS", str(POOL_SIZE))),
+    max_queue=int(os.getenv("DB_MAX_QUEUE", "64")),
+    retry_after=int(os.getenv("DB_RETRY_AFTER", "1")),
+    overload_errors=(PoolTimeout,),
+)
+
+crew_executor = BoundedExecutor(
+    "crew",
+    workers=int(os.getenv("CREW_WORKERS", "4")),
+    max_queue=int(os.getenv("CREW_MAX_QUEUE", "8")),
+    retry_after=int(os.getenv("CREW_RETRY_AFTER", "10")),
+)
@@ -0,0 +1,398 @@
+# export.py ─── bulk export of tables, chart data and SELECTs as Arrow / Parquet
+"""
+For the BI team, instead of paging through /charts/* or asking /chat:
+
+• GET  /export/{table}   contacts, products, orders, order_items, campaigns
+• GET  /export/{chart}   the rows behind a chart (aov, email-volume, …)
+• POST /export/query     {"query": "SELECT …"} – e.g. the SQL a /chat
+                         reply came with
+
+``?format=arrow`` (default) streams an Arrow IPC stream, ``?format=parquet``
+a Parquet file with one row group per batch. Filters are the charts' own
+(build_filters / build_campaign_filters); a filter the source does not
+support is a 400.
+
+Rows go from the SQLite cursor into Arrow arrays EXPORT_BATCH_ROWS at a
+time – no per-row dicts, no JSON – and each batch is written to the
+response and dropped, so memory stays flat however many rows there are.
+The schema is fixed before the first batch by one typeof() pass over the
+result in SQLite (``storage_classes``): a column may hold INTEGERs in the
+first batch and a REAL or TEXT in a later one.
+Every batch is fetched on db_executor, like any chart query; a whole
+export is bounded by EXPORT_TIMEOUT of fetch + encode time (time spent
+waiting for a slow client to read does not count).
+
+An export holds its connection for the whole download, so exports get
+their own pool of EXPORT_CONCURRENCY connections (``export_pool``)
+instead of taking the charts' ones; when all are in use, a new export is
+a 503 with Retry-After.
+
+pyarrow is optional and only imported by the first export; without it
+these routes answer 501.
+"""
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from contextlib import ExitStack
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+import analytics
+import campaigns
+import querylog
+from db import ConnectionPool, PoolTimeout
+from executors import db_executor, Saturated
+from schema_contract import TABLES
+
+BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "65536"))
+TIMEOUT    = float(os.getenv("EXPORT_TIMEOUT", "300"))         # seconds
+CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))        # downloads at once
+RETRY_AFTER = int(os.getenv("EXPORT_RETRY_AFTER", "5"))        # seconds
+PROGRESS_STEPS = 100_000             # VM instructions between deadline checks
+
+router = APIRouter(prefix="/export", tags=["export"])
+logger = logging.getLogger("export")
+
+FORMATS = {
+    "arrow":   ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+_pa = None
+
+# timeout 0: a full pool answers 503 at once rather than queueing a download
+export_pool = ConnectionPool(size=CONCURRENCY, timeout=0)
+
+
+def _arrow():
+    """pyarrow, imported on first use (chart-only workers never load it)."""
+    global _pa
+    if _pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet          # noqa: F401  (registers pyarrow.parquet)
+        except ImportError:
+            raise HTTPException(501, detail="Export needs pyarrow: pip install pyarrow")
+        # the first write pays ~0.25s of one-off setup; keep it out of querylog
+        schema = schema_for(pyarrow, ["x"], [{"integer"}])
+        with pyarrow.ipc.new_stream(pyarrow.PythonFile(_Chunks(), mode="w"), schema) as w:
+            w.write_batch(to_batch(pyarrow, schema, [(0,)]))
+        _pa = pyarrow
+    return _pa
+
+
+# ── sources: (sql, params) for a table or a chart ────────────────────────────
+_COMMERCE = ("data_inicial", "data_final", "product_id", "category")
+_CAMPAIGN = ("data_inicial", "data_final", "sender")
+_DATES    = ("data_inicial", "data_final")
+
+
+def _table_sql(table: str, where_params) -> tuple[str, list]:
+    where, params = where_params
+    sql = f"SELECT * FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+    return sql, params
+
+
+def _order_items_sql(**f):
+    where, params = analytics.build_filters(**f)
+    sql = "SELECT * FROM order_items"
+    if where:
+        sql += f" WHERE order_id IN (SELECT orders.order_id FROM orders WHERE {where})"
+    return sql, params
+
+
+def _monthly(chart: str):
+    return lambda data_inicial=None, data_final=None, sender=None: \
+        campaigns.monthly_sql(campaigns.MEASURES[chart], data_inicial,
+                              data_final, sender)
+
+
+# name → (sql builder, filters it accepts)
+SOURCES = {
+    "contacts":    (lambda: _table_sql("contacts", ("", [])), ()),
+    "products":    (lambda: _table_sql("products", ("", [])), ()),
+    "orders":      (lambda **f: _table_sql("orders", analytics.build_filters(**f)),
+                    _COMMERCE),
+    "order_items": (_order_items_sql, _COMMERCE),
+    "campaigns":   (lambda **f: _table_sql(
+                        "campaigns", campaigns.build_campaign_filters(**f)), _CAMPAIGN),
+    "aov":              (analytics.aov_sql, _COMMERCE),
+    "category-mix":     (analytics.category_mix_sql, _COMMERCE),
+    "repeat-funnel":    (analytics.repeat_funnel_sql, _COMMERCE),
+    "vendas_por_mes":   (analytics.vendas_por_mes_sql, _DATES),
+    "cohort-retention": (analytics.cohort_retention_sql, _DATES),
+    "email-volume":     (_monthly("email-volume"), _CAMPAIGN),
+    "email-engagement": (_monthly("email-engagement"), _CAMPAIGN),
+    "email-unsub-rate": (_monthly("email-unsub-rate"), _CAMPAIGN),
+    "email-sender-mix": (campaigns.email_sender_mix_sql, _DATES),
+}
+assert set(TABLES) <= set(SOURCES), "every contract table is exportable"
+
+
+# ── cursor → Arrow batches ───────────────────────────────────────────────────
+class _Chunks:
+    """
+    Write-only file for the Arrow writers: keeps what they wrote until
+    ``take()``, but reports the absolute position (Parquet's footer stores
+    offsets), so the stream can be emptied after every batch.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+# storage classes → Arrow type; anything else (TEXT, a mix with TEXT or
+# BLOB, only NULLs) is a string column
+_KINDS = {frozenset({"integer"}): "int64",
+          frozenset({"real"}): "float64",
+          frozenset({"integer", "real"}): "float64",
+          frozenset({"blob"}): "binary"}
+
+
+def storage_classes(conn, sql: str, params, width: int) -> list[set[str]]:
+    """
+    The non-NULL typeof() values of each of the ``width`` result columns,
+    over every row. SQLite is dynamically typed and the Arrow / Parquet
+    schema cannot change after the first batch, so the whole result is
+    looked at once, inside SQLite (no Python object per row).
+    """
+    cols = [f"c{i}" for i in range(width)]
+    scan = (f"WITH _export({', '.join(cols)}) AS ({sql.strip().rstrip(';')}) "
+            f"SELECT {', '.join(f'group_concat(DISTINCT typeof({c}))' for c in cols)} "
+            f"FROM _export")
+    row = conn.execute(scan, params).fetchone()
+    return [set(v.split(",")) - {"null"} if v else set() for v in row]
+
+
+def schema_for(pa, names: list[str], classes: list[set[str]]):
+    """Per column: int64, float64 (INTEGER and REAL mixed too), binary, or
+    string for everything else."""
+    return pa.schema([pa.field(name, getattr(pa, _KINDS.get(frozenset(kinds),
+                                                             "string"))())
+                      for name, kinds in zip(names, classes)])
+
+
+def to_batch(pa, schema, rows: list[tuple]):
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_string(field.type):
+            # a mixed column: numbers and blobs are written as their text
+            values = [v if v is None or isinstance(v, str) else str(v)
+                      for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class Export:
+    """One streamed export: an export_pool connection, a cursor and a writer."""
+
+    def __init__(self, sql: str, params, fmt: str, name: str):
+        self.sql, self.params, self.fmt, self.name = sql, list(params), fmt, name
+        self.pa = _arrow()
+        self.rows = 0
+        self._stack = ExitStack()
+        self._lock  = threading.Lock()     # close() waits for a running next()
+        self._writer = None
+        self._schema = None
+        self._sink = _Chunks()
+        self._busy = 0.0                    # fetch + encode, not the client's reads
+        self._deadline = 0.0                # monotonic; see _start()
+
+    def _start(self) -> float:
+        """Arm the progress handler with what is left of TIMEOUT."""
+        self._deadline = time.monotonic() + TIMEOUT - self._busy
+        return time.perf_counter()
+
+    def open(self) -> bytes:
+        """Run the statement and encode the first batch (raises on bad SQL)."""
+        started = self._start()
+        try:
+            return self._open()
+        finally:
+            self._busy += time.perf_counter() - started
+
+    def _open(self) -> bytes:
+        try:
+            conn = self._stack.enter_context(export_pool.connection())
+        except PoolTimeout:
+            raise Saturated("export", RETRY_AFTER) from None
+        conn.set_progress_handler(lambda: time.monotonic() > self._deadline,
+                                  PROGRESS_STEPS)
+        self._stack.callback(conn.set_progress_handler, None, 0)   # pooled conn
+        self._conn = conn
+        self._cur = conn.cursor()
+        self._cur.row_factory = None       # plain tuples: no sqlite3.Row per row
+        self._cur.execute(self.sql, self.params)
+        names = [c[0] for c in self._cur.description]
+        schema = self._schema = schema_for(
+            self.pa, names, storage_classes(conn, self.sql, self.params, len(names)))
+        rows = self._cur.fetchmany(BATCH_ROWS)
+        sink = self.pa.PythonFile(self._sink, mode="w")
+        self._writer = (self.pa.parquet.ParquetWriter(sink, schema)
+                        if self.fmt == "parquet"
+                        else self.pa.ipc.new_stream(sink, schema))
+        return self._write(rows)
+
+    def _write(self, rows: list[tuple]) -> bytes:
+        if rows:
+            batch = to_batch(self.pa, self._schema, rows)
+            if self.fmt == "parquet":
+                self._writer.write_batch(batch, row_group_size=len(rows))
+            else:
+                self._writer.write_batch(batch)
+            self.rows += len(rows)
+        return self._sink.take()
+
+    def next(self) -> bytes | None:
+        """Encode the next batch; at the end, the trailer (once), then None."""
+        with self._lock:
+            if self._writer is None:
+                return None
+            started = self._start()
+            try:
+                return self._next()
+            finally:
+                self._busy += time.perf_counter() - started
+
+    def _next(self) -> bytes:
+        rows = self._cur.fetchmany(BATCH_ROWS)
+        if rows:
+            return self._write(rows)
+        self._writer.close()
+        self._writer = None
+        tail = self._sink.take()
+        querylog.record(self._conn, self.sql, self.params, self._busy, self.rows)
+        logger.info("export %s: %d rows as %s, %.2fs of fetch + encode",
+                    self.name, self.rows, self.fmt, self._busy)
+        self._stack.close()
+        return tail
+
+    def close(self) -> None:
+        with self._lock:
+            self._writer = None
+            self._stack.close()
+
+
+SATURATED_PAUSE = 0.05                 # seconds between tries on a busy db_executor
+
+
+async def _stream(export: Export, first: bytes):
+    try:
+        yield first
+        waited = 0.0
+        while True:
+            try:
+                chunk = await db_executor.run(export.next)
+            except Saturated as exc:
+                # busy charts: wait rather than break the file, but only for
+                # RETRY_AFTER; then the response ends without its trailer,
+                # which clients see as a failed download, not a short file
+                # (not Saturated itself: the headers are gone, no 503 now)
+                if waited >= RETRY_AFTER:
+                    raise RuntimeError(f"export {export.name}: db_executor busy "
+                                       f"for {RETRY_AFTER}s, aborted after "
+                                       f"{export.rows} rows") from exc
+                await asyncio.sleep(SATURATED_PAUSE)
+                waited += SATURATED_PAUSE
+                continue
+            waited = 0.0
+            if chunk is None:
+                break
+            if chunk:
+                yield chunk
+    finally:
+        export.close()
+
+
+async def _respond(sql: str, params, fmt: str, name: str) -> StreamingResponse:
+    if fmt not in FORMATS:
+        raise HTTPException(400, detail=f"format must be one of {sorted(FORMATS)}")
+    export = Export(sql, params, fmt, name)
+    try:
+        first = await db_executor.run(export.open)
+    except Saturated:
+        export.close()
+        raise
+    except sqlite3.Error as exc:
+        export.close()
+        if isinstance(exc, sqlite3.OperationalError) and "interrupted" in str(exc):
+            raise HTTPException(504, detail=f"Export exceeded {TIMEOUT:g}s")
+        raise HTTPException(400, detail=str(exc))
+    except Exception:
+        export.close()
+        logger.exception("Error in /export/%s", name)
+        raise HTTPException(500)
+    media_type, ext = FORMATS[fmt]
+    filename = re.sub(r"[^\w.-]", "_", name)
+    return StreamingResponse(
+        _stream(export, first), media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{ext}"'})
+
+
+# ── routes ───────────────────────────────────────────────────────────────────
+@router.post("/query")
+async def export_query(request: Request, format: str = Query("arrow")):
+    """Body ``{"query": "SELECT …"}``: the full result, not the agent's
+    first SQL_MAX_ROWS rows."""
+    payload = await request.json()
+    sql = (payload.get("query") or "").strip().rstrip(";")
+    if not sql.lower().startswith("select"):
+        raise HTTPException(400, detail="Only SELECT queries allowed.")
+    return await _respond(sql, (), format, "query")
+
+
+@router.get("/{name}")
+async def export_source(
+    name:         str,
+    format:       str        = Query("arrow"),
+    data_inicial: str | None = Query(None),
+    data_final:   str | None = Query(None),
+    product_id:   int | None = Query(None),
+    category:     str | None = Query(None),
+    sender:       str | None = Query(None),
+):
+    """A table or a chart's rows, filtered like the charts."""
+    if name not in SOURCES:
+        raise HTTPException(404, detail=f"Unknown export {name!r}; "
+                                        f"one of {sorted(SOURCES)}")
+    builder, accepted = SOURCES[name]
+    given = {k: v for k, v in {"data_inicial": data_inicial, "data_final": data_final,
+                               "product_id": product_id, "category": category,
+                               "sender": sender}.items() if v not in (None, "")}
+    unsupported = sorted(set(given) - set(accepted))
+    if unsupported:
+        raise HTTPException(400, detail=f"{name} does not filter by {unsupported}")
+    sql, params = builder(**given)
+    return await _respond(sql, params, format, name)
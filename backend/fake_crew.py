@@ -0,0 +1,55 @@
+# fake_crew.py ─── an LLM-free stand-in for db_agent.analytics_crew
+"""
+Same ``kickoff({"input": ...}).dict()`` contract as the real crew, and the
+same side effects: it runs a real SELECT through sql_tool.query_sql (so the
+chat cache and the ``sql`` / ``rows`` stream events are exercised) and
+emits its canned reasoning word by word as ``reasoning`` events.
+
+    CHAT_FAKE_CREW=1 uvicorn main:app      # /chat and /chat/stream, no API key
+"""
+import os
+import json
+import time
+
+import chat_events
+import sql_tool
+
+DEFAULT_QUERY = (
+    "SELECT strftime('%Y-%m', order_date) AS mes, SUM(grand_total) AS total "
+    "FROM orders GROUP BY mes ORDER BY mes"
+)
+DEFAULT_REASONING = "Somei grand_total de orders agrupando por mês de order_date."
+
+
+class FakeOutput:
+    def __init__(self, reply: dict):
+        self._reply = reply
+
+    def dict(self) -> dict:
+        return self._reply
+
+    def __str__(self) -> str:                      # what str(CrewOutput) gives
+        return json.dumps(self._reply, ensure_ascii=False)
+
+
+class FakeCrew:
+    def __init__(self, query: str = DEFAULT_QUERY,
+                 reasoning: str = DEFAULT_REASONING,
+                 token_delay: float = float(os.getenv("CHAT_FAKE_DELAY", "0"))):
+        self.query       = query
+        self.reasoning   = reasoning
+        self.token_delay = token_delay
+        self.kickoffs    = 0
+
+    def kickoff(self, inputs: dict) -> FakeOutput:
+        self.kickoffs += 1
+        for word in self.reasoning.split(" "):
+            chat_events.emit("reasoning", {"text": word + " "})
+            time.sleep(self.token_delay)
+        results = json.loads(sql_tool.query_sql(self.query))
+        return FakeOutput({
+            "query":        self.query,
+            "results":      results,
+            "reasoning":    self.reasoning,
+            "final_answer": f"Resposta de teste para: {inputs['input']}",
+        })
@@ -1,24 +1,34 @@
 """
 load_db.py  ─────────────────────────────────────────────────────────────
-(Re)builds backend/app.db from the four CSVs in backend/tables.
+(Re)builds backend/app.db from the five CSVs in backend/tables.
 
 • Called automatically by main.py on FastAPI start-up, but you can also
   run it by hand:  >>> python backend/load_db.py
-• Includes an explicit SQL DDL block (SCHEMA_DDL) so the schema remains
-  documented in-repo even though we still rely on pandas.to_sql() to do
-  the heavy lifting.
+• SCHEMA_DDL is the real schema: tables are created from it (types, keys)
+  and the CSVs are streamed into them in CHUNK_ROWS batches with
+  executemany, so memory stays flat no matter how big the exports get.
 
 Author: Luca + ChatGPT
 """
 from pathlib import Path
+import os
+import csv
+import time
+import hashlib
+import secrets
 import sqlite3
 
-import pandas as pd
+import sketches
 
 CSV_DIR = Path(__file__).parent / "tables"
 DB_PATH  = Path(__file__).parent / "app.db"
+SHADOW_PATH = DB_PATH.with_name("app.db.shadow")      # built here, then swapped in
 
-# ── 1.  Human-readable schema definition (purely for documentation) ──
+TABLES      = ["contacts", "products", "orders", "order_items", "campaigns"]
+APPEND_ONLY = {"orders", "order_items", "campaigns"}  # delta = new keys only
+CHUNK_ROWS = int(os.getenv("LOAD_CHUNK_ROWS", "50000"))
+
+# ── 1.  Schema (column names follow the CSV headers) ──
 SCHEMA_DDL = """
 -- contacts ------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS contacts (
@@ -34,15 +44,15 @@ CREATE TABLE IF NOT EXISTS products (
     product_id   INTEGER PRIMARY KEY,
     name         TEXT,
     category     TEXT,
-    unit_price   REAL
+    price        REAL
 );
 
 -- orders --------------------------------------------------------------------
 CREATE TABLE IF NOT EXISTS orders (
     order_id     INTEGER PRIMARY KEY,
     contact_id   INTEGER,
-    order_date   TEXT,
-    total        REAL,
+    order_date   TEXT,                      -- ISO 8601
+    grand_total  REAL,
     FOREIGN KEY (contact_id) REFERENCES contacts(contact_id)
 );
 
@@ -51,38 +61,617 @@ CREATE TABLE IF NOT EXISTS order_items (
     order_item_id INTEGER PRIMARY KEY,
     order_id      INTEGER,
     product_id    INTEGER,
-    quantity      INTEGER,
-    line_total    REAL,
+    qty           INTEGER,
+    unit_price    REAL,
     FOREIGN KEY (order_id)   REFERENCES orders(order_id),
     FOREIGN KEY (product_id) REFERENCES products(product_id)
 );
+
+-- campaigns -----------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS campaigns (
+    send_date                 TEXT,         -- dd/mm/YYYY, as exported
+    email_job_id              INTEGER PRIMARY KEY,
+    email_sender_name         TEXT,
+    email_content_name        TEXT,
+    email_subject             TEXT,
+    email_sends               INTEGER,
+    email_unique_opens        INTEGER,
+    email_unique_clicks       INTEGER,
+    email_unique_unsubscribes INTEGER,
+    send_date_iso             TEXT          -- derived: YYYY-MM-DD
+);
+"""
+
+# Fingerprint of every CSV as of the last load (used by --incremental)
+STATE_DDL = """
+CREATE TABLE IF NOT EXISTS _load_state (
+    tbl       TEXT PRIMARY KEY,
+    size      INTEGER,
+    mtime_ns  INTEGER,
+    sha256    TEXT
+);
+"""
+
+BUILD_DDL = """
+CREATE TABLE IF NOT EXISTS _build (
+    id        TEXT NOT NULL           -- random, new on every populate_db()
+);
+"""
+
+# ── 2.  Derived columns + indexes for the chart queries ──
+# campaigns.send_date arrives as dd/mm/YYYY; we store an ISO copy once at
+# load time so the /charts/email-* filters are index range scans instead of
+# rebuilding a date with substr() on every row of every request.
+INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS idx_campaigns_date_sender
+    ON campaigns (send_date_iso, email_sender_name, email_sends,
+                  email_unique_opens, email_unique_clicks,
+                  email_unique_unsubscribes);
+
+CREATE INDEX IF NOT EXISTS idx_orders_date_contact
+    ON orders (order_date, contact_id, grand_total);
+
+-- ?product_id= / ?category= semi-joins (analytics.build_filters) and the
+-- order → items join of /category-mix, all answered from the index alone
+CREATE INDEX IF NOT EXISTS idx_order_items_product_order
+    ON order_items (product_id, order_id);
+
+CREATE INDEX IF NOT EXISTS idx_order_items_order
+    ON order_items (order_id, product_id, qty, unit_price);
+
+CREATE INDEX IF NOT EXISTS idx_products_category
+    ON products (category, product_id);
+"""
+
+
+# ── 3.  Monthly rollups behind the most-hit charts ──
+# analytics.py / campaigns.py read them whenever the requested range covers
+# whole months (see rollups.month_span). A full load aggregates every month;
+# an incremental load deletes and re-aggregates only the months its new rows
+# fall in (track_rollup_months / refresh_rollups).
+ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS campaigns_monthly (
+    mes               TEXT NOT NULL,          -- YYYY-MM
+    email_sender_name TEXT,
+    sends             INTEGER,
+    opens             INTEGER,
+    clicks            INTEGER,
+    unsubs            INTEGER,
+    PRIMARY KEY (mes, email_sender_name)
+);
+CREATE INDEX IF NOT EXISTS idx_campaigns_monthly_sender
+    ON campaigns_monthly (email_sender_name, mes);
+
+CREATE TABLE IF NOT EXISTS orders_monthly (
+    mes          TEXT PRIMARY KEY,            -- YYYY-MM
+    order_count  INTEGER,                     -- orders with a grand_total
+    revenue      REAL
+);
+
+CREATE TABLE IF NOT EXISTS orders_monthly_category (
+    mes          TEXT NOT NULL,
+    category     TEXT,
+    order_count  INTEGER,
+    revenue      REAL,
+    PRIMARY KEY (category, mes)
+);
 """
 
+# rollup → (date column, INSERT of its rows). {months} / {where} are empty
+# for every month, or restrict the date to the months in _rollup_months:
+# 'YYYY-MM' <= any date of that month < 'YYYY-MM-32', a range seek on the
+# date index per month.
+ROLLUPS = {
+    "campaigns_monthly": ("c.send_date_iso", """
+INSERT INTO campaigns_monthly
+SELECT substr(c.send_date_iso, 1, 7), c.email_sender_name,
+       SUM(c.email_sends), SUM(c.email_unique_opens),
+       SUM(c.email_unique_clicks), SUM(c.email_unique_unsubscribes)
+FROM {months}campaigns c {where}
+GROUP BY 1, 2
+"""),
+    "orders_monthly": ("o.order_date", """
+INSERT INTO orders_monthly
+SELECT strftime('%Y-%m', o.order_date), COUNT(o.grand_total), SUM(o.grand_total)
+FROM {months}orders o {where}
+GROUP BY 1
+"""),
+    # an order counts once for every category it contains (same semantics
+    # as the ?category= filter in analytics.build_filters)
+    "orders_monthly_category": ("o.order_date", """
+INSERT INTO orders_monthly_category
+SELECT mes, category, COUNT(grand_total), SUM(grand_total)
+FROM (SELECT DISTINCT o.order_id, strftime('%Y-%m', o.order_date) AS mes,
+             p.category, o.grand_total
+      FROM {months}orders o
+      JOIN order_items oi ON oi.order_id = o.order_id
+      JOIN products p ON p.product_id = oi.product_id
+      {where})
+GROUP BY 1, 2
+"""),
+}
+
+# One row per customer behind /repeat-funnel, /cohort-retention and /rfm.
+# Like the monthly rollups it is refreshed incrementally: an incremental
+# load only rebuilds the rows of contacts that received new orders (one
+# pass over idx_orders_date_contact, no re-aggregation of everyone else).
+# No (contact_id, …) index on purpose: the planner would pick it for the
+# product / category funnel and scan orders instead of the semi-join.
+CUSTOMER_DDL = """
+CREATE TABLE IF NOT EXISTS customer_summary (
+    contact_id      INTEGER PRIMARY KEY,
+    first_order     TEXT,
+    last_order      TEXT,
+    order_count     INTEGER,
+    total_spend     REAL,
+    monthly_orders  TEXT                      -- JSON {"YYYY-MM": orders}
+);
+CREATE INDEX IF NOT EXISTS idx_customer_summary_first
+    ON customer_summary (first_order);
+"""
+
+CUSTOMER_SQL = """
+INSERT INTO customer_summary
+SELECT contact_id, MIN(first_order), MAX(last_order), SUM(n), SUM(spend),
+       json_group_object(mes, n)
+FROM (SELECT contact_id, strftime('%Y-%m', order_date) AS mes,
+             MIN(order_date) AS first_order, MAX(order_date) AS last_order,
+             COUNT(*) AS n, SUM(grand_total) AS spend
+      FROM orders
+      WHERE contact_id IS NOT NULL AND order_date IS NOT NULL {contacts}
+      GROUP BY contact_id, mes
+      ORDER BY contact_id, mes)
+GROUP BY contact_id
+"""
+
+
+# ── 4.  Streaming CSV → SQLite ──
+def _to_int(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return int(float(value))          # "3.0" from spreadsheet exports
+
+def _dmy_to_iso(value: str) -> str:
+    day, month, year = value.split("/")   # 30/03/2025 → 2025-03-30
+    return f"{year}-{month:0>2}-{day:0>2}"
+
+CONVERTERS = {"INTEGER": _to_int, "REAL": float, "TEXT": str}
+
+# derived column → (source CSV column, converter)
+DERIVED = {
+    "campaigns": {"send_date_iso": ("send_date", _dmy_to_iso)},
+}
+
+
+def table_columns(cur: sqlite3.Cursor, tbl: str) -> list[tuple[str, str]]:
+    """(name, declared type) in table order, as created by SCHEMA_DDL."""
+    return [(r[1], r[2].upper()) for r in cur.execute(f"PRAGMA table_info({tbl})")]
+
+
+def _lines(fh, start: int, end: int | None):
+    """Decoded lines whose first byte lies in [start, end) of a binary file."""
+    if start:
+        fh.seek(start - 1)
+        fh.readline()                     # finish the line the range cut into
+    pos = fh.tell()
+    for raw in fh:
+        if end is not None and pos >= end:
+            break
+        pos += len(raw)
+        yield raw.decode("utf-8")
+
+
+def read_chunks(csv_path: Path, columns: list[tuple[str, str]],
+                derived: dict | None = None, chunk_rows: int = CHUNK_ROWS,
+                start: int = 0, end: int | None = None):
+    """
+    Yield lists of row tuples (≤ chunk_rows each) typed after ``columns``.
+    Empty CSV cells become NULL; derived columns are computed from their
+    source cell. ``start`` / ``end`` restrict parsing to the records that
+    begin inside that byte range (records must not contain raw newlines).
+    """
+    derived = derived or {}
+    with open(csv_path, "rb") as fh:
+        header = next(csv.reader([fh.readline().decode("utf-8-sig")]))
+        plan = []
+        for name, decl in columns:
+            src, conv = derived.get(name, (name, CONVERTERS.get(decl, str)))
+            if src not in header:
+                raise ValueError(f"{csv_path.name}: coluna ausente '{src}'")
+            plan.append((header.index(src), conv))
+
+        batch = []
+        for rec in csv.reader(_lines(fh, max(start, fh.tell()), end)):
+            if not rec:
+                continue
+            batch.append(tuple(
+                conv(rec[i]) if rec[i] != "" else None for i, conv in plan))
+            if len(batch) >= chunk_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
 
-# ── 2.  (Re)populate ---------------------------------------------------------
-def populate_db() -> None:
-    """Drop / recreate all four tables from CSV files."""
-    conn = sqlite3.connect(DB_PATH)
+def insert_sql(cur: sqlite3.Cursor, tbl: str, upsert: bool = False):
+    """(INSERT statement, columns) for a table created from SCHEMA_DDL."""
+    columns = table_columns(cur, tbl)
+    sql = (f"INSERT INTO {tbl} ({', '.join(c for c, _ in columns)}) "
+           f"VALUES ({', '.join('?' * len(columns))})")
+    if upsert:
+        sql += " ON CONFLICT DO NOTHING"
+    return sql, columns
+
+
+def load_table(cur: sqlite3.Cursor, tbl: str, upsert: bool = False) -> int:
+    """
+    Stream CSV_DIR/<tbl>.csv into the table; return rows read. With
+    ``upsert`` rows whose primary key is already there are skipped.
+    """
+    sql, columns = insert_sql(cur, tbl, upsert)
+    total = 0
+    for batch in read_chunks(CSV_DIR / f"{tbl}.csv", columns, DERIVED.get(tbl)):
+        cur.executemany(sql, batch)
+        total += len(batch)
+    return total
+
+
+# ── 4b. Parallel parse, single writer ──
+# Parsing and type conversion are CPU-bound and independent per table, so
+# worker processes do that (a big CSV is split into RANGE_BYTES pieces) and
+# ship typed batches over a bounded queue to the one process that writes.
+# It only pays with a core per worker on top of the writer's: every batch
+# is pickled across the queue, and on one core that costs more than the
+# parsing it moves (benchmarks/bench_load.py, ×2000 on one core: 2 workers
+# ×0.78 of serial). The writer's inserts bound the gain either way, hence
+# --workers defaults to 1.
+RANGE_BYTES = int(os.getenv("LOAD_RANGE_BYTES", str(32 * 1024 * 1024)))
+
+_batches = None                           # worker side of the batch queue
+
+def _init_worker(queue) -> None:
+    global _batches
+    _batches = queue
+    # if the writer gave up, batches still in the pipe must not keep the
+    # worker from exiting
+    queue.cancel_join_thread()
+
+
+def _parse_range(tbl, csv_path, columns, start, end, chunk_rows) -> None:
+    try:
+        for batch in read_chunks(csv_path, columns, DERIVED.get(tbl),
+                                 chunk_rows, start, end):
+            _batches.put((tbl, batch))
+    finally:
+        _batches.put((tbl, None))         # "this range is done", even on error
+
+
+def byte_ranges(csv_path: Path, range_bytes: int = RANGE_BYTES):
+    size = csv_path.stat().st_size
+    return [(lo, min(lo + range_bytes, size))
+            for lo in range(0, max(size, 1), range_bytes)]
+
+
+def load_tables_parallel(conn: sqlite3.Connection, tables: list[str],
+                         upsert: set[str], workers: int):
+    """
+    Load ``tables`` with ``workers`` parser processes; yield
+    (tbl, rows, new_rows, seconds) as each table finishes.
+    """
+    import multiprocessing as mp
+    from queue import Empty
+    from concurrent.futures import ProcessPoolExecutor
+
+    cur   = conn.cursor()
+    plans = {t: insert_sql(cur, t, t in upsert) for t in tables}
+    queue = mp.get_context().Queue(maxsize=workers * 4)    # bounds memory
+    # a table's clock starts with its first parsed batch, not with the pool:
+    # process start-up and the ranges of tables queued before it don't count
+    started = {}
+    pending, rows, added = {}, dict.fromkeys(tables, 0), dict.fromkeys(tables, 0)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(queue,)) as pool:
+        futures = []
+        for tbl in tables:
+            csv_path = CSV_DIR / f"{tbl}.csv"
+            ranges = byte_ranges(csv_path)
+            pending[tbl] = len(ranges)
+            futures += [pool.submit(_parse_range, tbl, csv_path, plans[tbl][1],
+                                    lo, hi, CHUNK_ROWS) for lo, hi in ranges]
+
+        try:
+            while any(pending.values()):
+                tbl, batch = queue.get()
+                now = time.perf_counter()
+                started.setdefault(tbl, now)
+                if batch is None:
+                    pending[tbl] -= 1
+                    if not pending[tbl]:
+                        yield tbl, rows[tbl], added[tbl], now - started[tbl]
+                    continue
+                before = conn.total_changes
+                cur.executemany(plans[tbl][0], batch)
+                added[tbl] += conn.total_changes - before
+                rows[tbl]  += len(batch)
+        except BaseException:
+            # the write failed (or the caller stopped): running workers may
+            # be blocked on the full queue, and leaving the pool would wait
+            # for them forever – drop what is queued until they are done
+            pool.shutdown(wait=False, cancel_futures=True)
+            while not all(fut.done() for fut in futures):
+                try:
+                    queue.get(timeout=0.1)
+                except Empty:
+                    pass
+            raise
+
+        for fut in futures:
+            fut.result()                  # surface parse errors
+
+
+def fingerprint(csv_path: Path, known: dict | None = None) -> dict:
+    """size / mtime / sha256 of a CSV; re-hashes only if size or mtime moved."""
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV não encontrado: {csv_path}")
+    st = csv_path.stat()
+    if known and (known["size"], known["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+        return known
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha256": digest.hexdigest()}
+
+
+def _live_state() -> tuple[int, dict | None]:
+    """(generation, {tbl: fingerprint} or None) of the current app.db."""
+    if not DB_PATH.exists():
+        return 0, None
+    conn = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        generation = conn.execute("PRAGMA user_version").fetchone()[0]
+        try:
+            rows = conn.execute(
+                "SELECT tbl, size, mtime_ns, sha256 FROM _load_state").fetchall()
+        except sqlite3.OperationalError:          # built before fingerprints
+            return generation, None
+        return generation, {r[0]: {"size": r[1], "mtime_ns": r[2], "sha256": r[3]}
+                            for r in rows}
+    finally:
+        conn.close()
+
+
+def _remove_shadow() -> None:
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        Path(f"{SHADOW_PATH}{suffix}").unlink(missing_ok=True)
+
+
+# ── 5.  (Re)populate ──
+def _load_tables_serial(conn: sqlite3.Connection, tables: list[str],
+                        upsert: set[str]):
+    cur = conn.cursor()
+    for tbl in tables:
+        started = time.perf_counter()
+        before  = conn.total_changes
+        rows    = load_table(cur, tbl, upsert=tbl in upsert)
+        yield tbl, rows, conn.total_changes - before, time.perf_counter() - started
+
+
+def track_new_orders(conn: sqlite3.Connection) -> set:
+    """
+    Collect the contact_id of every order inserted on ``conn`` from now on.
+
+    The trigger calls back into Python instead of writing to a table, so
+    it does not inflate total_changes (the "novas" column of the report).
+    INSERT OR IGNORE skips existing keys without firing AFTER INSERT, so
+    only genuinely new orders mark their customer.
+    """
+    dirty = set()
+    conn.create_function("_mark_contact", 1, dirty.add)
+    conn.execute("CREATE TEMP TRIGGER _orders_new_contact AFTER INSERT ON orders "
+                 "BEGIN SELECT _mark_contact(NEW.contact_id); END")
+    return dirty
+
+
+def refresh_customer_summary(cur: sqlite3.Cursor, contacts: set | None) -> int:
+    """Rebuild customer_summary, or only the rows of ``contacts``; returns
+    the number of customers rebuilt."""
+    exists = cur.execute("SELECT 1 FROM sqlite_master "
+                         "WHERE name = 'customer_summary'").fetchone()
+    cur.executescript(CUSTOMER_DDL)
+    cur.execute("BEGIN")
+    if contacts is None or not exists:
+        cur.execute("DELETE FROM customer_summary")
+        cur.execute(CUSTOMER_SQL.format(contacts=""))
+        rebuilt = cur.rowcount
+    else:
+        cur.execute("CREATE TEMP TABLE _dirty_contacts (contact_id INTEGER PRIMARY KEY)")
+        cur.executemany("INSERT OR IGNORE INTO _dirty_contacts VALUES (?)",
+                        ((c,) for c in contacts if c is not None))
+        cur.execute("DELETE FROM customer_summary "
+                    "WHERE contact_id IN (SELECT contact_id FROM _dirty_contacts)")
+        cur.execute(CUSTOMER_SQL.format(
+            contacts="AND contact_id IN (SELECT contact_id FROM _dirty_contacts)"))
+        rebuilt = cur.rowcount
+        cur.execute("DROP TABLE _dirty_contacts")
+    cur.execute("COMMIT")
+    return rebuilt
+
+
+def track_rollup_months(conn: sqlite3.Connection) -> dict:
+    """
+    Collect, per monthly rollup, the months (YYYY-MM) of the rows inserted
+    on ``conn`` from now on, the way track_new_orders collects customers.
+    A new order item marks its order's month if the order is already
+    there; an order inserted after its items marks that month itself.
+    """
+    months = {name: set() for name in ROLLUPS}
+    conn.create_function("_mark_month", 2,
+                         lambda name, mes: months[name].add(mes))
+    conn.execute("CREATE TEMP TRIGGER _campaigns_new_month AFTER INSERT ON campaigns "
+                 "BEGIN SELECT _mark_month('campaigns_monthly', "
+                 "substr(NEW.send_date_iso, 1, 7)); END")
+    conn.execute("CREATE TEMP TRIGGER _orders_new_month AFTER INSERT ON orders "
+                 "BEGIN SELECT _mark_month('orders_monthly', strftime('%Y-%m', NEW.order_date)), "
+                 "_mark_month('orders_monthly_category', strftime('%Y-%m', NEW.order_date)); END")
+    conn.execute("CREATE TEMP TRIGGER _order_items_new_month AFTER INSERT ON order_items "
+                 "BEGIN SELECT _mark_month('orders_monthly_category', strftime('%Y-%m', order_date)) "
+                 "FROM orders WHERE order_id = NEW.order_id; END")
+    return months
+
+
+def refresh_rollups(cur: sqlite3.Cursor, months: dict | None) -> dict:
+    """
+    Rebuild the monthly rollups, or – with ``months`` ({rollup: months to
+    redo}, None for all of one) – only those months of each; returns
+    {rollup: months recalculated}.
+    """
+    exists = {r[0] for r in cur.execute("SELECT name FROM sqlite_master "
+                                        "WHERE type = 'table'")}
+    cur.executescript(ROLLUP_DDL)
+    cur.execute("BEGIN")
+    cur.execute("CREATE TEMP TABLE _rollup_months (mes TEXT PRIMARY KEY)")
+    refreshed = {}
+    for name, (column, sql) in ROLLUPS.items():
+        touched = months.get(name) if months is not None and name in exists else None
+        # an undated row lands in the NULL month, which no range can select
+        if touched is None or None in touched:
+            cur.execute(f"DELETE FROM {name}")
+            cur.execute(sql.format(months="", where=""))
+            touched = [r[0] for r in cur.execute(f"SELECT DISTINCT mes FROM {name}")]
+        elif touched:
+            cur.executemany("INSERT INTO _rollup_months VALUES (?)",
+                            ((m,) for m in touched))
+            cur.execute(f"DELETE FROM {name} "
+                        "WHERE mes IN (SELECT mes FROM _rollup_months)")
+            cur.execute(sql.format(
+                months="_rollup_months m CROSS JOIN ",
+                where=f"WHERE {column} >= m.mes AND {column} < m.mes || '-32'"))
+            cur.execute("DELETE FROM _rollup_months")
+        refreshed[name] = len(touched)
+    cur.execute("DROP TABLE _rollup_months")
+    cur.execute("COMMIT")
+    return refreshed
+
+
+def populate_db(incremental: bool = False, workers: int = 1) -> None:
+    """
+    Rebuild app.db from the CSVs.
+
+    The new database is written to SHADOW_PATH and atomically renamed over
+    app.db, so the API's readers never wait on the load nor see a half-built
+    file. With ``incremental`` the shadow starts as a copy of app.db, CSVs
+    whose fingerprint did not change are skipped, append-only tables only
+    receive new keys and the others are reloaded. ``workers`` > 1 parses
+    the CSVs in that many processes (see load_tables_parallel).
+    """
+    generation, state = _live_state()
+    full = not incremental or state is None
+    known = {} if full else state
+    prints = {t: fingerprint(CSV_DIR / f"{t}.csv", known.get(t)) for t in TABLES}
+    changed = [t for t in TABLES
+               if full or prints[t]["sha256"] != known.get(t, {}).get("sha256")]
+    if not changed:
+        print("✅  app.db já está atualizado – nenhum CSV mudou.")
+        return
+
+    _remove_shadow()                      # leftovers of an interrupted load
+    if not full:
+        live = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True)
+        shadow = sqlite3.connect(SHADOW_PATH)
+        live.backup(shadow)               # consistent copy, readers unaffected
+        live.close()
+        shadow.close()
+
+    conn = sqlite3.connect(SHADOW_PATH, isolation_level=None)   # we BEGIN ourselves
     cur  = conn.cursor()
 
-    # Apply the DDL so we always have the structure on disk
-    cur.executescript(SCHEMA_DDL)
+    # Bulk-load settings: no rollback journal, no fsync. Nobody reads the
+    # shadow file, so a crash mid-load just means "run it again".
+    cur.execute("PRAGMA journal_mode=OFF")
+    cur.execute("PRAGMA synchronous=OFF")
+
+    if full:
+        cur.executescript(SCHEMA_DDL + STATE_DDL)
+
+    upsert = set() if full else APPEND_ONLY & set(changed)
+    new_orders = None if full else (
+        track_new_orders(conn) if "orders" in changed else set())
+    new_months = None if full else track_rollup_months(conn)
+    cur.execute("BEGIN")
+    for tbl in changed:
+        if not full and tbl not in upsert:
+            cur.execute(f"DELETE FROM {tbl}")
+    for tbl, rows, added, elapsed in (
+            load_tables_parallel(conn, changed, upsert, workers) if workers > 1
+            else _load_tables_serial(conn, changed, upsert)):
+        print(f"  • {tbl:<12}  {rows:>9,} linhas  {added:>9,} novas  "
+              f"{rows / max(elapsed, 1e-9):>12,.0f} linhas/s")
+        fp = prints[tbl]
+        cur.execute(
+            "INSERT OR REPLACE INTO _load_state VALUES (?, ?, ?, ?)",
+            (tbl, fp["size"], fp["mtime_ns"], fp["sha256"]))
+    cur.execute("COMMIT")
 
-    # Load each CSV with pandas and shove into SQLite
-    for tbl in ["contacts", "products", "orders", "order_items","campaigns"]:
-        csv_path = CSV_DIR / f"{tbl}.csv"
-        if not csv_path.exists():
-            raise FileNotFoundError(f"CSV não encontrado: {csv_path}")
+    cur.executescript(INDEX_DDL)
+    if new_months is not None and "products" in changed:
+        new_months["orders_monthly_category"] = None    # categories may have moved
+    for name, months in refresh_rollups(cur, new_months).items():
+        print(f"  • {name:<23} {months:>9,} meses recalculados")
+    customers = refresh_customer_summary(cur, new_orders)
+    print(f"  • customer_summary  {customers:>9,} clientes recalculados")
+    # exact per-month summaries, from the rollup just refreshed (sketches.py)
+    if full or "campaigns" in changed or not sketches.stored(cur):
+        print(f"  • sender_sketch     {sketches.rebuild(cur):>9,} meses recalculados")
+    cur.execute("ANALYZE")      # planner stats: selective filter vs. broad one
 
-        df = pd.read_csv(csv_path)
-        df.to_sql(tbl, conn, if_exists="replace", index=False)
-        print(f"  • {tbl:<12}  {len(df):>6,} linhas")
+    # Generation counter: the API's caches key on it (db.generation())
+    cur.execute(f"PRAGMA user_version={generation + 1}")
+    # ... and a random id per build: user_version restarts at 1 when app.db
+    # is deleted, so the ETags carry this too (db.build_id())
+    cur.executescript(BUILD_DDL)
+    cur.execute("DELETE FROM _build")
+    cur.execute("INSERT INTO _build VALUES (?)", (secrets.token_hex(8),))
 
-    conn.commit()
+    # WAL lets the API's read-only pool (db.py) read without locking
+    cur.execute("PRAGMA journal_mode=WAL")
+    # the rename moves SHADOW_PATH alone, so no page may be left behind in
+    # its -wal: checkpoint everything and empty it (close() then deletes it).
+    # main. only: unqualified, the temp schema of the refreshes is "locked"
+    busy, _, _ = cur.execute("PRAGMA main.wal_checkpoint(TRUNCATE)").fetchone()
+    if busy:
+        raise RuntimeError(f"could not checkpoint {SHADOW_PATH.name}")
     conn.close()
-    print("✅  app.db criado / atualizado.")
 
+    # make the bytes durable before the rename makes them visible
+    fd = os.open(SHADOW_PATH, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    # Safe under live readers: the rename is atomic, so a new connection
+    # opens either file whole, and an open one keeps reading the old inode
+    # until the pool sees the swap (db.ConnectionPool._check_swap). Nothing
+    # ever writes app.db itself (the API is mode=ro), so the app.db-wal /
+    # -shm the old and new file share by name never hold a frame, and an
+    # old connection removing them on close loses nothing.
+    os.replace(SHADOW_PATH, DB_PATH)
+    print(f"✅  app.db {'criado' if full else 'atualizado'} "
+          f"(geração {generation + 1}).")
 
-# ── 3.  CLI helper -----------------------------------------------------------
+
+# ── 6.  CLI helper -----------------------------------------------------------
 if __name__ == "__main__":
-    populate_db()
+    import argparse
+
+    ap = argparse.ArgumentParser(description="(Re)build backend/app.db")
+    ap.add_argument("--incremental", action="store_true",
+                    help="only load CSVs that changed since the last run")
+    ap.add_argument("--workers", type=int, default=1, metavar="N",
+                    help="parse CSVs in N worker processes; needs N spare "
+                         "cores to beat the default of 1")
+    args = ap.parse_args()
+    populate_db(incremental=args.incremental, workers=args.workers)
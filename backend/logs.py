@@ -0,0 +1,255 @@
+# logs.py ─── the one logging setup: a queue in front, rotating files behind
+"""
+``configure()`` (called once by main.py; idempotent) replaces the
+``logging.basicConfig`` calls main.py, db_agent.py and analytics_runner.py
+used to make at import time:
+
+• the root logger gets a single QueueHandler; the console and file
+  handlers run on a QueueListener thread, so a request thread only pays
+  for putting the record on a bounded queue – never for file I/O
+• the listener drains the queue in batches every LOG_FLUSH_INTERVAL
+  seconds instead of waking for each record: a wake-up per record makes
+  the listener compete with the request threads for the GIL (and, on a
+  small box, for the CPU) right when they are busy; its handlers buffer
+  the batch and flush once at the end of it
+• formatting is lazy: records whose arguments are plain scalars or
+  ``payload()`` wrappers cross the queue unformatted and are rendered on
+  the listener thread; anything else (and tracebacks) is formatted first,
+  as QueueHandler does, so later mutation can't change what is logged
+• files rotate (LOG_FILE_MAX_BYTES × LOG_FILE_BACKUPS): backend.log gets
+  everything, and the loggers in FILES additionally keep their own file
+• a full queue drops the record instead of blocking; drops are counted in
+  log_records_dropped_total and at GET /stats/logging
+
+``payload(value)`` is what to log instead of SQL text, crew output and
+response bodies: it renders as at most LOG_PAYLOAD_MAX characters, except
+for a LOG_PAYLOAD_SAMPLE fraction of calls, which log the value in full.
+
+LOG_LEVEL, LOG_DIR, LOG_FILE ("" = console only), LOG_QUEUE_SIZE and
+LOG_FLUSH_INTERVAL tune it.
+Several uvicorn workers should each get their own LOG_DIR: rotation is
+per process.
+"""
+import os
+import sys
+import copy
+import queue
+import atexit
+import random
+import logging
+import threading
+from pathlib import Path
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import metrics
+
+LEVEL          = os.getenv("LOG_LEVEL", "INFO").upper()
+DIR            = Path(os.getenv("LOG_DIR", Path(__file__).parent))
+FILE           = os.getenv("LOG_FILE", "backend.log")
+MAX_BYTES      = int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+BACKUPS        = int(os.getenv("LOG_FILE_BACKUPS", "5"))
+QUEUE_SIZE     = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.25"))  # seconds
+PAYLOAD_MAX    = int(os.getenv("LOG_PAYLOAD_MAX", "500"))        # characters
+PAYLOAD_SAMPLE = float(os.getenv("LOG_PAYLOAD_SAMPLE", "0"))     # 0…1
+
+FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+FILES  = {"analytics_runner": "analytics_runner.log"}            # logger → own file
+
+LOG_DROPPED = metrics.Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.", ())
+
+_lock       = threading.Lock()
+_listener   = None
+_handler    = None
+_stats_lock = threading.Lock()         # enqueue runs on every logging thread
+_stats      = {"queued": 0, "dropped": 0}
+
+
+# ── payloads ─────────────────────────────────────────────────────────────────
+def truncate(text: str, limit: int | None) -> str:
+    """``text`` cut to ``limit`` characters; 0 / None keep it whole."""
+    if not limit or len(text) <= limit:
+        return text
+    return f"{text[:limit]}… (+{len(text) - limit:,} chars)"
+
+
+class Payload:
+    """``value`` as a log argument, rendered (and truncated) only if emitted."""
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit: int | None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else repr(self.value)
+        return truncate(text, self.limit)
+
+    def __repr__(self) -> str:
+        return truncate(repr(self.value), self.limit)
+
+
+def payload(value, limit: int | None = None) -> Payload:
+    """
+    Wrap a large log argument (``limit`` defaults to LOG_PAYLOAD_MAX). The
+    value is rendered on the listener thread, so pass something that no
+    longer changes (a finished result, a str).
+    """
+    if PAYLOAD_SAMPLE and random.random() < PAYLOAD_SAMPLE:
+        return Payload(value, None)
+    return Payload(value, PAYLOAD_MAX if limit is None else limit)
+
+
+# ── the queue ────────────────────────────────────────────────────────────────
+_LAZY = (str, int, float, bool, type(None), Payload)
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener when it is safe."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args or ()
+        # a lone dict argument *is* record.args, and may still change
+        if (record.exc_info or record.stack_info or not isinstance(args, tuple)
+                or not all(isinstance(a, _LAZY) for a in args)):
+            return super().prepare(record)
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            outcome = "queued"
+        except queue.Full:
+            outcome = "dropped"
+            LOG_DROPPED.inc()
+        with _stats_lock:
+            _stats[outcome] += 1
+
+
+class BatchQueueListener(QueueListener):
+    """QueueListener that wakes every FLUSH_INTERVAL and handles all queued."""
+
+    def __init__(self, records: queue.Queue, *handlers, **kwargs):
+        super().__init__(records, *handlers, **kwargs)
+        self._stopping = threading.Event()
+
+    def _monitor(self) -> None:
+        while True:
+            self._stopping.wait(FLUSH_INTERVAL)
+            try:
+                while True:
+                    try:
+                        record = self.dequeue(False)
+                    except queue.Empty:
+                        break
+                    if record is self._sentinel:
+                        return
+                    self.handle(record)
+            finally:
+                for handler in self.handlers:
+                    handler.end_batch()
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)             # waits for room if it is full
+
+    def stop(self) -> None:
+        self._stopping.set()                       # drain now, then the sentinel
+        super().stop()
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler that flushes when the listener's batch ends, not per record."""
+
+    def flush(self) -> None:
+        pass
+
+    def end_batch(self) -> None:
+        super().flush()
+
+
+class BatchFileHandler(BatchStreamHandler, RotatingFileHandler):
+    """
+    RotatingFileHandler with batch flushing. The file size (in encoded
+    bytes, as maxBytes means) is counted here: the stock shouldRollover()
+    seeks (which flushes) and formats every record a second time.
+    """
+
+    def __init__(self, filename: Path, **kwargs):
+        super().__init__(filename, maxBytes=MAX_BYTES, backupCount=BACKUPS,
+                         encoding="utf-8", **kwargs)
+        self._size = os.path.getsize(filename) if os.path.exists(filename) else 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            msg = self.format(record) + self.terminator
+            size = len(msg.encode(self.encoding))
+            if self.maxBytes and self._size and self._size + size >= self.maxBytes:
+                self.doRollover()
+                self._size = 0
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg)
+            self._size += size
+        except Exception:
+            self.handleError(record)
+
+
+def _handlers() -> list[logging.Handler]:
+    formatter = logging.Formatter(FORMAT)
+    handlers = [BatchStreamHandler(sys.stderr)]
+    if FILE:
+        DIR.mkdir(parents=True, exist_ok=True)
+        handlers.append(BatchFileHandler(DIR / FILE))
+        for name, filename in FILES.items():
+            handler = BatchFileHandler(DIR / filename)
+            handler.addFilter(logging.Filter(name))
+            handlers.append(handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def configure() -> None:
+    """Route every logger through the queue (once per process)."""
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            return
+        records = queue.Queue(QUEUE_SIZE)
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        _handler = LazyQueueHandler(records)
+        root.addHandler(_handler)
+        root.setLevel(LEVEL)
+        _listener = BatchQueueListener(records, *_handlers(),
+                                       respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Flush what is queued and stop the listener thread."""
+    global _listener, _handler
+    with _lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = _handler = None
+
+
+def stats() -> dict:
+    with _stats_lock:
+        counts = dict(_stats)
+    return {**counts, "configured": _listener is not None,
+            "pending": _listener.queue.qsize() if _listener else 0,
+            "level": LEVEL, "queue_size": QUEUE_SIZE,
+            "flush_interval": FLUSH_INTERVAL,
+            "file": str(DIR / FILE) if FILE else None,
+            "payload_max": PAYLOAD_MAX, "payload_sample": PAYLOAD_SAMPLE}
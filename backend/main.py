@@ -1,23 +1,55 @@
 # backend/main.py ─── app factory & chat
 
+import time
 import logging
-from fastapi import FastAPI, Request, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 
-from db_agent import analytics_crew          # ← your CrewAI integration
+import crew                                  # ← CrewAI integration, loaded lazily
+import columnar
+from crew import analytics_crew
 from analytics import router as analytics_router
 from campaigns import router as campaigns_router
+from export import router as export_router, export_pool
+from db import pool
+from executors import db_executor, crew_executor, Saturated
+from chart_cache import cache as chart_cache, flights as chart_flights
+import chat_cache
+import chat_events
+import logs
+import metrics
+import querylog
+import schema_contract
+import warmer
 
-# ── Logging ───────────────────────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-)
+# ── Logging: queue + rotating files, the only place it is configured ──────────
+logs.configure()
 logger = logging.getLogger("backend")
 
 # ── FastAPI app ───────────────────────────────────────────────────────────────
-app = FastAPI(title="Dashboard AI – Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # a column the charts or the agent expect is missing → refuse to start
+    schema_contract.verify()
+    # charts are servable immediately; crewai loads in the background
+    crew.warm_up()
+    columnar.warm_up()
+    # the dashboard presets get cached after every rebuild, before users ask
+    warming = warmer.start()
+    yield
+    if warming is not None:
+        warming.cancel()
+
+# querylog's endpoint label: the route template, like the request metrics.
+# A dependency runs after routing (a middleware only sees the raw path) and
+# in the request's own context, so the endpoint's threads inherit it.
+async def label_queries(request: Request):
+    querylog.endpoint.set(request.scope["route"].path)
+
+app = FastAPI(title="Dashboard AI – Backend", lifespan=lifespan,
+              dependencies=[Depends(label_queries)])
 
 # ── CORS (only really needed if you ever call from another domain) ────────────
 app.add_middleware(
@@ -28,25 +60,136 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── Back-pressure: a full executor answers 503 instead of queueing forever ────
+@app.exception_handler(Saturated)
+async def saturated_handler(request: Request, exc: Saturated):
+    return JSONResponse(
+        {"detail": f"Servidor ocupado ({exc.pool}); tente novamente."},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# ── Instrumentation: per-route latency ────────────────────────────────────────
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=getattr(route, "path", "unmatched"),
+            method=request.method, status=status)
+
 # Mount your routers (they themselves define the /charts/* paths)
 app.include_router(analytics_router)
 app.include_router(campaigns_router)
+app.include_router(export_router)
+
+# ── Ops: connection-pool statistics ───────────────────────────────────────────
+@app.get("/stats/db-pool")
+def db_pool_stats():
+    """Checkouts, waits and open connections of the shared SQLite pool
+    (and, under "export", of the /export/* downloads' own pool)."""
+    return {**pool.stats(), "export": export_pool.stats()}
+
+@app.get("/stats/executors")
+def executor_stats():
+    """Queue depth and rejections of the db / crew / cache-warm thread pools."""
+    return {"db": db_executor.stats(), "crew": crew_executor.stats(),
+            "warm": warmer.warm_executor.stats()}
+
+@app.get("/stats/chart-cache")
+def chart_cache_stats():
+    """Hit / miss / eviction counters of the /charts/* result cache, and
+    how many misses were coalesced onto an identical in-flight request."""
+    return {**chart_cache.stats(), "single_flight": chart_flights.stats(),
+            "warmer": warmer.stats()}
+
+@app.get("/stats/chat-cache")
+def chat_cache_stats():
+    """Hit / miss counters of the /chat answer and SQL-result caches."""
+    return chat_cache.stats()
+
+@app.get("/stats/columnar")
+def columnar_stats():
+    """Which chart engine is active and the size of the NumPy snapshot."""
+    return columnar.stats()
+
+@app.get("/stats/queries")
+def query_stats():
+    """SQL fingerprints by total time: calls, rows, max and slow counts."""
+    return querylog.stats()
+
+@app.get("/stats/slow-queries")
+def slow_query_log():
+    """Most recent slow queries with their EXPLAIN QUERY PLAN."""
+    return querylog.slow_queries()
+
+@app.get("/stats/logging")
+def logging_stats():
+    """Records queued / dropped by the logging queue and its settings."""
+    return logs.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus scrape target: request, DB query and crew kickoff histograms."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/stats/crew")
+def crew_stats():
+    """Whether this worker serves /chat and whether the crew is loaded yet."""
+    return crew.stats()
 
 # ── Chat (LLM) endpoint ───────────────────────────────────────────────────────
+def _chat_message(payload: dict) -> str:
+    if not crew.CHAT_ENABLED:
+        raise HTTPException(404, detail="Chat is disabled on this worker.")
+    user_message = payload.get("message")
+    if not user_message:
+        raise HTTPException(400, detail="Field 'message' is required.")
+    return user_message
+
 @app.post("/chat")
 async def chat_json(request: Request):
     """
     Body:  { "message": "<user query>" }
     Reply: { "query": "<SQL>", "results": [...], "reasoning": "..." }
     """
-    payload = await request.json()
-    user_message = payload.get("message")
-    if not user_message:
-        raise HTTPException(400, detail="Field 'message' is required.")
+    user_message = _chat_message(await request.json())
 
     try:
-        crew_output = analytics_crew.kickoff({"input": user_message})
-        return JSONResponse(crew_output.dict())
+        # LLM round-trips run on their own pool, never on the event loop
+        # repeated questions are answered from chat_cache without the LLM
+        reply = await crew_executor.run(
+            chat_cache.cached_kickoff, analytics_crew, user_message)
+        return JSONResponse(reply)
+    except Saturated:
+        raise
     except Exception as exc:
         logger.exception("Error in /chat")
         raise HTTPException(500, detail="Internal Server Error") from exc
+
+@app.post("/chat/stream")
+async def chat_stream(request: Request):
+    """
+    Same body as /chat; replies with server-sent events as the crew works:
+    ``sql``, ``rows``, ``reasoning`` …, then ``final`` (the /chat reply) or
+    ``error``, then ``done``.
+    """
+    user_message = _chat_message(await request.json())
+
+    # submitting inside capture() hands the sink to the worker thread;
+    # a full crew pool still answers 503 before the stream starts
+    with chat_events.capture(chat_events.EventStream()) as stream:
+        job = crew_executor.submit(
+            chat_cache.cached_kickoff, analytics_crew, user_message)
+    return StreamingResponse(
+        stream.body(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
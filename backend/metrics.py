@@ -0,0 +1,127 @@
+# metrics.py ─── Prometheus text-format histograms and counters for /metrics
+"""
+A few labelled histograms / counters, kept in process and rendered in the
+Prometheus exposition format (text/plain; version=0.0.4) by GET /metrics:
+
+• http_request_duration_seconds{endpoint,method,status}
+• crew_kickoff_duration_seconds{outcome}     – LLM kickoffs (cache misses)
+• db_query_duration_seconds{endpoint}        – every query via querylog
+• db_query_rows_total{endpoint}
+• chart_requests_coalesced_total{endpoint}   – waited on an identical request
+• chart_cache_warm_duration_seconds          – warming the presets after a rebuild
+• log_records_dropped_total                  – logging queue full (logs.py)
+
+Each uvicorn worker exports its own numbers; scrape them per process.
+"""
+import threading
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_REGISTRY = []
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple):
+        self.name    = name
+        self.help    = help
+        self.labels  = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict = {}               # label values → [counts…, sum, n]
+        self._lock   = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[n] for n in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for key, series in sorted(items):
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = _labels(self.labels, key, 'le="%g"' % bound)
+                out.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labels, key, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{le} {series[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-2]:.6f}")
+            out.append(f"{self.name}_count{_labels(self.labels, key)} {series[-1]}")
+        return out
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple):
+        self.name   = name
+        self.help   = help
+        self.labels = labels
+        self._values: dict = {}
+        self._lock  = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[n] for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        out += [f"{self.name}{_labels(self.labels, k)} {v:g}" for k, v in items]
+        return out
+
+
+def render() -> str:
+    return "\n".join(line for m in _REGISTRY for line in m.render()) + "\n"
+
+
+_LATENCY = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+            1, 2.5, 5, 10)
+
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to the response start, per route.",
+    ("endpoint", "method", "status"), _LATENCY)
+
+KICKOFF_SECONDS = Histogram(
+    "crew_kickoff_duration_seconds", "Crew kickoff wall time (chat cache misses).",
+    ("outcome",), (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQLite execute + fetch time, per endpoint.",
+    ("endpoint",), _LATENCY)
+
+DB_QUERY_ROWS = Counter(
+    "db_query_rows_total", "Rows returned by SQLite, per endpoint.",
+    ("endpoint",))
+
+CHART_COALESCED = Counter(
+    "chart_requests_coalesced_total",
+    "Chart requests answered by an identical in-flight computation.",
+    ("endpoint",))
+
+CHART_WARM_SECONDS = Histogram(
+    "chart_cache_warm_duration_seconds",
+    "Time to precompute every dashboard preset after an app.db rebuild.",
+    (), (1, 2.5, 5, 10, 30, 60, 120, 300, 600))
@@ -0,0 +1,104 @@
+# query_plan.py ─── EXPLAIN QUERY PLAN checks for the chart SQL
+"""
+Every chart builds its SQL through a ``*_sql()`` function; this module runs
+``EXPLAIN QUERY PLAN`` on them and flags full table scans.
+
+Run it after touching a query or an index:
+
+    python query_plan.py          # exit status 1 if a filtered chart scans
+
+Charts with no filter at all are allowed to scan (they read everything);
+with any filter set, every base table must be reached through an index.
+"""
+import sys
+
+import analytics
+import campaigns
+from rollups import month_split
+from db import connection
+from querylog import explain
+
+# temp tables, subquery materializations (the bundles' f_orders and
+# by_sender), the per-row json_each() of /cohort-retention and the
+# candidate list of the approximate sender mix are not base-table scans
+_ALLOWED_SCANS = ("SCAN CONSTANT ROW", "SCAN f_orders", "SCAN by_sender",
+                  "SCAN j VIRTUAL TABLE")
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Plan nodes that walk a whole table (or whole index) row by row."""
+    return [node for node in plan
+            if node.startswith("SCAN ")
+            and not node.startswith(_ALLOWED_SCANS)
+            and not node.startswith("SCAN (subquery")]
+
+
+def _monthly(measures):
+    return lambda **f: campaigns.monthly_sql(
+        measures, f.get("data_inicial"), f.get("data_final"), f.get("sender"))
+
+
+def _sketch(**f):
+    sketch_sql, _, params = campaigns.sender_sketch_sql(**f)
+    return sketch_sql, params
+
+
+def _recount(senders=("_",), **f):
+    span, edges = month_split(f.get("data_inicial"), f.get("data_final"))
+    return campaigns.sender_recount_sql(span, edges, list(senders))
+
+
+# (chart, sql builder, filters) – partial-month dates force the raw tables,
+# whole months exercise the rollups
+_PARTIAL = {"data_inicial": "2024-01-15", "data_final": "2024-03-10"}
+_MONTHS  = {"data_inicial": "2024-01-01", "data_final": "2024-06-30"}
+
+CASES = [
+    *[(name, builder, filters)
+      for name, builder in [("aov", analytics.aov_sql),
+                            ("category-mix", analytics.category_mix_sql),
+                            ("repeat-funnel", analytics.repeat_funnel_sql)]
+      for filters in [_PARTIAL, _MONTHS, {"product_id": 4},
+                      {"category": "Footwear"},
+                      {**_PARTIAL, "category": "Footwear"},
+                      {**_MONTHS, "category": "Footwear"}]],
+    *[("cohort-retention", analytics.cohort_retention_sql, f)
+      for f in [_PARTIAL, _MONTHS]],
+    *[("vendas_por_mes", analytics.vendas_por_mes_sql, f)
+      for f in [_PARTIAL, _MONTHS]],
+    *[(name, _monthly(campaigns.MEASURES[name]), filters)
+      for name in ["email-volume", "email-engagement", "email-unsub-rate"]
+      for filters in [_PARTIAL, _MONTHS, {"sender": "Relacionamento"},
+                      {**_PARTIAL, "sender": "Relacionamento"}]],
+    *[("email-sender-mix", campaigns.email_sender_mix_sql, f)
+      for f in [_PARTIAL, _MONTHS]],
+    *[("campaign-bundle", campaigns.campaign_bundle_sql, f)
+      for f in [_PARTIAL, _MONTHS, {**_PARTIAL, "sender": "Relacionamento"}]],
+    # ?approx=true: the month summaries, then the candidates' recount
+    *[(name, builder, f)
+      for name, builder in [("sender-mix sketch", _sketch),
+                            ("sender-mix recount", _recount)]
+      for f in [_PARTIAL, _MONTHS]],
+    *[("sender-mix recount", _recount, f)
+      for f in [{}, {**_MONTHS, "senders": ("_", None)}]],
+]
+
+
+def check(cases=CASES) -> list[tuple[str, dict, list[str]]]:
+    """(chart, filters, offending plan nodes) for every case that scans."""
+    failures = []
+    with connection() as conn:
+        for name, builder, filters in cases:
+            sql, params = builder(**filters)
+            scans = full_scans(explain(conn, sql, params))
+            if scans:
+                failures.append((name, filters, scans))
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check()
+    for name, filters, scans in failures:
+        print(f"✗ {name:<18} {filters}: {'; '.join(scans)}")
+    print(f"{len(CASES) - len(failures)}/{len(CASES)} chart plans use indexes only")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,105 @@
+# querylog.py ─── timing, fingerprints and slow-query log for every SQL call
+"""
+The chart routers and the agent's query_sql run their SQL through
+``query()`` (or report streamed reads with ``record()``), which records:
+
+• execute + fetch time and rows, into metrics.DB_QUERY_* labelled with the
+  endpoint that issued the query (``endpoint`` contextvar: the route
+  template, set by a main.py dependency and carried into the executor
+  threads)
+• per-fingerprint totals – literals replaced by ``?``, whitespace and case
+  folded – at GET /stats/queries
+• queries slower than SLOW_QUERY_MS: their EXPLAIN QUERY PLAN, kept in a
+  ring buffer (GET /stats/slow-queries) and logged on "slow_queries"
+"""
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from collections import deque
+from contextvars import ContextVar
+
+import logs
+import metrics
+
+SLOW_MS       = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+MAX_FINGERPRINTS = 1000        # agent SQL is open-ended; the rest go to "other"
+
+logger = logging.getLogger("slow_queries")
+
+endpoint: ContextVar[str] = ContextVar("endpoint", default="-")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(sql: str) -> str:
+    """``WHERE x = 'a' AND y > 3`` → ``where x = ? and y > ?``."""
+    return " ".join(_LITERALS.sub("?", sql).split()).lower().rstrip(";")
+
+
+def explain(conn: sqlite3.Connection, sql: str, params=()) -> list[str]:
+    """The ``detail`` column of EXPLAIN QUERY PLAN, one entry per plan node."""
+    return [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+_lock    = threading.Lock()
+_by_fp: dict[str, dict] = {}
+_slow    = deque(maxlen=SLOW_LOG_SIZE)
+
+
+def record(conn: sqlite3.Connection, sql: str, params, seconds: float,
+           rows: int) -> None:
+    """Account one finished query; EXPLAIN it on ``conn`` if it was slow."""
+    ep, fp = endpoint.get(), fingerprint(sql)
+    metrics.DB_QUERY_SECONDS.observe(seconds, endpoint=ep)
+    metrics.DB_QUERY_ROWS.inc(rows, endpoint=ep)
+    with _lock:
+        if fp not in _by_fp and len(_by_fp) >= MAX_FINGERPRINTS:
+            fp = "other"
+        s = _by_fp.get(fp)
+        if s is None:
+            s = _by_fp[fp] = {"calls": 0, "seconds": 0.0, "max_seconds": 0.0,
+                              "rows": 0, "slow": 0}
+        s["calls"]  += 1
+        s["seconds"] += seconds
+        s["rows"]   += rows
+        s["max_seconds"] = max(s["max_seconds"], seconds)
+        slow = seconds * 1000 >= SLOW_MS
+        if slow:
+            s["slow"] += 1
+    if not slow:
+        return
+
+    try:
+        plan = explain(conn, sql, params)
+    except sqlite3.Error as exc:
+        plan = [f"EXPLAIN failed: {exc}"]
+    _slow.append({"at": time.time(), "endpoint": ep, "ms": round(seconds * 1000, 1),
+                  "rows": rows, "sql": sql, "params": list(params or ()),
+                  "plan": plan})
+    logger.warning("%.0f ms, %d rows on %s: %s | plan: %s",
+                   seconds * 1000, rows, ep, logs.payload(fp), " / ".join(plan))
+
+
+def query(conn: sqlite3.Connection, sql: str, params=(), one: bool = False):
+    """``conn.execute(sql, params).fetchall()`` (or ``fetchone()``), timed."""
+    started = time.perf_counter()
+    cur = conn.execute(sql, params)
+    rows = cur.fetchone() if one else cur.fetchall()
+    count = (rows is not None) if one else len(rows)
+    record(conn, sql, params, time.perf_counter() - started, int(count))
+    return rows
+
+
+def stats(limit: int = 50) -> list[dict]:
+    """Fingerprints by total time spent, slowest first."""
+    with _lock:
+        items = [{"fingerprint": fp, **s} for fp, s in _by_fp.items()]
+    return sorted(items, key=lambda s: s["seconds"], reverse=True)[:limit]
+
+
+def slow_queries() -> list[dict]:
+    return list(reversed(_slow))
@@ -0,0 +1,124 @@
+# responses.py ─── encoding, column form and compression for chart payloads
+"""
+What ``serve_chart`` sends once it has a payload:
+
+• JSON bytes from orjson when it is installed (``json`` otherwise, compact)
+• ``?format=columns`` turns every list of same-keyed row dicts into
+  ``{"columns": [...], "rows": [[...], ...]}`` – the keys are sent once
+  instead of once per row; the default ``format=rows`` is unchanged
+• bodies of COMPRESS_MIN_BYTES or more go out as brotli (when the
+  ``brotli`` module is installed) or gzip, whichever the client's
+  Accept-Encoding prefers; smaller ones are not worth the CPU
+
+Each cached chart is a ``Body``: its encodings are built on first request
+and live as long as the cache entry, so a hot chart is serialized and
+compressed once per DB generation, not once per request.
+
+Tune with RESPONSE_COMPRESS_MIN / RESPONSE_GZIP_LEVEL / RESPONSE_BROTLI_QUALITY.
+"""
+import os
+import gzip
+import json
+
+from fastapi import Response
+
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN", "512"))
+GZIP_LEVEL         = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY     = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FORMATS   = ("rows", "columns")
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)   # preference order
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode()
+
+
+def to_columns(value):
+    """Every non-empty list of dicts sharing one key order → columns + rows."""
+    if isinstance(value, dict):
+        return {k: to_columns(v) for k, v in value.items()}
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        columns = list(value[0])
+        if all(isinstance(r, dict) and list(r) == columns for r in value):
+            return {"columns": columns, "rows": [list(r.values()) for r in value]}
+        return [to_columns(v) for v in value]
+    return value
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def accepted_encoding(header: str | None) -> str | None:
+    """The encoding we support that ``Accept-Encoding`` weighs highest, if any."""
+    if not header:
+        return None
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            param = param.replace(" ", "")
+            if param.startswith("q="):
+                try:
+                    weight = float(param[2:])
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class Body:
+    """A chart payload and the bytes built from it, keyed by (format, encoding)."""
+
+    __slots__ = ("payload", "_encoded")
+
+    def __init__(self, payload):
+        self.payload  = payload
+        self._encoded = {}
+
+    def encoded(self, fmt: str = "rows", encoding: str | None = None) -> bytes:
+        data = self._encoded.get((fmt, encoding))
+        if data is None:
+            if encoding is not None:
+                data = compress(self.encoded(fmt), encoding)
+            elif fmt == "columns":
+                data = dumps(to_columns(self.payload))
+            else:
+                data = dumps(self.payload)
+            # two requests racing here build the same bytes; either may win
+            self._encoded[(fmt, encoding)] = data
+        return data
+
+
+def render(body: Body, fmt: str, accept_encoding: str | None,
+           headers: dict) -> Response:
+    data    = body.encoded(fmt)
+    headers = dict(headers)
+    if len(data) >= COMPRESS_MIN_BYTES:
+        encoding = accepted_encoding(accept_encoding)
+        if encoding is not None:
+            data = body.encoded(fmt, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(data, media_type="application/json", headers=headers)
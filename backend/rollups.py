@@ -0,0 +1,92 @@
+# rollups.py ─── helpers for answering charts from the monthly rollup tables
+"""
+load_db.py pre-aggregates orders and campaigns by month (see ROLLUPS
+there). A chart can be served from those tables only when its date range
+covers whole months; anything else falls back to the raw tables.
+"""
+import calendar
+from datetime import date, timedelta
+
+
+def _parse(value: str) -> date | None:
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def month_span(
+    data_inicial: str | None,
+    data_final:   str | None,
+) -> tuple[str | None, str | None] | None:
+    """
+    ('YYYY-MM' | None, 'YYYY-MM' | None) when both bounds sit on month
+    boundaries (first day / last day, or open), otherwise None.
+    """
+    mes_from = mes_to = None
+    if data_inicial:
+        d = _parse(data_inicial)
+        if d is None or d.day != 1:
+            return None
+        mes_from = f"{d:%Y-%m}"
+    if data_final:
+        d = _parse(data_final)
+        if d is None or d.day != calendar.monthrange(d.year, d.month)[1]:
+            return None
+        mes_to = f"{d:%Y-%m}"
+    return mes_from, mes_to
+
+
+def rollup_filters(span: tuple[str | None, str | None], **equals):
+    """WHERE clause over a rollup's ``mes`` column plus equality filters."""
+    conds, params = [], []
+    for col, value in equals.items():
+        if value:
+            conds.append(f"{col} = ?")
+            params.append(value)
+
+    mes_from, mes_to = span
+    if mes_from:
+        conds.append("mes >= ?")
+        params.append(mes_from)
+    if mes_to:
+        conds.append("mes <= ?")
+        params.append(mes_to)
+
+    return (" AND ".join(conds), params)
+
+
+def _month_end(d: date) -> date:
+    return d.replace(day=calendar.monthrange(d.year, d.month)[1])
+
+
+def month_split(
+    data_inicial: str | None,
+    data_final:   str | None,
+) -> tuple[tuple[str | None, str | None] | None, list[tuple[str, str]]] | None:
+    """
+    The range as whole months plus leftover days: (span, edges), where
+    ``span`` is month_span's ('YYYY-MM' | None, 'YYYY-MM' | None) of the
+    whole months inside it (None if there are none) and ``edges`` the ISO
+    (from, to) day ranges at either end that the rollups cannot answer.
+    None if a bound is not a date.
+    """
+    start = _parse(data_inicial) if data_inicial else None
+    end   = _parse(data_final) if data_final else None
+    if (data_inicial and start is None) or (data_final and end is None):
+        return None
+    edges = []
+    first, last = start, end
+    if start and start.day != 1:
+        stop = min(_month_end(start), end) if end else _month_end(start)
+        edges.append((start.isoformat(), stop.isoformat()))
+        first = _month_end(start) + timedelta(days=1)
+    if end and end != _month_end(end):
+        month_start = end.replace(day=1)
+        if first is None or month_start >= first:
+            edges.append((month_start.isoformat(), end.isoformat()))
+        last = month_start - timedelta(days=1)
+    if first and last and first > last:
+        return None, edges
+    return (f"{first:%Y-%m}" if first else None,
+            f"{last:%Y-%m}" if last else None), edges
@@ -0,0 +1,255 @@
+# schema_contract.py ─── the columns the charts and the agent rely on
+"""
+One description of app.db that everything else is checked against:
+
+• TABLES – the tables the agent may query, column by column, with the
+  hints it sees in its prompt (``schema_prompt()`` → db_agent.build_crew)
+• DERIVED – rollups and summaries written by load_db.py for the charts
+• ENDPOINTS – the columns each route reads
+
+``verify()`` runs in main.py's lifespan, before the first request: it
+introspects app.db (PRAGMA table_info), reports every missing table or
+column by endpoint, then compiles every statement the charts can issue
+(``EXPLAIN`` prepares without running) against the live schema. Any
+problem raises SchemaContractError and the app does not start.
+"""
+import time
+import logging
+import sqlite3
+
+import analytics
+import campaigns
+from db import connection
+from rollups import month_split
+
+logger = logging.getLogger("schema_contract")
+
+
+class SchemaContractError(RuntimeError):
+    """app.db does not match what the endpoints or the agent expect."""
+
+
+# table → column → prompt hint (type, key, sample values)
+TABLES = {
+    "contacts": {
+        "contact_id": "PK INTEGER 1–60",
+        "email":      "TEXT e.g. uma.brown1@example.com, leo.davis2@example.com, "
+                      "rose.perez3@example.com, yara.smith4@example.com",
+        "phone":      "TEXT e.g. 12055295904–19800052419",
+        "full_name":  "TEXT e.g. Uma Brown, Leo Davis, Rose Perez, Yara Smith",
+        "created_at": "DATETIME e.g. 2023-02-15T16:12:35, 2024-11-18T08:33:50, "
+                      "2023-03-26T04:41:12, 2023-09-07T10:25:57",
+    },
+    "products": {
+        "product_id": "PK INTEGER 1–120",
+        "name":       "TEXT e.g. Runner Sneaker Alpha, Canvas Sneaker Beta, "
+                      "Leather Boot Cedar, Trail Boot Delta",
+        "category":   "TEXT e.g. Footwear, Apparel, Accessories, Home",
+        "price":      "DECIMAL e.g. 5.99–399.00",
+    },
+    "orders": {
+        "order_id":    "PK INTEGER 1–200",
+        "contact_id":  "FK→contacts.contact_id INTEGER 1–60",
+        "order_date":  "DATETIME e.g. 2023-08-20T20:34:49, 2024-09-03T10:08:42, "
+                       "2024-12-08T15:35:10, 2023-12-24T12:33:55",
+        "grand_total": "DECIMAL e.g. 17.64–1728.90",
+    },
+    "order_items": {
+        "order_item_id": "PK INTEGER 1–541",
+        "order_id":      "FK→orders.order_id INTEGER 1–200",
+        "product_id":    "FK→products.product_id INTEGER 1–120",
+        "qty":           "INTEGER 1–3",
+        "unit_price":    "DECIMAL 0.00–399.00",
+    },
+    "campaigns": {
+        "send_date":     "DATE e.g. 30/03/2025, 02/05/2025, 29/01/2025, 17/03/2025",
+        "send_date_iso": "TEXT ISO copy of send_date e.g. 2025-03-30 "
+                         "(use it to filter / group by date)",
+        "email_job_id":  "PK INTEGER 4000109–4999666",
+        "email_sender_name":  "TEXT e.g. Relacionamento, Equipe Vendas, "
+                              "Equipe CRM, Newsletter Especial",
+        "email_content_name": "TEXT e.g. CAMPANHA 2025 - Volta às Aulas, "
+                              "CAMPANHA 2025 - Férias, CAMPANHA 2025 - Black Friday, "
+                              "CAMPANHA 2025 - Natal",
+        "email_subject": "TEXT e.g. Corre! Estoques limitados para volta às aulas, "
+                         "Você foi selecionado(a) para descontos de férias, "
+                         "Últimos dias da promoção black friday, "
+                         "Preços imperdíveis nesta férias",
+        "email_sends":               "INTEGER 6 363–798 938",
+        "email_unique_opens":        "INTEGER 1 446–320 239",
+        "email_unique_clicks":       "INTEGER 137–61 783",
+        "email_unique_unsubscribes": "INTEGER 3–1 968",
+    },
+}
+
+# not shown to the agent
+DERIVED = {
+    "orders_monthly":          ("mes", "order_count", "revenue"),
+    "orders_monthly_category": ("mes", "category", "order_count", "revenue"),
+    "campaigns_monthly":       ("mes", "email_sender_name", "sends", "opens",
+                                "clicks", "unsubs"),
+    "customer_summary":        ("contact_id", "first_order", "last_order",
+                                "order_count", "total_spend", "monthly_orders"),
+    "sender_sketch":           ("mes", "email_sender_name", "sends"),
+    "sender_sketch_month":     ("mes", "capacity", "floor", "total"),
+}
+
+_ORDER_FILTERS = ("orders.order_id", "orders.order_date",
+                  "order_items.order_id", "order_items.product_id",
+                  "products.product_id", "products.category")
+_CAMPAIGN_COLS = ("campaigns.send_date_iso", "campaigns.email_sender_name",
+                  "campaigns.email_sends", "campaigns.email_unique_opens",
+                  "campaigns.email_unique_clicks",
+                  "campaigns.email_unique_unsubscribes",
+                  *(f"campaigns_monthly.{c}" for c in DERIVED["campaigns_monthly"]))
+
+ENDPOINTS = {
+    "/charts/aov": (*_ORDER_FILTERS, "orders.grand_total",
+                    *(f"orders_monthly.{c}" for c in DERIVED["orders_monthly"]),
+                    *(f"orders_monthly_category.{c}"
+                      for c in DERIVED["orders_monthly_category"])),
+    "/charts/category-mix": (*_ORDER_FILTERS, "order_items.qty",
+                             "order_items.unit_price"),
+    "/charts/repeat-funnel": (*_ORDER_FILTERS, "orders.contact_id",
+                              "customer_summary.order_count"),
+    "/charts/vendas_por_mes": ("orders.order_date", "orders.grand_total",
+                               "orders_monthly.mes", "orders_monthly.revenue"),
+    "/charts/commerce-bundle": (*_ORDER_FILTERS, "orders.contact_id",
+                                "orders.grand_total", "order_items.qty",
+                                "order_items.unit_price",
+                                "customer_summary.order_count"),
+    "/charts/cohort-retention": ("customer_summary.first_order",
+                                 "customer_summary.monthly_orders"),
+    "/charts/rfm": ("customer_summary.contact_id", "customer_summary.last_order",
+                    "customer_summary.order_count", "customer_summary.total_spend"),
+    "/charts/email-volume":     _CAMPAIGN_COLS,
+    "/charts/email-engagement": _CAMPAIGN_COLS,
+    "/charts/email-sender-mix": (*_CAMPAIGN_COLS,
+                                 *(f"sender_sketch.{c}" for c in DERIVED["sender_sketch"]),
+                                 "sender_sketch_month.mes", "sender_sketch_month.floor"),
+    "/charts/email-unsub-rate": _CAMPAIGN_COLS,
+    "/charts/campaign-bundle":  _CAMPAIGN_COLS,
+    # the agent is told every column of TABLES exists
+    "/chat": tuple(f"{t}.{c}" for t, cols in TABLES.items() for c in cols),
+}
+
+
+def schema_prompt() -> str:
+    """``table(column hint, …), …`` for the agent's backstory."""
+    return ", ".join(
+        f"{table}(" + ", ".join(f"{col} {hint}" for col, hint in cols.items()) + ")"
+        for table, cols in TABLES.items())
+
+
+# ── statements ───────────────────────────────────────────────────────────────
+# one filter set per branch of the *_sql() builders: no filter (summaries),
+# partial months (raw tables), whole months (rollups), product / category /
+# sender semi-joins
+_COMMERCE = [{}, {"data_inicial": "2024-01-15", "data_final": "2024-03-10"},
+             {"data_inicial": "2024-01-01", "data_final": "2024-06-30"},
+             {"product_id": 1}, {"category": "_"},
+             {"data_inicial": "2024-01-01", "data_final": "2024-06-30",
+              "category": "_"}]
+_CAMPAIGN = [{}, {"data_inicial": "2025-01-15", "data_final": "2025-03-10"},
+             {"data_inicial": "2025-01-01", "data_final": "2025-03-31"},
+             {"sender": "_"}]
+_DATES = ("data_inicial", "data_final")
+
+
+def _only(filters: dict, names: tuple) -> dict:
+    return {k: v for k, v in filters.items() if k in names}
+
+
+def chart_statements() -> list[tuple[str, str, list]]:
+    """(endpoint, sql, params) for every statement a chart can issue; the
+    commerce bundle's queries read the temp table made by f_orders_sql."""
+    out = []
+    for f in _COMMERCE:
+        out += [("/charts/aov", *analytics.aov_sql(**f)),
+                ("/charts/category-mix", *analytics.category_mix_sql(**f)),
+                ("/charts/repeat-funnel", *analytics.repeat_funnel_sql(**f)),
+                ("/charts/commerce-bundle", *analytics.f_orders_sql(**f))]
+        dates = _only(f, _DATES)
+        out += [("/charts/vendas_por_mes", *analytics.vendas_por_mes_sql(**dates)),
+                ("/charts/cohort-retention",
+                 *analytics.cohort_retention_sql(**dates))]
+    out += [("/charts/commerce-bundle", sql, [])
+            for sql in (*analytics.BUNDLE_SQL.values(), analytics.FUNNEL_SUMMARY_SQL)]
+    out.append(("/charts/rfm", analytics.RFM_SQL, []))
+    for f in _CAMPAIGN:
+        for chart, measures in campaigns.MEASURES.items():
+            out.append((f"/charts/{chart}", *campaigns.monthly_sql(
+                measures, f.get("data_inicial"), f.get("data_final"),
+                f.get("sender"), by_sender=chart == "campaign-bundle")))
+        out.append(("/charts/campaign-bundle", *campaigns.campaign_bundle_sql(**f)))
+        dates = _only(f, _DATES)
+        out.append(("/charts/email-sender-mix", *campaigns.email_sender_mix_sql(**dates)))
+        sketch_sql, months_sql, params = campaigns.sender_sketch_sql(**dates)
+        span, edges = month_split(dates.get("data_inicial"), dates.get("data_final"))
+        out += [("/charts/email-sender-mix", sketch_sql, params),
+                ("/charts/email-sender-mix", months_sql, params),
+                ("/charts/email-sender-mix",
+                 *campaigns.sender_recount_sql(span, edges, ["_", None]))]
+    return out
+
+
+# ── checks ───────────────────────────────────────────────────────────────────
+def live_columns(conn: sqlite3.Connection) -> dict[str, set[str]]:
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return {t: {r[1] for r in conn.execute(f'PRAGMA table_info("{t}")')}
+            for t in tables}
+
+
+def missing_columns(live: dict[str, set[str]]) -> list[str]:
+    """``endpoint: table.column`` for every expected column app.db lacks."""
+    problems = []
+    for endpoint, needed in ENDPOINTS.items():
+        for ref in needed:
+            table, column = ref.split(".")
+            if table not in live:
+                problems.append(f"{endpoint}: table {table} is missing")
+            elif column not in live[table]:
+                problems.append(f"{endpoint}: column {ref} is missing")
+    return sorted(set(problems))
+
+
+def broken_statements(conn: sqlite3.Connection, statements) -> list[str]:
+    """Compile ``statements``; ``endpoint: error | sql`` per failure."""
+    problems = []
+    conn.execute("DROP TABLE IF EXISTS temp.f_orders")
+    create, params = analytics.f_orders_sql()
+    try:
+        conn.execute(create + " LIMIT 0", params)
+    except sqlite3.Error as exc:
+        problems.append(f"/charts/commerce-bundle: {exc} | {create}")
+    try:
+        for endpoint, sql, params in statements:
+            # f_orders exists now, so compile the SELECT behind its CREATE
+            sql = sql.replace("CREATE TEMP TABLE f_orders AS ", "", 1)
+            try:
+                conn.execute(f"EXPLAIN {sql}", params)
+            except sqlite3.Error as exc:
+                problems.append(f"{endpoint}: {exc} | {' '.join(sql.split())}")
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.f_orders")
+    return problems
+
+
+def verify() -> dict:
+    """Raise SchemaContractError unless app.db satisfies the contract."""
+    started = time.perf_counter()
+    statements = chart_statements()
+    with connection() as conn:
+        problems = missing_columns(live_columns(conn))
+        if not problems:              # a missing column breaks its statements too
+            problems = broken_statements(conn, statements)
+    if problems:
+        raise SchemaContractError(
+            "app.db does not match the schema contract (re-run load_db.py?):\n  "
+            + "\n  ".join(problems))
+    report = {"endpoints": len(ENDPOINTS), "statements": len(statements),
+              "seconds": round(time.perf_counter() - started, 4)}
+    logger.info("schema contract ok: %(endpoints)d endpoints, "
+                "%(statements)d statements in %(seconds).3fs", report)
+    return report
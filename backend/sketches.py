@@ -0,0 +1,103 @@
+# sketches.py ─── per-month top senders behind /charts/email-sender-mix?approx=true
+"""
+The exact sender mix aggregates every campaign row in the range by sender
+and sorts all the groups to keep ten. With many senders that is a full
+GROUP BY per request. The approximate mode answers from small summaries
+kept by load_db.py instead:
+
+• per month, the SENDER_SKETCH_CAPACITY senders with the most sends and
+  their exact sends; every other sender of that month sent at most the
+  month's ``floor`` (the next sender's sends)
+• ``rebuild`` writes them from campaigns_monthly whenever campaigns
+  change – the rollup is already up to date by then, so the summaries
+  are exact, and a window over the rollup is cheaper than streaming the
+  new raw rows into them
+• summaries merge by addition, so any range of months is answered from
+  its months' summaries (``candidates``); the chosen senders are then
+  recounted exactly (campaigns.py), and the response says how much a
+  sender that was never a candidate could have sent
+
+Not a streaming sketch: the first version kept a weighted Space-Saving
+summary per month and streamed incremental loads into it, which only made
+the stored counts drift from exact. campaigns_monthly already holds one row
+per (month, sender), so an exact top-CAPACITY per month is as small as the
+sketch (memory is CAPACITY rows per month, whatever the number of senders)
+and its bounds are exact: ``floor`` is the (CAPACITY + 1)-th sender's sends.
+What stays approximate is the merge across months in ``candidates``.
+
+Tables: sender_sketch (mes, email_sender_name, sends) and
+sender_sketch_month (mes, capacity, floor, total).
+"""
+import os
+
+CAPACITY = int(os.getenv("SENDER_SKETCH_CAPACITY", "256"))
+
+# dropped, not emptied: a rebuild is always complete, and older files
+# carried an extra column
+REBUILD_SQL = """
+BEGIN;
+DROP TABLE IF EXISTS sender_sketch;
+DROP TABLE IF EXISTS sender_sketch_month;
+CREATE TABLE sender_sketch (
+    mes               TEXT NOT NULL,          -- YYYY-MM
+    email_sender_name TEXT,
+    sends             INTEGER,
+    PRIMARY KEY (mes, email_sender_name)
+);
+CREATE TABLE sender_sketch_month (
+    mes       TEXT PRIMARY KEY,
+    capacity  INTEGER,
+    floor     INTEGER,      -- most any unlisted sender sent that month
+    total     INTEGER       -- all sends of the month
+);
+CREATE TEMP TABLE _ranked AS
+SELECT mes, email_sender_name, sends,
+       ROW_NUMBER() OVER (PARTITION BY mes ORDER BY sends DESC) AS rk
+FROM campaigns_monthly WHERE sends > 0;
+INSERT INTO sender_sketch
+SELECT mes, email_sender_name, sends FROM _ranked WHERE rk <= {capacity};
+INSERT INTO sender_sketch_month
+SELECT mes, {capacity}, COALESCE(MAX(CASE WHEN rk > {capacity} THEN sends END), 0),
+       SUM(sends)
+FROM _ranked GROUP BY mes;
+DROP TABLE _ranked;
+COMMIT;
+"""
+
+
+def stored(cur) -> bool:
+    return cur.execute("SELECT 1 FROM sqlite_master "
+                       "WHERE name = 'sender_sketch_month'").fetchone() is not None
+
+
+def rebuild(cur, capacity: int = CAPACITY) -> int:
+    """Every month's summary from campaigns_monthly; returns the months."""
+    cur.executescript(REBUILD_SQL.format(capacity=int(capacity)))
+    return cur.execute("SELECT COUNT(*) FROM sender_sketch_month").fetchone()[0]
+
+
+# ── query side ───────────────────────────────────────────────────────────────
+def candidates(entries, months, whole: set, k: int) -> tuple[list, int]:
+    """
+    Merge monthly summaries and keep the senders that could be in the top
+    ``k``. ``entries``: (mes, sender, sends) of the months in range;
+    ``months``: (mes, floor) of the same months; ``whole``: the months the
+    range covers completely (only those give lower bounds).
+
+    Returns (senders, missed): ``missed`` is the most a sender outside the
+    returned list can have sent in the range, given that it is not in any
+    of the months' summaries.
+    """
+    floors = dict(months)
+    missed = sum(floors.values())
+    upper: dict = {}
+    lower: dict = {}
+    for mes, sender, sends in entries:
+        upper[sender] = upper.get(sender, missed) + sends - floors[mes]
+        if mes in whole:
+            lower[sender] = lower.get(sender, 0) + sends
+    if len(upper) <= k:
+        return list(upper), missed
+    threshold = sorted(lower.values(), reverse=True)[k - 1] if len(lower) >= k else 0
+    keep = [s for s, bound in upper.items() if bound >= threshold]
+    return keep, missed
@@ -0,0 +1,119 @@
+# sql_tool.py ─── the agent's query_sql tool, without the CrewAI wrapper
+"""
+db_agent.py wraps ``query_sql`` with ``@tool``; fake_crew.py calls it
+directly, so both produce the same cache entries and /chat/stream events.
+
+Whatever SELECT the LLM writes runs under three limits:
+
+• SQL_MAX_ROWS / SQL_MAX_BYTES – rows are serialized as they are fetched
+  and we stop adding them at either bound. The reply then becomes
+  ``{"rows": [...], "truncated": true, "total_rows": N}`` so the agent
+  can aggregate instead of pasting thousands of rows into its prompt.
+• SQL_TIMEOUT – a progress handler interrupts the statement once the
+  wall-clock deadline passes (``{"error": ...}``, never cached).
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+
+import logs
+import chat_events
+import querylog
+from chat_cache import cached_sql
+from db import connection
+
+MAX_ROWS       = int(os.getenv("SQL_MAX_ROWS", "500"))
+MAX_BYTES      = int(os.getenv("SQL_MAX_BYTES", str(256 * 1024)))
+TIMEOUT        = float(os.getenv("SQL_TIMEOUT", "10"))        # seconds
+PROGRESS_STEPS = 10_000              # VM instructions between deadline checks
+
+logger = logging.getLogger("db_agent")
+
+
+def _collect(cur, deadline: float) -> tuple[list[str], int, bool]:
+    """
+    Serialize rows from ``cur`` within the limits. Returns the JSON text of
+    each kept row, the total row count, and whether that count is exact.
+    """
+    cols  = [c[0] for c in cur.description]
+    parts = []
+    size  = 2                                    # "[" + "]"
+    total = 0
+    full  = False
+    try:
+        while batch := cur.fetchmany(chat_events.ROW_BATCH):
+            total += len(batch)
+            if full:
+                continue                         # past the limits: only count
+            rows = []
+            for r in batch:
+                row  = dict(zip(cols, r))
+                text = json.dumps(row)
+                if len(parts) >= MAX_ROWS or size + len(text) + 1 > MAX_BYTES:
+                    full = True
+                    break
+                parts.append(text)
+                size += len(text) + 1
+                rows.append(row)
+            if rows:
+                chat_events.emit("rows", {"rows": rows})
+    except sqlite3.OperationalError:
+        if not (full and time.monotonic() > deadline):
+            raise
+        return parts, total, False               # timed out while only counting
+    return parts, total, True
+
+
+def run_sql(query: str) -> str:
+    if not query.strip().lower().startswith("select"):
+        return json.dumps({ "error": "Only SELECT queries allowed." })
+    deadline = time.monotonic() + TIMEOUT
+    try:
+        with connection() as conn:
+            # returning True aborts the running statement ("interrupted")
+            conn.set_progress_handler(lambda: time.monotonic() > deadline,
+                                      PROGRESS_STEPS)
+            started = time.perf_counter()
+            try:
+                parts, total, exact = _collect(conn.execute(query), deadline)
+            finally:
+                conn.set_progress_handler(None, 0)   # pooled connection
+            querylog.record(conn, query, (), time.perf_counter() - started, total)
+    except sqlite3.OperationalError as e:
+        if time.monotonic() > deadline:
+            logger.warning("SQL timed out after %ss: %s", TIMEOUT, logs.payload(query))
+            return json.dumps({ "error": f"Query exceeded {TIMEOUT:g}s; "
+                                         "add filters or aggregate." })
+        logger.exception("SQL error")
+        return json.dumps({ "error": str(e) })
+    except Exception as e:
+        logger.exception("SQL error")
+        return json.dumps({ "error": str(e) })
+
+    rows = "[" + ",".join(parts) + "]"
+    if len(parts) == total:
+        return rows
+    return (f'{{"rows": {rows}, "truncated": true, '
+            f'"returned_rows": {len(parts)}, "total_rows": {total}, '
+            f'"total_rows_exact": {json.dumps(exact)}}}')
+
+
+def query_sql(query: str) -> str:
+    """
+    Execute a SELECT query and return a JSON array of rows. Large results
+    come back as {"rows": [first rows], "truncated": true, "total_rows": N};
+    use COUNT / GROUP BY / LIMIT instead of selecting everything.
+    """
+    logger.info("Running SQL: %s", logs.payload(query))
+    chat_events.emit("sql", {"query": query})
+    ran = []
+    out = cached_sql(query, lambda q: ran.append(q) or run_sql(q))
+    if not ran and chat_events.listening():
+        # cache hit: nothing was fetched, replay the rows for the stream
+        rows = json.loads(out)
+        if isinstance(rows, dict):
+            rows = rows.get("rows", [])
+        chat_events.emit_rows(rows)
+    return out
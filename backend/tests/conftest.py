@@ -0,0 +1,107 @@
+# tests/conftest.py ─── a small synthetic app.db shared by the whole session
+import os
+import sys
+import sqlite3
+import itertools
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(BACKEND), str(BACKEND / "benchmarks")]
+
+os.environ.setdefault("CHAT_FAKE_CREW", "1")
+os.environ.setdefault("LOG_FILE", "")            # console only
+
+import db                                         # noqa: E402
+import logs                                       # noqa: E402
+import export                                     # noqa: E402
+import load_db                                    # noqa: E402
+from synth import generate_tables                 # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app_db(tmp_path_factory):
+    """Path of an app.db built by load_db from synth.generate_tables; the
+    API's pools point at it for the session."""
+    tmp = tmp_path_factory.mktemp("db")
+    saved = load_db.CSV_DIR, load_db.DB_PATH, load_db.SHADOW_PATH, db.DB_PATH
+    load_db.CSV_DIR     = generate_tables(tmp / "tables", 2)
+    load_db.DB_PATH     = tmp / "app.db"
+    load_db.SHADOW_PATH = tmp / "app.db.shadow"
+    load_db.populate_db()
+    for pool in (db.pool, export.export_pool):
+        pool.close_all()
+        pool.path = load_db.DB_PATH
+    db.DB_PATH = load_db.DB_PATH
+    yield load_db.DB_PATH
+    load_db.CSV_DIR, load_db.DB_PATH, load_db.SHADOW_PATH, db.DB_PATH = saved
+    for pool in (db.pool, export.export_pool):
+        pool.close_all()
+        pool.path = db.DB_PATH
+
+
+_generations = itertools.count(1000)
+
+
+@pytest.fixture
+def edited_db(app_db, tmp_path, monkeypatch):
+    """``edited_db(sql)``: a copy of app_db with ``sql`` applied, its rollups
+    and customer_summary rebuilt and a generation of its own; the API's
+    pools point at it for the test."""
+    pools = (db.pool, export.export_pool)
+
+    def make(sql: str) -> Path:
+        path = tmp_path / "edited.db"
+        with sqlite3.connect(app_db) as src, sqlite3.connect(path) as dst:
+            src.backup(dst)
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.executescript(sql)
+        load_db.refresh_rollups(conn.cursor(), None)
+        load_db.refresh_customer_summary(conn.cursor(), None)
+        conn.execute(f"PRAGMA user_version = {next(_generations)}")
+        conn.close()
+        for pool in pools:
+            pool.close_all()
+            monkeypatch.setattr(pool, "path", path)
+        monkeypatch.setattr(db, "DB_PATH", path)
+        monkeypatch.setitem(db._gen_state, "checked", 0.0)
+        return path
+
+    yield make
+    for pool in pools:
+        pool.close_all()
+    db._gen_state["checked"] = 0.0
+
+
+@pytest.fixture
+def rebuild(app_db, tmp_path, monkeypatch):
+    """``rebuild(fresh=False)``: populate_db() into a private app.db (deleted
+    first with ``fresh``) that the API serves for the test."""
+    monkeypatch.setattr(load_db, "DB_PATH", tmp_path / "app.db")
+    monkeypatch.setattr(load_db, "SHADOW_PATH", tmp_path / "app.db.shadow")
+    pools = (db.pool, export.export_pool)
+    for pool in pools:
+        pool.close_all()
+        monkeypatch.setattr(pool, "path", load_db.DB_PATH)
+    monkeypatch.setattr(db, "DB_PATH", load_db.DB_PATH)
+
+    def run(fresh: bool = False) -> None:
+        if fresh:
+            load_db.DB_PATH.unlink()
+        load_db.populate_db()
+        db._gen_state["checked"] = 0.0     # no GENERATION_TTL wait
+
+    yield run
+    for pool in pools:
+        pool.close_all()
+    db._gen_state["checked"] = 0.0
+
+
+@pytest.fixture(scope="session")
+def client(app_db):
+    """TestClient of main.app (no lifespan: no warm-up threads)."""
+    from fastapi.testclient import TestClient
+    import main
+    yield TestClient(main.app)
+    logs.shutdown()              # main configured it on pytest's stderr
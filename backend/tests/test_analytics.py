@@ -0,0 +1,129 @@
+import sqlite3
+from datetime import datetime
+from collections import Counter, defaultdict
+
+import pytest
+
+import db
+import analytics
+
+# orders nobody can be credited with: copies of every 25th order, half
+# without a contact and half without a date
+UNOWNED = """
+INSERT INTO orders (order_id, contact_id, order_date, grand_total)
+SELECT order_id + 1000000,
+       CASE WHEN order_id % 50 = 0 THEN contact_id END,
+       CASE WHEN order_id % 50 = 25 THEN order_date END,
+       grand_total
+FROM orders WHERE order_id % 25 = 0;
+"""
+
+
+@pytest.fixture
+def orders(edited_db):
+    """(order_id, contact_id, order_date, grand_total) of the edited copy."""
+    path = edited_db(UNOWNED)
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT order_id, contact_id, order_date, grand_total "
+                            "FROM orders").fetchall()
+        items = conn.execute("SELECT order_id, product_id FROM order_items").fetchall()
+    return rows, items
+
+
+def owned(rows):
+    return [r for r in rows if r[1] is not None and r[2] is not None]
+
+
+def funnel(counts) -> list:
+    return [sum(n >= k for n in counts.values()) or None for k in (1, 2, 3)]
+
+
+def test_funnel_counts_the_same_orders_with_and_without_filters(orders):
+    rows, items = orders
+    product = Counter(p for _, p in items).most_common(1)[0][0]
+    with_product = {o for o, p in items if p == product}
+    cases = [({}, owned(rows)),
+             ({"data_inicial": "2023-06-01"},
+              [r for r in owned(rows) if r[2] >= "2023-06-01"]),
+             ({"product_id": product}, [r for r in owned(rows) if r[0] in with_product])]
+    for filters, expected in cases:
+        expect = funnel(Counter(r[1] for r in expected))
+        args = {"data_inicial": None, "data_final": None, "product_id": None,
+                "category": None, **filters}
+        single = [s["customers"] for s in analytics._repeat_funnel(**args)["data"]]
+        bundle = [s["customers"] for s in
+                  analytics._commerce_bundle(**args)["data"]["repeat_funnel"]]
+        assert single == bundle == expect, filters
+
+
+def _month_index(mes: str) -> int:
+    return int(mes[:4]) * 12 + int(mes[5:7]) - 1
+
+
+@pytest.mark.parametrize("lo, hi", [(None, None), ("2024-03-15", "2024-11-10")])
+def test_cohort_retention_matches_orders(orders, lo, hi):
+    rows, _ = orders
+    first, months = {}, defaultdict(set)
+    for _, contact, day, _ in owned(rows):
+        first[contact] = min(first.get(contact, day), day)
+        months[contact].add(day[:7])
+    chosen = [c for c, day in first.items()
+              if (lo is None or day[:10] >= lo) and (hi is None or day[:10] <= hi)]
+    last = max(_month_index(m) for c in chosen for m in months[c])
+    active = defaultdict(Counter)
+    for c in chosen:
+        for m in months[c]:
+            active[first[c][:7]][_month_index(m)] += 1
+    expected = {cohort: [n[i] for i in range(_month_index(cohort), last + 1)]
+                for cohort, n in active.items()}
+
+    got = analytics._cohort_retention(lo, hi)["data"]
+    assert {r["cohort"]: r["active"] for r in got} == expected
+    for r in got:
+        assert r["customers"] == r["active"][0]
+
+
+def quintiles(values: dict) -> dict:
+    """Rank-based quintile of each key's value: equal values, equal quintile."""
+    ordered = sorted(values.values())
+    rank = {}
+    for i, v in enumerate(ordered):
+        rank.setdefault(v, i + 1)
+    return {k: 1 + (rank[v] - 1) * 5 // len(values) for k, v in values.items()}
+
+
+def test_rfm_matches_orders(orders):
+    rows, _ = orders
+    last, count, spend = {}, Counter(), Counter()
+    for _, contact, day, total in owned(rows):
+        last[contact] = max(last.get(contact, day), day)
+        count[contact] += 1
+        spend[contact] += total or 0
+    ref = max(last.values())
+    days = {c: (datetime.fromisoformat(ref) - datetime.fromisoformat(d)).total_seconds()
+            / 86400 for c, d in last.items()}
+    r, f = quintiles(last), quintiles(dict(count))
+    segments = defaultdict(list)
+    for c in last:
+        segments[analytics.rfm_segment(r[c], f[c])].append(c)
+
+    got = analytics._rfm()["data"]
+    assert got["reference_date"] == ref[:10]
+    for seg in got["segments"]:
+        members = segments[seg["segment"]]
+        assert seg["customers"] == len(members), seg["segment"]
+        if members:
+            n = len(members)
+            assert seg["avg_recency_days"] == pytest.approx(
+                round(sum(days[c] for c in members) / n, 1), abs=0.051)
+            assert seg["avg_frequency"] == round(sum(count[c] for c in members) / n, 2)
+            assert seg["avg_monetary"] == pytest.approx(
+                round(sum(spend[c] for c in members) / n, 2), abs=0.0051)
+
+
+def test_rfm_ties_share_a_quintile(orders):
+    sql = analytics.RFM_SQL.split("SELECT r, f")[0] + (
+        "SELECT COUNT(DISTINCT f) FROM scored GROUP BY order_count "
+        "UNION ALL SELECT COUNT(DISTINCT r) FROM scored GROUP BY recency")
+    with db.connection() as conn:
+        assert {n for (n,) in conn.execute(sql)} == {1}
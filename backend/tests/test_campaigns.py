@@ -0,0 +1,20 @@
+import pytest
+
+import campaigns
+
+
+@pytest.mark.parametrize("filters", [
+    {}, {"sender": "Relacionamento"},
+    {"data_inicial": "2024-01-01", "data_final": "2024-06-30"},
+    {"data_inicial": "2024-01-15", "data_final": "2024-03-10", "sender": "Relacionamento"},
+])
+def test_bundle_matches_the_single_charts(app_db, filters):
+    dates = {k: filters.get(k) for k in ("data_inicial", "data_final")}
+    sender = filters.get("sender")
+    bundle = campaigns._campaign_bundle(**dates, sender=sender)["data"]
+    assert bundle == {
+        "email_volume":     campaigns._email_volume(**dates, sender=sender)["data"],
+        "email_engagement": campaigns._email_engagement(**dates, sender=sender)["data"],
+        "email_sender_mix": campaigns._email_sender_mix(**dates)["data"],
+        "email_unsub_rate": campaigns._email_unsub_rate(**dates, sender=sender)["data"],
+    }
@@ -0,0 +1,32 @@
+import pytest
+
+import db
+from chart_cache import cache
+
+CHART = "/charts/email-volume"
+
+
+def get(client, etag=None):
+    return client.get(CHART, headers={"If-None-Match": etag} if etag else {})
+
+
+def test_unchanged_chart_is_not_modified(client, rebuild):
+    rebuild()
+    etag = get(client).headers["etag"]
+    r = get(client, etag)
+    assert (r.status_code, r.headers["etag"], r.content) == (304, etag, b"")
+
+
+@pytest.mark.parametrize("fresh", [False, True], ids=["rebuilt", "recreated"])
+def test_rebuild_changes_the_etag_and_empties_the_cache(client, rebuild, fresh):
+    rebuild()
+    first = get(client)
+    gen = db.generation()
+    rebuild(fresh)
+    assert db.generation() > gen
+    misses = cache.stats()["misses"]
+    r = get(client, first.headers["etag"])
+    assert r.status_code == 200
+    assert r.headers["etag"] != first.headers["etag"]
+    assert cache.stats()["misses"] == misses + 1
+    assert r.json() == first.json()
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import crew
+from fake_crew import FakeCrew, DEFAULT_QUERY
+
+
+@pytest.fixture(autouse=True)
+def fake(app_db, monkeypatch):
+    fake = FakeCrew()
+    monkeypatch.setattr(crew, "_crew", fake)
+    return fake
+
+
+def events(body: str) -> list[tuple[str, dict]]:
+    """(event, data) of a text/event-stream body."""
+    out = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        out.append((fields["event"], json.loads(fields["data"])))
+    return out
+
+
+def test_chat_replies_with_the_crew_answer(client, fake):
+    r = client.post("/chat", json={"message": "Vendas por mês?"})
+    assert r.status_code == 200
+    reply = r.json()
+    assert reply["query"] == DEFAULT_QUERY
+    assert reply["results"] and set(reply["results"][0]) == {"mes", "total"}
+    assert reply["final_answer"].endswith("Vendas por mês?")
+
+    # the repeat is answered from chat_cache, without a kickoff
+    assert client.post("/chat", json={"message": "vendas  por mês?"}).json() == reply
+    assert fake.kickoffs == 1
+
+
+def test_chat_requires_a_message(client):
+    assert client.post("/chat", json={}).status_code == 400
+
+
+def test_chat_stream_events(client):
+    r = client.post("/chat/stream", json={"message": "Receita mensal?"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    stream = events(r.text)
+    names = [name for name, _ in stream]
+    assert names[0] == "reasoning"
+    assert names.index("sql") < names.index("rows") < names.index("final")
+    assert names[-2:] == ["final", "done"]
+
+    data = dict(stream)
+    assert data["sql"] == {"query": DEFAULT_QUERY}
+    final = data["final"]
+    assert final["final_answer"].endswith("Receita mensal?")
+    streamed = [row for name, d in stream if name == "rows" for row in d["rows"]]
+    assert streamed == final["results"]
@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+import pytest
+
+import columnar
+import analytics
+import campaigns
+
+CHARTS = [analytics._aov, analytics._vendas_por_mes, analytics._commerce_bundle,
+          campaigns._email_volume, campaigns._email_engagement, campaigns._email_unsub_rate,
+          campaigns._email_sender_mix, campaigns._campaign_bundle]
+FILTERS = [{}, {"data_inicial": "2024-01-01", "data_final": "2024-06-30"},
+           {"data_inicial": "2025-01-10", "data_final": "2025-04-20"},
+           {"data_inicial": "2025-02-01", "data_final": "2025-02-28"},
+           {"data_inicial": "2025-04-10", "data_final": "2025-05-31"}]
+
+
+@pytest.fixture
+def gaps(edited_db):
+    """A copy of app_db with NULL grand_totals (all of 2024-02), a sender
+    without sends (the only one of 2025-02), NULL sends (all of 2025-05),
+    NULL senders, contacts and categories, and orders without a date."""
+    return edited_db("""
+        UPDATE orders SET grand_total = NULL
+         WHERE order_id % 4 = 0 OR order_date LIKE '2024-02%';
+        UPDATE orders SET contact_id = NULL WHERE order_id % 9 = 0;
+        INSERT INTO orders (order_id, contact_id, order_date, grand_total)
+        SELECT order_id + 1000000, contact_id, NULL, grand_total
+          FROM orders WHERE order_id % 25 = 0;
+        UPDATE products SET category = NULL WHERE product_id % 7 = 0;
+        DELETE FROM campaigns WHERE send_date_iso LIKE '2025-02%'
+                                AND email_sender_name <> 'Relacionamento';
+        UPDATE campaigns SET email_sends = 0 WHERE email_sender_name = 'Relacionamento';
+        UPDATE campaigns SET email_sender_name = NULL
+         WHERE email_job_id % 6 = 0 AND send_date_iso NOT LIKE '2025-02%';
+        UPDATE campaigns SET email_sends = NULL, email_unique_opens = NULL
+         WHERE send_date_iso LIKE '2025-05%' OR email_job_id % 10 = 0;
+    """)
+
+
+def use_engine(monkeypatch, name: str) -> None:
+    monkeypatch.setattr(columnar, "ENGINE", name)
+    monkeypatch.setattr(columnar, "np", np if name == "numpy" else None)
+    monkeypatch.setattr(columnar, "NAT", np.iinfo(np.int64).min)
+
+
+def call(fn, filters: dict):
+    names = fn.__code__.co_varnames[:fn.__code__.co_argcount]
+    return fn(**{n: filters.get(n) for n in names})
+
+
+def same(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return (a is not None and b is not None
+                and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(map(same, a, b))
+    return a == b
+
+
+@pytest.mark.parametrize("fn", CHARTS, ids=lambda fn: fn.__name__)
+def test_numpy_matches_sqlite_with_missing_values(gaps, monkeypatch, fn):
+    for filters in FILTERS:
+        use_engine(monkeypatch, "sqlite")
+        expected = call(fn, filters)
+        use_engine(monkeypatch, "numpy")
+        assert same(call(fn, filters), expected), filters
+
+
+def test_months_without_totals_or_sends(gaps, monkeypatch):
+    use_engine(monkeypatch, "numpy")
+    feb = {"data_inicial": "2024-02-01", "data_final": "2024-02-29"}
+    assert columnar.aov(**feb)["data"] == [{"mes": "2024-02", "valor": None}]
+    assert columnar.vendas_por_mes(**feb)["data"] == [{"mes": "2024-02", "total": None}]
+    feb = {"data_inicial": "2025-02-01", "data_final": "2025-02-28"}
+    assert columnar.email_unsub_rate(**feb)["data"] == [{"mes": "2025-02", "unsub_rate": 0}]
+    assert columnar.email_sender_mix(**feb)["data"] == [
+        {"sender": "Relacionamento", "sends": 0, "open_rate": 0}]
+
+
+def test_rates_round_like_sqlite():
+    # Python's round() gives 1248.12: the double sits just below the tie
+    assert columnar._percents([(1997, 160), (1, 3), (5, 0), (None, 4)], 2) == \
+        [1248.13, 33.33, 0, 0]
+
+
+def test_nulls_are_groups_of_their_own(gaps, monkeypatch):
+    use_engine(monkeypatch, "numpy")
+    assert columnar.aov()["data"][0]["mes"] is None
+    assert None in [r["category"] for r in columnar.category_mix()["data"]]
+    may = {"data_inicial": "2025-05-01", "data_final": "2025-05-31"}
+    assert columnar.email_volume(**may)["data"] == [{"mes": "2025-05", "sends": None}]
+    mix = columnar.email_sender_mix()["data"]
+    assert None in [r["sender"] for r in mix]
@@ -0,0 +1,48 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import export
+from executors import Saturated
+
+# INTEGERs in the first batch, then a REAL, then TEXT
+MIXED = ("SELECT 1 AS n, 1 AS mixed, NULL AS empty "
+         "UNION ALL SELECT 2, 2.5, NULL UNION ALL SELECT 3.5, 'x', NULL")
+
+
+def read(fmt: str, body: bytes):
+    if fmt == "parquet":
+        return pq.read_table(io.BytesIO(body))
+    return pa.ipc.open_stream(body).read_all()
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_later_batches_widen_the_schema(client, monkeypatch, fmt):
+    monkeypatch.setattr(export, "BATCH_ROWS", 1)
+    r = client.post(f"/export/query?format={fmt}", json={"query": MIXED})
+    assert r.status_code == 200
+    table = read(fmt, r.content)
+    assert [f.type for f in table.schema] == [pa.float64(), pa.string(), pa.string()]
+    assert table.to_pydict() == {"n": [1.0, 2.0, 3.5],
+                                 "mixed": ["1", "2.5", "x"],
+                                 "empty": [None, None, None]}
+
+
+def test_storage_classes_cover_every_row(app_db):
+    with export.export_pool.connection() as conn:
+        classes = export.storage_classes(
+            conn, "SELECT order_id, grand_total, order_date FROM orders;", [], 3)
+    assert classes == [{"integer"}, {"real"}, {"text"}]
+
+
+def test_busy_executor_ends_the_download_with_an_error(client, monkeypatch):
+    monkeypatch.setattr(export, "BATCH_ROWS", 1)
+    monkeypatch.setattr(export, "RETRY_AFTER", 0.2)
+
+    def busy(self):
+        raise Saturated("db", 1)
+    monkeypatch.setattr(export.Export, "next", busy)
+    with pytest.raises(RuntimeError, match="busy"):
+        client.post("/export/query", json={"query": MIXED})
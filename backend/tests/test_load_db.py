@@ -0,0 +1,144 @@
+import csv
+import json
+import shutil
+import sqlite3
+import threading
+from collections import Counter
+
+import pytest
+
+import db
+import load_db
+from synth import generate_tables
+
+APPENDED = ("orders", "order_items", "campaigns")
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    return generate_tables(tmp_path_factory.mktemp("csv") / "tables", 2, seed=5)
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_db, "DB_PATH", tmp_path / "app.db")
+    monkeypatch.setattr(load_db, "SHADOW_PATH", tmp_path / "app.db.shadow")
+    return tmp_path
+
+
+def rollups(path) -> dict:
+    with sqlite3.connect(path) as conn:
+        return {name: conn.execute(f"SELECT * FROM {name} ORDER BY 1, 2").fetchall()
+                for name in load_db.ROLLUPS}
+
+
+def same_rollups(a: dict, b: dict) -> bool:
+    return all(len(a[n]) == len(b[n]) and all(
+        x[:2] == y[:2] and x[2:] == pytest.approx(y[2:]) for x, y in zip(a[n], b[n]))
+        for n in a)
+
+
+def customers(path) -> tuple[dict, dict]:
+    """customer_summary, and the same rows computed from orders."""
+    with sqlite3.connect(path) as conn:
+        stored = {r[0]: (r[1], r[2], r[3], pytest.approx(r[4]), json.loads(r[5]))
+                  for r in conn.execute("SELECT * FROM customer_summary")}
+        orders = conn.execute("SELECT contact_id, order_date, grand_total FROM orders "
+                              "WHERE contact_id IS NOT NULL "
+                              "AND order_date IS NOT NULL").fetchall()
+    raw = {}
+    for contact, day, total in orders:
+        first, last, n, spend, months = raw.get(contact, (day, day, 0, 0.0, Counter()))
+        months[day[:7]] += 1
+        raw[contact] = (min(first, day), max(last, day), n + 1, spend + (total or 0), months)
+    return stored, {c: (*v[:4], dict(v[4])) for c, v in raw.items()}
+
+
+@pytest.mark.parametrize("products", [False, True], ids=["appended", "recategorized"])
+def test_incremental_load_matches_a_full_load(tables, paths, monkeypatch, products):
+    csv_dir = shutil.copytree(tables, paths / "tables")
+    monkeypatch.setattr(load_db, "CSV_DIR", csv_dir)
+    full = {t: list(csv.reader(open(tables / f"{t}.csv", newline="")))
+            for t in APPENDED}
+    for tbl, rows in full.items():                # first load: 80% of each
+        with open(csv_dir / f"{tbl}.csv", "w", newline="") as fh:
+            csv.writer(fh).writerows(rows[:len(rows) * 4 // 5])
+    load_db.populate_db()
+
+    for tbl in APPENDED:
+        shutil.copy(tables / f"{tbl}.csv", csv_dir / f"{tbl}.csv")
+    if products:
+        with open(csv_dir / "products.csv", newline="") as fh:
+            rows = list(csv.reader(fh))
+        rows[1][rows[0].index("category")] = "Recategorized"
+        with open(csv_dir / "products.csv", "w", newline="") as fh:
+            csv.writer(fh).writerows(rows)
+    load_db.populate_db(incremental=True)
+    incremental = rollups(load_db.DB_PATH)
+    stored, raw = customers(load_db.DB_PATH)
+    assert stored == raw
+
+    load_db.DB_PATH.unlink()
+    load_db.populate_db()
+    assert same_rollups(incremental, rollups(load_db.DB_PATH))
+
+
+def test_parallel_load_fails_instead_of_hanging(tables, paths, monkeypatch):
+    monkeypatch.setattr(load_db, "CSV_DIR", tables)
+    monkeypatch.setattr(load_db, "CHUNK_ROWS", 20)         # many small batches…
+    monkeypatch.setattr(load_db, "RANGE_BYTES", 4096)      # …from many workers' ranges
+    outcome = []
+
+    def load():
+        conn = sqlite3.connect(load_db.DB_PATH, isolation_level=None)
+        conn.executescript(load_db.SCHEMA_DDL)
+        load_db.load_table(conn.cursor(), "orders")
+        try:
+            # plain INSERTs of the same orders again: the writer fails on
+            # the first batch while the workers keep the queue full
+            for _ in load_db.load_tables_parallel(conn, ["orders", "order_items"],
+                                                  set(), workers=2):
+                pass
+        except sqlite3.IntegrityError as e:
+            outcome.append(e)
+        finally:
+            conn.close()
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive(), "load_tables_parallel hung after a write error"
+    assert outcome
+
+
+def test_rebuild_while_reading(rebuild):
+    rebuild()
+    sql = "SELECT COUNT(*), SUM(email_sends), MAX(order_id) FROM campaigns, " \
+          "(SELECT MAX(order_id) AS order_id FROM orders)"
+    with db.connection() as conn:
+        expected = tuple(conn.execute(sql).fetchone())
+    swaps = db.pool.stats()["swaps"]
+    stop, reads, errors = threading.Event(), [], []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with db.connection() as conn:
+                    got = tuple(conn.execute(sql).fetchone())
+                (reads if got == expected else errors).append(got)
+            except Exception as exc:          # noqa: BLE001 – reported below
+                errors.append(exc)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        for _ in range(3):
+            rebuild()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    assert not errors
+    assert reads and db.pool.stats()["swaps"] >= swaps + 1
+    assert not list(load_db.SHADOW_PATH.parent.glob("app.db.shadow*"))
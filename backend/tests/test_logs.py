@@ -0,0 +1,68 @@
+import queue
+import logging
+import threading
+
+import logs
+import querylog
+import sql_tool
+
+
+def record(msg: str) -> logging.LogRecord:
+    return logging.LogRecord("t", logging.INFO, __file__, 0, msg, (), None)
+
+
+def test_payload_truncates_lazily():
+    big = logs.payload("x" * 1000, 10)
+    assert str(big) == "xxxxxxxxxx… (+990 chars)"
+    assert str(logs.payload("short", 10)) == "short"
+    assert str(logs.payload("x" * 1000, 0)) == "x" * 1000
+
+
+def test_file_rotates_on_encoded_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(logs, "MAX_BYTES", 100)
+    monkeypatch.setattr(logs, "BACKUPS", 1)
+    handler = logs.BatchFileHandler(tmp_path / "t.log")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    try:
+        for _ in range(3):
+            handler.emit(record("é" * 40))        # 41 characters, 81 bytes
+            handler.end_batch()
+            assert (tmp_path / "t.log").stat().st_size <= 100
+    finally:
+        handler.close()
+    assert (tmp_path / "t.log.1").stat().st_size == 81
+
+
+def test_counters_from_many_threads(monkeypatch):
+    monkeypatch.setitem(logs._stats, "queued", 0)
+    monkeypatch.setitem(logs._stats, "dropped", 0)
+    handler = logs.LazyQueueHandler(queue.Queue(5000))
+
+    def burst():
+        for _ in range(1000):
+            handler.enqueue(record("m"))
+
+    threads = [threading.Thread(target=burst) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert logs.stats()["queued"] == 5000
+    assert logs.stats()["dropped"] == 3000
+
+
+def test_sql_is_logged_truncated(app_db, monkeypatch, caplog):
+    monkeypatch.setattr(logs, "PAYLOAD_MAX", 50)
+    monkeypatch.setattr(logs, "PAYLOAD_SAMPLE", 0)
+    monkeypatch.setattr(sql_tool, "TIMEOUT", 0.2)
+    monkeypatch.setattr(querylog, "SLOW_MS", 0)
+    padding = " AND 1" * 200
+    with caplog.at_level(logging.INFO):
+        sql_tool.run_sql("SELECT count(*) FROM orders a, orders b, orders c "
+                         f"WHERE 1{padding}")
+        sql_tool.run_sql(f"SELECT count(*) FROM orders WHERE 1{padding}")
+    timeout, = [r for r in caplog.records if r.name == "db_agent"]
+    slow, = [r for r in caplog.records if r.name == "slow_queries"]
+    for r in (timeout, slow):
+        assert "chars)" in r.getMessage()
+        assert len(r.getMessage()) < 600
@@ -0,0 +1,11 @@
+import query_plan
+
+
+def test_filtered_charts_use_indexes_only(app_db):
+    assert query_plan.check() == []
+
+
+def test_full_scans_flags_base_tables_only():
+    plan = ["SCAN orders", "SCAN (subquery-1)", "SCAN j VIRTUAL TABLE INDEX 1:",
+            "SEARCH o USING INDEX idx_orders_date_contact (order_date>?)"]
+    assert query_plan.full_scans(plan) == ["SCAN orders"]
@@ -0,0 +1,15 @@
+import querylog
+
+
+def test_queries_are_labelled_with_the_route_template(client, monkeypatch):
+    monkeypatch.setattr(querylog, "SLOW_MS", 0)                # log every query
+    monkeypatch.setattr(querylog, "_slow", type(querylog._slow)(maxlen=10))
+    assert client.get("/export/orders", params={"format": "parquet"}).status_code == 200
+    assert client.get("/charts/aov", params={"data_inicial": "2024-01-15"}).status_code == 200
+    assert {q["endpoint"] for q in querylog.slow_queries()} == {
+        "/export/{name}", "/charts/aov"}
+
+
+def test_fingerprint_folds_literals():
+    assert (querylog.fingerprint("SELECT * FROM t  WHERE x = 'a''b' AND y > 3.5;")
+            == "select * from t where x = ? and y > ?")
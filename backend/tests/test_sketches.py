@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+import campaigns
+import sketches
+from db import connection
+from querylog import query
+
+# January lists every sender (floor 10), February its top two (floor 5):
+# A 100 + 50, B 80 + ≤5, C 25 + ≤5, D ≤10 + 30
+MONTHS  = [("2025-01", 10), ("2025-02", 5)]
+ENTRIES = [("2025-01", "A", 100), ("2025-01", "B", 80), ("2025-01", "C", 25),
+           ("2025-02", "A", 50), ("2025-02", "D", 30)]
+BOTH = {"2025-01", "2025-02"}
+
+
+def test_bounds_add_up_across_months():
+    # lower bounds 150, 80, 30, 25: B's 80 is the cut-off for two, and no
+    # other upper bound (C 30, D 40) reaches it
+    senders, missed = sketches.candidates(ENTRIES, MONTHS, BOTH, 2)
+    assert (sorted(senders), missed) == (["A", "B"], 15)
+
+
+@pytest.mark.parametrize("c_sends, kept", [(25, ["A", "B", "C", "D"]),
+                                           (24, ["A", "B", "D"])])
+def test_sender_just_below_the_cut_off(c_sends, kept):
+    # for three the cut-off is D's lower bound, 30; C's upper bound is
+    # c_sends + February's floor
+    entries = [e if e[1] != "C" else ("2025-01", "C", c_sends) for e in ENTRIES]
+    senders, _ = sketches.candidates(entries, MONTHS, BOTH, 3)
+    assert sorted(senders) == kept
+
+
+def test_partial_months_give_no_lower_bound():
+    # with February partial D has no lower bound, so the cut-off for three
+    # drops to C's 25 and everyone stays
+    senders, _ = sketches.candidates(ENTRIES, MONTHS, {"2025-01"}, 3)
+    assert sorted(senders) == ["A", "B", "C", "D"]
+
+
+def test_few_senders_are_all_candidates():
+    senders, missed = sketches.candidates(ENTRIES, MONTHS, BOTH, 4)
+    assert (sorted(senders), missed) == (["A", "B", "C", "D"], 15)
+
+
+def exact(dates):
+    sql, params = campaigns.email_sender_mix_sql(**dates)
+    with connection() as conn:
+        return [dict(r) for r in query(conn, sql, params)]
+
+
+@pytest.mark.parametrize("dates", [
+    {}, {"data_inicial": "2025-01-01", "data_final": "2025-03-31"},
+    {"data_inicial": "2025-01-10", "data_final": "2025-04-30"},
+])
+def test_approx_is_exact_with_full_summaries(app_db, dates):
+    result = campaigns._email_sender_mix_approx(**{
+        "data_inicial": None, "data_final": None, **dates})
+    assert result["approx"]["exact"]
+    assert result["data"] == exact(dates)
+
+
+def test_approx_says_when_it_may_be_wrong(edited_db):
+    # one sender per month: every other sender could hide up to the floors
+    path = edited_db("")
+    with sqlite3.connect(path) as conn:
+        sketches.rebuild(conn.cursor(), capacity=1)
+    result = campaigns._email_sender_mix_approx(None, None)
+    assert result["approx"]["max_missed_sends"] > result["data"][-1]["sends"]
+    assert not result["approx"]["exact"]
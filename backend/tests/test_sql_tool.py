@@ -0,0 +1,63 @@
+import json
+import sqlite3
+
+import pytest
+
+import sql_tool
+
+# billions of rows: only the deadline stops it
+ENDLESS = "FROM orders a, orders b, orders c"
+
+
+@pytest.fixture
+def orders(app_db) -> int:
+    with sqlite3.connect(app_db) as conn:
+        return conn.execute("SELECT count(*) FROM orders").fetchone()[0]
+
+
+def test_small_results_are_a_plain_array(app_db):
+    rows = json.loads(sql_tool.run_sql("SELECT order_id FROM orders ORDER BY order_id LIMIT 3"))
+    assert rows == [{"order_id": 1}, {"order_id": 2}, {"order_id": 3}]
+
+
+def test_truncated_by_rows(orders, monkeypatch):
+    monkeypatch.setattr(sql_tool, "MAX_ROWS", 5)
+    out = json.loads(sql_tool.run_sql("SELECT * FROM orders"))
+    assert set(out) == {"rows", "truncated", "returned_rows", "total_rows",
+                        "total_rows_exact"}
+    assert len(out["rows"]) == out["returned_rows"] == 5
+    assert set(out["rows"][0]) == {"order_id", "contact_id", "order_date", "grand_total"}
+    assert out["truncated"] is True
+    assert out["total_rows"] == orders
+    assert out["total_rows_exact"] is True
+
+
+def test_truncated_by_bytes(orders, monkeypatch):
+    monkeypatch.setattr(sql_tool, "MAX_BYTES", 1000)
+    text = sql_tool.run_sql("SELECT * FROM orders")
+    out = json.loads(text)
+    assert out["truncated"] is True
+    assert 0 < out["returned_rows"] < orders
+    assert len(json.dumps(out["rows"])) <= 1000
+    assert out["total_rows"] == orders
+
+
+def test_count_cut_by_the_deadline_is_not_exact(app_db, monkeypatch):
+    monkeypatch.setattr(sql_tool, "MAX_ROWS", 3)
+    monkeypatch.setattr(sql_tool, "TIMEOUT", 0.2)
+    out = json.loads(sql_tool.run_sql(f"SELECT a.order_id {ENDLESS} ORDER BY a.order_id"))
+    assert out["rows"] == [{"order_id": 1}] * 3
+    assert out["truncated"] is True
+    assert out["total_rows"] >= 3
+    assert out["total_rows_exact"] is False
+
+
+def test_timeout_is_an_error(app_db, monkeypatch):
+    monkeypatch.setattr(sql_tool, "TIMEOUT", 0.2)
+    out = json.loads(sql_tool.run_sql(f"SELECT count(*) {ENDLESS}"))
+    assert out == {"error": "Query exceeded 0.2s; add filters or aggregate."}
+
+
+def test_only_select(app_db):
+    assert json.loads(sql_tool.run_sql("DELETE FROM orders")) == {
+        "error": "Only SELECT queries allowed."}
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import date
+
+import warmer
+
+
+def test_rewarms_when_the_day_changes(monkeypatch):
+    day = [date(2025, 3, 9)]
+    gen = [7]
+    runs = []
+
+    class Clock(date):
+        @classmethod
+        def today(cls):
+            return day[0]
+
+    async def warm_generation(g, today):
+        runs.append((g, today))
+        return True
+
+    monkeypatch.setattr(warmer, "date", Clock)
+    monkeypatch.setattr(warmer, "generation", lambda: gen[0])
+    monkeypatch.setattr(warmer, "warm_generation", warm_generation)
+    monkeypatch.setattr(warmer, "POLL", 0.01)
+
+    async def scenario():
+        task = asyncio.create_task(warmer.run_forever())
+        await asyncio.sleep(0.05)
+        day[0] = date(2025, 3, 10)              # midnight, same app.db
+        await asyncio.sleep(0.05)
+        gen[0] = 8                              # a rebuild
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert runs == [(7, date(2025, 3, 9)), (7, date(2025, 3, 10)),
+                    (8, date(2025, 3, 10))]
@@ -0,0 +1,218 @@
+# warmer.py ─── precompute the dashboard presets after every app.db rebuild
+"""
+Dashboards open with a handful of filter presets, and the first visitor
+after ``load_db.populate_db()`` used to pay for all of them cold. The
+warmer is a background task started by main.py's lifespan that watches
+the app.db generation and the date; after every rebuild, at midnight (the
+date presets move with today) and once at startup it fills the chart
+cache with, for every /charts/* route that takes the filter:
+
+• no filters
+• last 30 / 90 / 365 days and year to date (data_inicial = today − N
+  days or 1 January, data_final = today – what the date pickers send)
+• each category
+• each of the CHART_WARM_TOP_SENDERS senders with the most sends
+
+The frontend's bundle routes go first, and warmed entries stay cached
+until the next rebuild (not CHART_CACHE_TTL). Warming stays out of live
+traffic's way:
+
+• at most CHART_WARM_CONCURRENCY charts at a time, on their own pool
+  (``warm``), whose threads run at nice +CHART_WARM_NICE (Linux)
+• a preset only starts while ``db_executor`` has an idle worker
+• a rebuild mid-run stops it; the next run warms the new generation
+
+Each run is logged and its duration observed in
+chart_cache_warm_duration_seconds; counters are under "warmer" at
+GET /stats/chart-cache. CHART_WARM=0 turns it off.
+"""
+import os
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from datetime import date, timedelta
+from functools import partial
+
+import metrics
+import querylog
+import analytics
+import campaigns
+import chart_cache
+from db import connection, generation, PoolTimeout
+from executors import BoundedExecutor, Saturated, db_executor
+from querylog import query
+
+ENABLED     = os.getenv("CHART_WARM", "1") != "0"
+CONCURRENCY = int(os.getenv("CHART_WARM_CONCURRENCY", "1"))
+NICE        = int(os.getenv("CHART_WARM_NICE", "10"))
+TOP_SENDERS = int(os.getenv("CHART_WARM_TOP_SENDERS", "5"))
+POLL        = float(os.getenv("CHART_WARM_POLL", "10"))       # seconds
+IDLE_WAIT   = 0.05                                           # seconds
+RETRIES     = 3
+
+DAYS = (30, 90, 365)
+
+# bundles first: they are what the dashboards actually request
+CHARTS = {
+    "/charts/commerce-bundle":  analytics._commerce_bundle,
+    "/charts/campaign-bundle":  campaigns._campaign_bundle,
+    "/charts/aov":              analytics._aov,
+    "/charts/category-mix":     analytics._category_mix,
+    "/charts/repeat-funnel":    analytics._repeat_funnel,
+    "/charts/vendas_por_mes":   analytics._vendas_por_mes,
+    "/charts/cohort-retention": analytics._cohort_retention,
+    "/charts/rfm":              analytics._rfm,
+    "/charts/email-volume":     campaigns._email_volume,
+    "/charts/email-engagement": campaigns._email_engagement,
+    "/charts/email-sender-mix": campaigns._email_sender_mix,
+    "/charts/email-unsub-rate": campaigns._email_unsub_rate,
+}
+
+CATEGORIES_SQL = ("SELECT DISTINCT category FROM orders_monthly_category "
+                  "WHERE category IS NOT NULL ORDER BY category")
+TOP_SENDERS_SQL = ("SELECT email_sender_name FROM campaigns_monthly "
+                   "WHERE email_sender_name IS NOT NULL "
+                   "GROUP BY email_sender_name ORDER BY SUM(sends) DESC LIMIT ?")
+
+logger = logging.getLogger("warmer")
+
+warm_executor = BoundedExecutor(
+    "warm", workers=CONCURRENCY, max_queue=0, retry_after=1,
+    overload_errors=(PoolTimeout,))
+
+_niced = threading.local()
+_stats = {"runs": 0, "interrupted": 0, "running": False, "generation": None,
+          "day": None, "presets": 0, "computed": 0, "already_cached": 0, "failed": 0,
+          "seconds": None, "finished_at": None}
+
+
+def _low_priority(compute, **args):
+    """Run ``compute`` with this worker thread niced (once per thread)."""
+    if not getattr(_niced, "done", False):
+        _niced.done = True
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), NICE)
+        except (AttributeError, OSError):          # not Linux / not allowed
+            pass
+    return compute(**args)
+
+
+# ── presets ──────────────────────────────────────────────────────────────────
+def date_presets(today: date) -> list[dict]:
+    ranges = [today - timedelta(days=n) for n in DAYS] + [date(today.year, 1, 1)]
+    return [{"data_inicial": start.isoformat(), "data_final": today.isoformat()}
+            for start in ranges]
+
+
+def dimensions() -> tuple[list[str], list[str]]:
+    """Categories and top senders of the current app.db."""
+    with connection() as conn:
+        categories = [r[0] for r in query(conn, CATEGORIES_SQL)]
+        senders    = [r[0] for r in query(conn, TOP_SENDERS_SQL, (TOP_SENDERS,))]
+    return categories, senders
+
+
+def presets(today: date, categories: list[str], senders: list[str]) -> list[tuple]:
+    """(path, compute, filters) for every chart × preset its route accepts."""
+    out = []
+    for path, compute in CHARTS.items():
+        names = list(inspect.signature(compute).parameters)
+        combos = [{}]
+        if "data_inicial" in names:
+            combos += date_presets(today)
+        if "category" in names:
+            combos += [{"category": c} for c in categories]
+        if "sender" in names:
+            combos += [{"sender": s} for s in senders]
+        out += [(path, compute, {n: combo.get(n) for n in names}) for combo in combos]
+    return out
+
+
+# ── one run ──────────────────────────────────────────────────────────────────
+async def _idle_worker() -> None:
+    while db_executor.stats()["pending"] >= db_executor.workers:
+        await asyncio.sleep(IDLE_WAIT)
+
+
+async def _warm_one(path: str, compute, filters: dict) -> bool | None:
+    """True computed, False already cached, None failed."""
+    for attempt in range(RETRIES):
+        await _idle_worker()
+        try:
+            return await chart_cache.warm(path, partial(_low_priority, compute),
+                                          warm_executor, **filters)
+        except Saturated:
+            await asyncio.sleep(2 ** attempt)
+        except Exception:
+            logger.exception("Could not warm %s %s", path, filters)
+            return None
+    logger.warning("Gave up warming %s %s: database busy", path, filters)
+    return None
+
+
+async def warm_generation(gen: int, today: date) -> bool:
+    """Warm every preset for ``gen`` as of ``today``; False if a newer
+    rebuild cut it short."""
+    querylog.endpoint.set("warmer")                # this task's own context
+    started = time.perf_counter()
+    categories, senders = await warm_executor.run(dimensions)
+    todo = iter(presets(today, categories, senders))
+    counts = {True: 0, False: 0, None: 0}
+    _stats.update(running=True, generation=gen, day=today.isoformat())
+
+    async def worker():
+        for path, compute, filters in todo:
+            if generation() != gen:
+                return
+            counts[await _warm_one(path, compute, filters)] += 1
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    finally:
+        _stats["running"] = False
+    seconds = time.perf_counter() - started
+    done = sum(counts.values())
+    complete = generation() == gen
+    _stats.update(runs=_stats["runs"] + 1, presets=done, computed=counts[True],
+                  already_cached=counts[False], failed=counts[None],
+                  seconds=round(seconds, 3), finished_at=time.time())
+    if not complete:
+        _stats["interrupted"] += 1
+        logger.info("Cache warm for generation %d stopped by a rebuild after "
+                    "%d presets (%.2fs)", gen, done, seconds)
+        return False
+    metrics.CHART_WARM_SECONDS.observe(seconds)
+    logger.info("Cache warm for generation %d: %d presets in %.2fs "
+                "(%d computed, %d already cached, %d failed)", gen, done,
+                seconds, counts[True], counts[False], counts[None])
+    return True
+
+
+# ── lifecycle ────────────────────────────────────────────────────────────────
+async def run_forever() -> None:
+    warmed = None                                   # (generation, day)
+    while True:
+        current = gen, today = generation(), date.today()
+        if current != warmed:
+            try:
+                if await warm_generation(gen, today):
+                    warmed = current
+                continue                            # newer generation: go again
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache warm for generation %d failed", gen)
+                warmed = current                    # don't retry in a tight loop
+        await asyncio.sleep(POLL)
+
+
+def start() -> asyncio.Task | None:
+    if not ENABLED:
+        return None
+    return asyncio.create_task(run_forever(), name="chart-cache-warmer")
+
+
+def stats() -> dict:
+    return {**_stats, "enabled": ENABLED, "concurrency": CONCURRENCY}
@@ -27,17 +27,39 @@ async function get(path, params = {}) {
   return res.json();
 }
 
+/* ── dashboard bundles ────────────────────────────── */
+// The four charts of a dashboard mount together with the same filters, so
+// they share one /charts/*-bundle request instead of firing four.
+const bundles = new Map();
+function getBundle(path, params) {
+  const key = `${path}?${JSON.stringify(params)}`;
+  if (!bundles.has(key)) {
+    const req = get(path, params);
+    bundles.set(key, req);
+    req.finally(() => setTimeout(() => bundles.delete(key), 1000)).catch(() => {});
+  }
+  return bundles.get(key);
+}
+const fromBundle = (path, name) => (params) =>
+  getBundle(path, params).then((res) => ({ data: res.data[name] }));
+
+const commerce = (name) => fromBundle("/charts/commerce-bundle", name);
+const campaign = (name) => fromBundle("/charts/campaign-bundle", name);
+
 /* ── CRM / commerce charts ─────────────────────────── */
-export const fetchAOV          = (di, df, c) => get("/charts/aov",            { data_inicial: di, data_final: df, categoria: c });
-export const fetchCategoryMix  = (di, df, c) => get("/charts/category-mix",   { data_inicial: di, data_final: df, categoria: c });
-export const fetchRepeatFunnel = (di, df, c) => get("/charts/repeat-funnel",  { data_inicial: di, data_final: df, categoria: c });
-export const fetchVendasPorMes = (di, df, c) => get("/charts/vendas_por_mes", { data_inicial: di, data_final: df, categoria: c });
+// The category goes out as `category`, the name the /charts/* routes read.
+// Until the bundles it was sent as `categoria`, which the API ignores: the
+// category picker did not filter these charts at all, and now it does.
+export const fetchAOV         = (di, df, c) => commerce("aov")(           { data_inicial: di, data_final: df, category: c });
+export const fetchCategoryMix  = (di, df, c) => commerce("category_mix")(  { data_inicial: di, data_final: df, category: c });
+export const fetchRepeatFunnel = (di, df, c) => commerce("repeat_funnel")( { data_inicial: di, data_final: df, category: c });
+export const fetchVendasPorMes = (di, df, c) => commerce("vendas_por_mes")({ data_inicial: di, data_final: df, category: c });
 
 /* ── MKT / campanhas charts ───────────────────────── */
-export const fetchEmailVolume     = (di, df, s) => get("/charts/email-volume",     { data_inicial: di, data_final: df, sender: s });
-export const fetchEmailEngagement = (di, df, s) => get("/charts/email-engagement", { data_inicial: di, data_final: df, sender: s });
-export const fetchEmailSenderMix  = (di, df)    => get("/charts/email-sender-mix", { data_inicial: di, data_final: df });
-export const fetchEmailUnsubRate  = (di, df, s) => get("/charts/email-unsub-rate", { data_inicial: di, data_final: df, sender: s });
+export const fetchEmailVolume     = (di, df, s) => campaign("email_volume")(    { data_inicial: di, data_final: df, sender: s });
+export const fetchEmailEngagement = (di, df, s) => campaign("email_engagement")({ data_inicial: di, data_final: df, sender: s });
+export const fetchEmailSenderMix  = (di, df, s) => campaign("email_sender_mix")({ data_inicial: di, data_final: df, sender: s });
+export const fetchEmailUnsubRate  = (di, df, s) => campaign("email_unsub_rate")({ data_inicial: di, data_final: df, sender: s });
 
 /* ── Schema‐diagram (local static asset) ──────────── */
 import schemaURL from "./assets/schema.png";